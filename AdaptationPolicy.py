@@ -0,0 +1,141 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class describes how quickly the statistics of the context model adapt, separately for each level of the model: the
+order-0 table, the order-1 tables and the stand-alone SymbolModels (run lengths, record fields, match lengths). Every
+table has the max total of its level, once an update brings the total to it the table is aged. Aging keeps
+count - ceil(count / 2^agingShift) of each count (at least 1). A shift of 1 halves the counts, larger shifts forget more
+slowly so a table keeps more of its history.
+
+The order-0 and order-1 tables can also be aged with time rather than only when they fill up. Every update of one of
+these tables advances a clock shared by all the tables of a coder, which enters a new epoch every 2^epochBits updates.
+A table remembers the epoch it was last aged in and catches up on the epochs it missed the next time it is updated, in
+a single pass over the table however many epochs went by. Tables that are not used are never touched and the start of
+an epoch costs nothing by itself.
+
+The default policy (max totals as large as the word size allows, shift 1, no epochs) codes exactly as the model always
+did. Any other policy is stored in the stream (see StreamFormat) so the decoder adapts the same way
+"""
+
+class AdaptationPolicy:
+    LEVEL_ZERO_ORDER = 0
+    LEVEL_FIRST_ORDER = 1
+    LEVEL_MODEL = 2
+    LEVEL_NAMES = ['order-0', 'order-1', 'model']
+
+    MIN_MAX_COUNT_BITS = 9                                                     # Smallest max total (2^bits) that holds all 257 symbols of a level
+    MAX_MAX_COUNT_BITS = 30
+    MAX_AGING_SHIFT = 4
+    MAX_EPOCH_BITS = 30
+    SETTLE_COUNT_BITS = 31                                                     # Counts never exceed 2^bits, used to find when catching up leaves only 1s
+
+    def __init__(self, maxCountBits_=None, agingShift_=1, epochBits_=0):
+        """
+        Initialize the object
+
+        :param maxCountBits_: List holding the max total of each level (LEVEL_ index) as a power of 2, 0 for the largest
+               total the word size allows. Totals are never made larger than the word size allows. None for all 0
+        :param agingShift_: Aging keeps count - ceil(count / 2^agingShift_) of each count. 1 halves the counts
+        :param epochBits_: The order-0 and order-1 tables are aged once every 2^epochBits_ table updates, 0 to only age
+               tables when they reach their max total
+        :return: None
+        """
+
+        if(maxCountBits_ is None):
+            maxCountBits_ = [0] * len(self.LEVEL_NAMES)
+
+        if(len(maxCountBits_) != len(self.LEVEL_NAMES)):
+            raise Exception("Invalid number of max totals specified")
+
+        for bits in maxCountBits_:
+            if((bits != 0) and ((bits < self.MIN_MAX_COUNT_BITS) or (bits > self.MAX_MAX_COUNT_BITS))):
+                raise Exception("Invalid max total specified")
+
+        if((agingShift_ < 1) or (agingShift_ > self.MAX_AGING_SHIFT)):
+            raise Exception("Invalid aging shift specified")
+
+        if((epochBits_ < 0) or (epochBits_ > self.MAX_EPOCH_BITS)):
+            raise Exception("Invalid epoch length specified")
+
+        self.mMaxCountBits = list(maxCountBits_)
+        self.mAgingShift = agingShift_
+        self.mEpochBits = epochBits_
+        self.mKeepFactor = (1 << agingShift_) - 1                                  # Each aging step keeps mKeepFactor / 2^mAgingShift
+
+        # Find the number of epochs after which every count has dropped to 1, catching up is then a reset to 1s
+        self.mSettleEpochs = 1
+
+        while((((1 << self.SETTLE_COUNT_BITS) * (self.mKeepFactor ** self.mSettleEpochs)) >>
+               (self.mAgingShift * self.mSettleEpochs)) > 1):
+            self.mSettleEpochs += 1
+
+    def isDefault(self):
+        """
+        Check if the policy codes exactly as the model does without one
+
+        :return: True for the default policy
+        """
+
+        return (self.mMaxCountBits == [0] * len(self.LEVEL_NAMES)) and (self.mAgingShift == 1) and (self.mEpochBits == 0)
+
+    def getFields(self):
+        """
+        Get the values describing the policy, in the order they are stored in the stream
+
+        :return: [zeroOrderBits, firstOrderBits, modelBits, agingShift, epochBits]
+        """
+
+        return self.mMaxCountBits + [self.mAgingShift, self.mEpochBits]
+
+    def getMaxCounts(self, wordMaxCount_):
+        """
+        Get the max total of each level for a word size
+
+        :param wordMaxCount_: The largest total the word size allows (utils.calculateMaxBytes)
+        :return: List of the max total of each level (LEVEL_ index)
+        """
+
+        return [wordMaxCount_ if (bits == 0) else min(1 << bits, wordMaxCount_) for bits in self.mMaxCountBits]
+
+    def ageTable(self, symbolTable_, epochs_=1):
+        """
+        Age every count of a table as many times as given, in one pass over the table
+
+        :param symbolTable_: The table to age, a list of [symbol, count] entries
+        :param epochs_: The number of aging steps
+        :return: The new total count of the table
+        """
+
+        totalCount = 0
+
+        if(epochs_ >= self.mSettleEpochs):
+            for entry in symbolTable_:
+                entry[1] = 1
+
+            return len(symbolTable_)
+
+        factor = self.mKeepFactor ** epochs_
+        shift = self.mAgingShift * epochs_
+
+        for entry in symbolTable_:
+            entry[1] = max(1, (entry[1] * factor) >> shift)
+            totalCount += entry[1]
+
+        return totalCount
+
+    def normalizeTable(self, symbolTable_, maxCount_):
+        """
+        Age a table that reached its max total until its total is below it again. A gentle aging shift may take more
+        than one step. A table holding only counts of 1 can't be aged any further
+
+        :param symbolTable_: The table to age
+        :param maxCount_: The max total of the table
+        :return: The new total count of the table
+        """
+
+        totalCount = self.ageTable(symbolTable_)
+
+        while((totalCount >= maxCount_) and (totalCount > len(symbolTable_))):
+            totalCount = self.ageTable(symbolTable_)
+
+        return totalCount
@@ -0,0 +1,162 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Layout of the solid archive produced by SolidArchiver and read by SolidExtractor.
+
+    Archive header: magic (4 bytes), version (1 byte)
+    Stream:         a compressed stream (see StreamFormat) of all the files joined in archive order. Every block is a
+                    restart point, the model is only reset at the start of a block so files within a block share it
+    Index:          file count (4 bytes), then for each file: stream offset (8 bytes), length (8 bytes), CRC32 (4 bytes),
+                    name length (2 bytes), name (UTF-8, a relative path with '/' separators). Then restart point count
+                    (4 bytes), then for each block: stream offset (8 bytes), archive offset of the block header (8 bytes)
+    Trailer:        archive offset of the index (8 bytes), magic (4 bytes)
+
+The index is written last so files can be archived in one pass, the trailer at the end of the file leads to it. All
+multi-byte values are little endian
+"""
+
+import struct
+
+ARCHIVE_MAGIC = b'KMA1'
+ARCHIVE_VERSION = 1
+
+ARCHIVE_HEADER_FORMAT = '<4sB'
+ARCHIVE_HEADER_SIZE = struct.calcsize(ARCHIVE_HEADER_FORMAT)
+COUNT_FORMAT = '<I'
+COUNT_SIZE = struct.calcsize(COUNT_FORMAT)
+FILE_ENTRY_FORMAT = '<QQIH'
+FILE_ENTRY_SIZE = struct.calcsize(FILE_ENTRY_FORMAT)
+RESTART_ENTRY_FORMAT = '<QQ'
+RESTART_ENTRY_SIZE = struct.calcsize(RESTART_ENTRY_FORMAT)
+TRAILER_FORMAT = '<Q4s'
+TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+MAX_NAME_LEN = 0xFFFF
+
+def packArchiveHeader():
+    """
+    Create the archive header
+
+    :return: The archive header bytes
+    """
+
+    return struct.pack(ARCHIVE_HEADER_FORMAT, ARCHIVE_MAGIC, ARCHIVE_VERSION)
+
+def checkArchiveHeader(headerData_):
+    """
+    Validate the archive header
+
+    :param headerData_: The first ARCHIVE_HEADER_SIZE bytes of the archive
+    :return: None
+    """
+
+    if(len(headerData_) < ARCHIVE_HEADER_SIZE):
+        raise Exception("Archive header truncated")
+
+    [magic, version] = struct.unpack(ARCHIVE_HEADER_FORMAT, headerData_[:ARCHIVE_HEADER_SIZE])
+
+    if(magic != ARCHIVE_MAGIC):
+        raise Exception("Not a solid archive")
+
+    if(version != ARCHIVE_VERSION):
+        raise Exception("Unsupported archive version")
+
+def packIndex(files_, restartPoints_):
+    """
+    Create the index of the archive
+
+    :param files_: List of [name, streamOffset, length, checksum] for each file, in archive order
+    :param restartPoints_: List of [streamOffset, archiveOffset] for each block, in order
+    :return: The index bytes
+    """
+
+    index = struct.pack(COUNT_FORMAT, len(files_))
+
+    for [name, streamOffset, length, checksum] in files_:
+        nameData = name.encode('utf-8')
+
+        if(len(nameData) > MAX_NAME_LEN):
+            raise Exception("File name too long: " + name)
+
+        index += struct.pack(FILE_ENTRY_FORMAT, streamOffset, length, checksum, len(nameData)) + nameData
+
+    index += struct.pack(COUNT_FORMAT, len(restartPoints_))
+
+    for [streamOffset, archiveOffset] in restartPoints_:
+        index += struct.pack(RESTART_ENTRY_FORMAT, streamOffset, archiveOffset)
+
+    return index
+
+def unpackIndex(indexData_):
+    """
+    Parse the index of the archive
+
+    :param indexData_: The index bytes
+    :return: [files, restartPoints] as given to packIndex
+    """
+
+    offset = 0
+    files = []
+    restartPoints = []
+
+    if(len(indexData_) < offset + COUNT_SIZE):
+        raise Exception("Archive index truncated")
+
+    [fileCount] = struct.unpack(COUNT_FORMAT, indexData_[offset:offset + COUNT_SIZE])
+    offset += COUNT_SIZE
+
+    for i in range(0, fileCount):
+        if(len(indexData_) < offset + FILE_ENTRY_SIZE):
+            raise Exception("Archive index truncated")
+
+        [streamOffset, length, checksum, nameLen] = struct.unpack(FILE_ENTRY_FORMAT,
+                                                                  indexData_[offset:offset + FILE_ENTRY_SIZE])
+        offset += FILE_ENTRY_SIZE
+
+        if(len(indexData_) < offset + nameLen):
+            raise Exception("Archive index truncated")
+
+        files.append([bytes(indexData_[offset:offset + nameLen]).decode('utf-8'), streamOffset, length, checksum])
+        offset += nameLen
+
+    if(len(indexData_) < offset + COUNT_SIZE):
+        raise Exception("Archive index truncated")
+
+    [restartCount] = struct.unpack(COUNT_FORMAT, indexData_[offset:offset + COUNT_SIZE])
+    offset += COUNT_SIZE
+
+    if(len(indexData_) < offset + (restartCount * RESTART_ENTRY_SIZE)):
+        raise Exception("Archive index truncated")
+
+    for i in range(0, restartCount):
+        restartPoints.append(list(struct.unpack(RESTART_ENTRY_FORMAT, indexData_[offset:offset + RESTART_ENTRY_SIZE])))
+        offset += RESTART_ENTRY_SIZE
+
+    return [files, restartPoints]
+
+def packTrailer(indexOffset_):
+    """
+    Create the trailer that ends the archive
+
+    :param indexOffset_: The archive offset of the index
+    :return: The trailer bytes
+    """
+
+    return struct.pack(TRAILER_FORMAT, indexOffset_, ARCHIVE_MAGIC)
+
+def unpackTrailer(trailerData_):
+    """
+    Parse the trailer that ends the archive
+
+    :param trailerData_: The last TRAILER_SIZE bytes of the archive
+    :return: The archive offset of the index
+    """
+
+    if(len(trailerData_) < TRAILER_SIZE):
+        raise Exception("Archive trailer truncated")
+
+    [indexOffset, magic] = struct.unpack(TRAILER_FORMAT, trailerData_[:TRAILER_SIZE])
+
+    if(magic != ARCHIVE_MAGIC):
+        raise Exception("Archive trailer missing")
+
+    return indexOffset
@@ -0,0 +1,243 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class predicts the data one bit at a time for the context mixing coder. Each byte is split into 8 binary decisions,
+most significant bit first. Every decision is predicted by several context models (orders 0 to 3 and a sparse context
+holding the bytes at the same position of the previous 16 and 32 bit words) and the predictions are combined by a
+logistic mixer whose weights are trained online.
+
+All arithmetic is integer so the encoder and decoder make exactly the same predictions on every platform. Probabilities
+are 12 bit values giving the chance that the next bit is a 1
+"""
+
+import array
+
+class BitPredictor:
+    PROBABILITY_BITS = 12
+    PROBABILITY_SCALE = 1 << PROBABILITY_BITS
+    MAX_STRETCH = 2047
+
+    HASH_TABLE_BITS = 20                                                       # Entries (log2) of each hashed context table
+    COUNTER_LIMIT = 6                                                          # Counters adapt at 1/(n + 1.5) until n reaches the limit
+    COUNTER_COUNT_BITS = 8
+    MIXER_SHIFT = 16                                                           # Weights are fixed point with this many fraction bits
+    MIXER_INITIAL_WEIGHT = 22000                                               # About 1/3 for each model
+    MIXER_LEARNING_RATE = 2
+    NUM_INPUTS = 6                                                             # Five context models and a bias
+
+    # Points of the squash curve every 128 steps of the stretched domain (lpaq style interpolation)
+    SQUASH_POINTS = [1, 2, 3, 6, 10, 16, 27, 45, 73, 120, 194, 310, 488, 747, 1101, 1546, 2047, 2549, 2994, 3348, 3607,
+                     3785, 3901, 3975, 4022, 4050, 4068, 4079, 4085, 4089, 4092, 4093, 4094]
+
+    SQUASH_TABLE = None
+    STRETCH_TABLE = None
+    HASH_OFFSETS = None
+    COUNTER_RECIPROCALS = None
+    INITIAL_HASH_TABLE = None                                                  # A hashed table in its initial state, copied in by reset
+
+    def __init__(self):
+        """
+        Initialize the object
+
+        :return: None
+        """
+
+        if(BitPredictor.SQUASH_TABLE is None):
+            BitPredictor._build_tables()
+
+        # The tables are allocated once, reset refills them in place
+        self.mOrder0 = array.array('I', self.INITIAL_HASH_TABLE[:256])
+        self.mOrder1 = array.array('I', self.INITIAL_HASH_TABLE[:65536])
+        self.mOrder2 = array.array('I', self.INITIAL_HASH_TABLE)
+        self.mOrder3 = array.array('I', self.INITIAL_HASH_TABLE)
+        self.mSparse = array.array('I', self.INITIAL_HASH_TABLE)
+
+        self.reset()
+
+    @staticmethod
+    def _build_tables():
+        """
+        Build the squash (stretched domain to probability) and stretch (probability to stretched domain) lookup tables
+        and the per partial byte offsets of the hashed tables. Shared by all instances
+
+        :return: None
+        """
+
+        squashTable = []
+
+        for value in range(-BitPredictor.MAX_STRETCH, BitPredictor.MAX_STRETCH + 1):
+            weight = value & 127
+            point = (value >> 7) + 16
+            squashTable.append(((BitPredictor.SQUASH_POINTS[point] * (128 - weight)) +
+                                (BitPredictor.SQUASH_POINTS[point + 1] * weight) + 64) >> 7)
+
+        # Stretch is the inverse of squash, every probability maps to the smallest value that squashes to it or above
+        stretchTable = [0] * BitPredictor.PROBABILITY_SCALE
+        probability = 0
+
+        for value in range(-BitPredictor.MAX_STRETCH, BitPredictor.MAX_STRETCH + 1):
+            squashed = squashTable[value + BitPredictor.MAX_STRETCH]
+
+            while(probability <= squashed):
+                stretchTable[probability] = value
+                probability += 1
+
+        while(probability < BitPredictor.PROBABILITY_SCALE):
+            stretchTable[probability] = BitPredictor.MAX_STRETCH
+            probability += 1
+
+        hashMask = (1 << BitPredictor.HASH_TABLE_BITS) - 1
+
+        BitPredictor.SQUASH_TABLE = squashTable
+        BitPredictor.STRETCH_TABLE = stretchTable
+        BitPredictor.HASH_OFFSETS = [((partial * 0x9E3779B1) >> 12) & hashMask for partial in range(0, 256)]
+        BitPredictor.COUNTER_RECIPROCALS = [(2 * 65536) // ((2 * count) + 3)
+                                            for count in range(0, BitPredictor.COUNTER_LIMIT + 1)]
+
+        # Counters hold a 16 bit probability above the number of times the context was seen. New contexts adapt quickly
+        # and settle down as the count grows
+        initialCounter = (1 << 15) << BitPredictor.COUNTER_COUNT_BITS
+        BitPredictor.INITIAL_HASH_TABLE = array.array('I', [initialCounter]) * (1 << BitPredictor.HASH_TABLE_BITS)
+
+    def reset(self):
+        """
+        Reset all context models and mixer weights to their initial state
+
+        :return: None
+        """
+
+        initialTable = self.INITIAL_HASH_TABLE
+
+        # Copy the initial counters over the tables, assigning a slice of the same length does not reallocate them
+        self.mOrder0[:] = initialTable[:len(self.mOrder0)]
+        self.mOrder1[:] = initialTable[:len(self.mOrder1)]
+        self.mOrder2[:] = initialTable
+        self.mOrder3[:] = initialTable
+        self.mSparse[:] = initialTable
+
+        # One set of weights for each partial byte
+        self.mWeights = [self.MIXER_INITIAL_WEIGHT] * (256 * self.NUM_INPUTS)
+
+        self.mPartialByte = 1                                                      # Bits of the current byte with a leading 1
+        self.mHistory = 0                                                          # Last 4 bytes, most recent in the low byte
+        self.mPosition = 0                                                         # Number of whole bytes seen
+        self.mOrder1Base = 0
+        self.mOrder2Base = 0
+        self.mOrder3Base = 0
+        self.mSparseBase = 0
+
+        self.mIndexes = [0, 0, 0, 0, 0]
+        self.mInputs = [0] * self.NUM_INPUTS
+        self.mInputs[self.NUM_INPUTS - 1] = 256
+        self.mPrediction = self.PROBABILITY_SCALE >> 1
+
+    def predict(self):
+        """
+        Predict the next bit. Must be followed by update with the actual bit
+
+        :return: The probability (1 to PROBABILITY_SCALE - 1) that the next bit is 1
+        """
+
+        partialByte = self.mPartialByte
+        hashMask = (1 << self.HASH_TABLE_BITS) - 1
+        offset = self.HASH_OFFSETS[partialByte]
+        stretchTable = self.STRETCH_TABLE
+
+        indexes = self.mIndexes
+        indexes[0] = partialByte
+        indexes[1] = self.mOrder1Base | partialByte
+        indexes[2] = (self.mOrder2Base ^ offset) & hashMask
+        indexes[3] = (self.mOrder3Base ^ offset) & hashMask
+        indexes[4] = (self.mSparseBase ^ offset) & hashMask
+
+        shift = self.COUNTER_COUNT_BITS + 4
+        inputs = self.mInputs
+        inputs[0] = stretchTable[self.mOrder0[indexes[0]] >> shift]
+        inputs[1] = stretchTable[self.mOrder1[indexes[1]] >> shift]
+        inputs[2] = stretchTable[self.mOrder2[indexes[2]] >> shift]
+        inputs[3] = stretchTable[self.mOrder3[indexes[3]] >> shift]
+        inputs[4] = stretchTable[self.mSparse[indexes[4]] >> shift]
+
+        weightIndex = partialByte * self.NUM_INPUTS
+        weights = self.mWeights
+        dotProduct = 0
+
+        for i in range(0, self.NUM_INPUTS):
+            dotProduct += weights[weightIndex + i] * inputs[i]
+
+        dotProduct >>= self.MIXER_SHIFT
+
+        if(dotProduct > self.MAX_STRETCH):
+            dotProduct = self.MAX_STRETCH
+        elif(dotProduct < -self.MAX_STRETCH):
+            dotProduct = -self.MAX_STRETCH
+
+        prediction = self.SQUASH_TABLE[dotProduct + self.MAX_STRETCH]
+
+        # Never predict certainty, both bits must keep a non empty range in the coder
+        if(prediction < 1):
+            prediction = 1
+        elif(prediction > (self.PROBABILITY_SCALE - 1)):
+            prediction = self.PROBABILITY_SCALE - 1
+
+        self.mPrediction = prediction
+
+        return prediction
+
+    def update(self, bit_):
+        """
+        Train the context models and the mixer with the actual value of the bit that was predicted
+
+        :param bit_: The bit (0 or 1)
+        :return: None
+        """
+
+        indexes = self.mIndexes
+        target = bit_ << 16
+        countBits = self.COUNTER_COUNT_BITS
+        countMask = (1 << countBits) - 1
+        reciprocals = self.COUNTER_RECIPROCALS
+        limit = self.COUNTER_LIMIT
+
+        for [table, index] in [[self.mOrder0, indexes[0]], [self.mOrder1, indexes[1]], [self.mOrder2, indexes[2]],
+                               [self.mOrder3, indexes[3]], [self.mSparse, indexes[4]]]:
+            counter = table[index]
+            count = counter & countMask
+            probability = counter >> countBits
+            probability += ((target - probability) * reciprocals[count]) >> 16
+
+            if(count < limit):
+                count += 1
+
+            table[index] = (probability << countBits) | count
+
+        # Move the weights of the partial byte along the error gradient
+        error = ((bit_ << self.PROBABILITY_BITS) - self.mPrediction) * self.MIXER_LEARNING_RATE
+        weightIndex = self.mPartialByte * self.NUM_INPUTS
+        weights = self.mWeights
+        inputs = self.mInputs
+
+        for i in range(0, self.NUM_INPUTS):
+            weights[weightIndex + i] += (inputs[i] * error) >> 10
+
+        partialByte = (self.mPartialByte << 1) | bit_
+
+        if(partialByte < 256):
+            self.mPartialByte = partialByte
+            return
+
+        # A whole byte has been seen, move the contexts on
+        history = ((self.mHistory << 8) | (partialByte & 0xFF)) & 0xFFFFFFFF
+        self.mHistory = history
+        self.mPosition += 1
+        self.mPartialByte = 1
+
+        hashShift = 32 - self.HASH_TABLE_BITS
+        self.mOrder1Base = (history & 0xFF) << 8
+        self.mOrder2Base = (((history & 0xFFFF) * 0x2F0B4C27) & 0xFFFFFFFF) >> hashShift
+        self.mOrder3Base = (((history & 0xFFFFFF) * 0x6F4F2A85) & 0xFFFFFFFF) >> hashShift
+
+        # Byte lane and the bytes 2 and 4 back, i.e. the same byte of the previous halfword and word of an instruction
+        # stream
+        sparseContext = ((self.mPosition & 3) << 16) | ((history >> 16) & 0xFF00) | ((history >> 8) & 0xFF)
+        self.mSparseBase = (((sparseContext + 1) * 0x4B1C2D3F) & 0xFFFFFFFF) >> hashShift
@@ -0,0 +1,97 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class keeps recently decompressed blocks in memory so reading the same region of a compressed file again (headers,
+version strings, vector tables) costs a copy out of the cache instead of decoding the block. Blocks are kept in least
+recently used order and the oldest ones are evicted once the total size of the cached blocks would exceed the max size.
+The cache counts hits, misses and evictions. It can be shared between threads
+"""
+
+import collections
+import threading
+
+class BlockCache:
+    DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, maxBytes_=DEFAULT_MAX_BYTES):
+        """
+        Initialize the object
+
+        :param maxBytes_: The max total size of the cached blocks. Blocks larger than this are never cached
+        :return: None
+        """
+
+        if(maxBytes_ < 0):
+            raise Exception("Invalid cache size specified")
+
+        self.mMaxBytes = maxBytes_
+        self.mLock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """
+        Remove every block and reset the statistics
+
+        :return: None
+        """
+
+        self.mBlocks = collections.OrderedDict()                                   # Key to block data, least recently used first
+        self.mBytes = 0                                                            # Total size of the cached blocks
+        self.mHits = 0
+        self.mMisses = 0
+        self.mEvictions = 0
+
+    def get(self, key_):
+        """
+        Look up a block, making it the most recently used one
+
+        :param key_: The key the block was stored under
+        :return: The block data (bytes) or None if the block is not cached
+        """
+
+        with self.mLock:
+            blockData = self.mBlocks.get(key_)
+
+            if(blockData is None):
+                self.mMisses += 1
+                return None
+
+            self.mBlocks.move_to_end(key_)
+            self.mHits += 1
+
+            return blockData
+
+    def put(self, key_, blockData_):
+        """
+        Store a block, evicting the least recently used blocks until it fits
+
+        :param key_: The key of the block, e.g. (file identity, block index, modification time)
+        :param blockData_: The decompressed data of the block (bytes)
+        :return: None
+        """
+
+        if(len(blockData_) > self.mMaxBytes):
+            return
+
+        with self.mLock:
+            if(key_ in self.mBlocks):
+                self.mBytes -= len(self.mBlocks.pop(key_))
+
+            while(self.mBytes + len(blockData_) > self.mMaxBytes):
+                [evictedKey, evictedData] = self.mBlocks.popitem(last=False)
+                self.mBytes -= len(evictedData)
+                self.mEvictions += 1
+
+            self.mBlocks[key_] = blockData_
+            self.mBytes += len(blockData_)
+
+    def getStats(self):
+        """
+        Get the cache statistics
+
+        :return: Dictionary of the number of hits, misses, evictions, cached blocks and cached bytes
+        """
+
+        with self.mLock:
+            return {'hits': self.mHits, 'misses': self.mMisses, 'evictions': self.mEvictions,
+                    'blocks': len(self.mBlocks), 'bytes': self.mBytes}
@@ -0,0 +1,121 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class chooses where blocks end. Firmware images move between code, constant tables, strings and padding and the
+coder statistics learnt in one region are of little use (or harmful) in the next, so rather than cutting at fixed sizes
+the planner looks for the points where the statistics change.
+
+The data after the minimum block size is examined one window at a time. Each window is priced twice with an order-0
+estimate: with the statistics of the block so far and with an adaptive model starting from nothing, which is what the
+window costs if a new block starts there. Once starting over is cheaper by more than the cost of relearning, the block
+ends at the start of the window. Blocks never grow past the max size, so they stay small enough to code in parallel
+"""
+
+import math
+
+class BlockPlanner:
+    DEFAULT_MIN_BLOCK_SIZE = 8192
+    DEFAULT_WINDOW_SIZE = 1024
+    DEFAULT_RESET_BITS = 512                                                   # Extra cost of a block boundary (model relearning)
+    ALPHABET_SIZE = 256
+
+    def __init__(self, minBlockSize_, maxBlockSize_, windowSize_=DEFAULT_WINDOW_SIZE, resetBits_=DEFAULT_RESET_BITS):
+        """
+        Initialize the object
+
+        :param minBlockSize_: Blocks are at least this long unless the data ends first
+        :param maxBlockSize_: Blocks are never longer than this
+        :param windowSize_: Granularity (bytes) of the boundaries considered after the min block size
+        :param resetBits_: Bits a window must save by starting a new block before a boundary is placed
+        :return: None
+        """
+
+        if((minBlockSize_ <= 0) or (minBlockSize_ > maxBlockSize_)):
+            raise Exception("Invalid block size limits specified")
+
+        if(windowSize_ <= 0):
+            raise Exception("Invalid window size specified")
+
+        self.mMinBlockSize = minBlockSize_
+        self.mMaxBlockSize = maxBlockSize_
+        self.mWindowSize = windowSize_
+        self.mResetBits = resetBits_
+
+    def _adaptive_cost(self, counts_, total_):
+        """
+        Cost of coding symbols with these counts using an order-0 model that starts empty and learns as it goes. The
+        order of the symbols does not change the total of an add 1/2 estimator so it can be computed from the counts
+
+        :param counts_: Count of every symbol in the window (dictionary)
+        :param total_: Number of symbols in the window
+        :return: The cost in bits
+        """
+
+        costNats = math.lgamma(total_ + (self.ALPHABET_SIZE / 2.0)) - math.lgamma(self.ALPHABET_SIZE / 2.0)
+
+        for count in counts_.values():
+            costNats -= math.lgamma(count + 0.5) - math.lgamma(0.5)
+
+        return costNats / math.log(2)
+
+    def _block_cost(self, counts_, blockCounts_, blockTotal_):
+        """
+        Cost of coding symbols with these counts using the statistics of the current block
+
+        :param counts_: Count of every symbol in the window (dictionary)
+        :param blockCounts_: Count of every symbol in the block so far (list)
+        :param blockTotal_: Number of symbols in the block so far
+        :return: The cost in bits
+        """
+
+        denominator = math.log2(blockTotal_ + (self.ALPHABET_SIZE / 2.0))
+        costBits = 0.0
+
+        for [symbol, count] in counts_.items():
+            costBits += count * (denominator - math.log2(blockCounts_[symbol] + 0.5))
+
+        return costBits
+
+    def planBlock(self, data_, dataLen_, final_):
+        """
+        Find the length of the next block
+
+        :param data_: The data starting at the next block. Must hold at least the max block size unless final_
+        :param dataLen_: The number of bytes in data_
+        :param final_: True if no data follows data_
+        :return: The length of the next block
+        """
+
+        if((dataLen_ < self.mMaxBlockSize) and (not final_)):
+            raise Exception("Not enough data to plan a block")
+
+        endLen = min(dataLen_, self.mMaxBlockSize)
+
+        if(endLen <= self.mMinBlockSize):
+            return endLen
+
+        blockCounts = [0] * self.ALPHABET_SIZE
+
+        for symbol in data_[:self.mMinBlockSize]:
+            blockCounts[symbol] += 1
+
+        blockLen = self.mMinBlockSize
+
+        while((blockLen + self.mWindowSize) <= endLen):
+            windowCounts = {}
+
+            for symbol in data_[blockLen:(blockLen + self.mWindowSize)]:
+                windowCounts[symbol] = windowCounts.get(symbol, 0) + 1
+
+            savedBits = (self._block_cost(windowCounts, blockCounts, blockLen) -
+                         self._adaptive_cost(windowCounts, self.mWindowSize))
+
+            if(savedBits > self.mResetBits):
+                return blockLen
+
+            for [symbol, count] in windowCounts.items():
+                blockCounts[symbol] += count
+
+            blockLen += self.mWindowSize
+
+        return endLen
@@ -0,0 +1,141 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class reads the blocks of a stream ahead of the coder on a background thread. The read function is called
+repeatedly and every item it returns is queued until the consumer asks for it, so file (or network filesystem) latency
+overlaps with the coding of the previous block. The queue is bounded so memory use stays at a few blocks.
+
+If a buffer size is given the read function is handed a reusable bytearray to fill. The consumer gives it back with
+release once it is done with the item, no new buffer is allocated per block. A depth of 0 reads on the calling thread
+"""
+
+import queue
+import threading
+
+class BlockReader:
+
+    def __init__(self, readFunction_, depth_, bufferSize_=0):
+        """
+        Initialize the object and start reading
+
+        :param readFunction_: Called with a free buffer (None if bufferSize_ is 0), returns the next item or None at the
+               end of the input
+        :param depth_: Max number of items read ahead. 0 reads each item when it is requested
+        :param bufferSize_: Size of the reusable buffers, 0 if the read function allocates its own data
+        :return: None
+        """
+
+        if(depth_ < 0):
+            raise Exception("Invalid pipeline depth specified")
+
+        self.mReadFunction = readFunction_
+        self.mFreeBuffers = queue.Queue()
+        self.mReadyItems = queue.Queue(max(1, depth_))
+        self.mError = None
+        self.mStopped = False
+        self.mFinished = False
+        self.mThread = None
+
+        # One buffer for every queued item, one being filled and one held by the consumer
+        if(bufferSize_ > 0):
+            for i in range(0, depth_ + 2):
+                self.mFreeBuffers.put(bytearray(bufferSize_))
+
+        self.mBufferSize = bufferSize_
+
+        if(depth_ > 0):
+            self.mThread = threading.Thread(target=self._run, daemon=True)
+            self.mThread.start()
+
+    def _get_buffer(self):
+        """
+        Take a free buffer from the pool
+
+        :return: The buffer, None if the pool is not used
+        """
+
+        if(self.mBufferSize == 0):
+            return None
+
+        return self.mFreeBuffers.get()
+
+    def _run(self):
+        """
+        Read items until the end of the input, an error or close
+
+        :return: None
+        """
+
+        try:
+            while(not self.mStopped):
+                item = self.mReadFunction(self._get_buffer())
+
+                self.mReadyItems.put(item)
+
+                if(item is None):
+                    return
+        except Exception as error:
+            # Handed to the consumer once it reaches this point of the input
+            self.mError = error
+            self.mReadyItems.put(None)
+
+    def next(self):
+        """
+        Get the next item, waiting for it to be read if required. Errors raised by the read function are raised here
+
+        :return: The item or None once the end of the input is reached
+        """
+
+        if(self.mFinished):
+            return None
+
+        if(self.mThread is None):
+            item = self.mReadFunction(self._get_buffer())
+        else:
+            item = self.mReadyItems.get()
+
+            if((item is None) and (self.mError is not None)):
+                self.mFinished = True
+                raise self.mError
+
+        if(item is None):
+            self.mFinished = True
+
+        return item
+
+    def release(self, buffer_):
+        """
+        Give a buffer back to the pool once the item holding it has been processed
+
+        :param buffer_: The buffer handed to the read function
+        :return: None
+        """
+
+        if(self.mBufferSize > 0):
+            self.mFreeBuffers.put(buffer_)
+
+    def close(self):
+        """
+        Stop reading ahead and wait for the background thread. Must be called even if not all items were read
+
+        :return: None
+        """
+
+        if(self.mThread is None):
+            self.mFinished = True
+            return
+
+        self.mStopped = True
+
+        # Unblock the thread if it is waiting for a buffer or for space in the queue
+        while(self.mThread.is_alive()):
+            self.mFreeBuffers.put(bytearray(self.mBufferSize))
+
+            try:
+                self.mReadyItems.get(timeout=0.05)
+            except queue.Empty:
+                pass
+
+        self.mThread.join()
+        self.mThread = None
+        self.mFinished = True
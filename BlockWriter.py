@@ -0,0 +1,108 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class writes finished blocks to a file on a background thread so the coder can start on the next block while the
+previous one is written. The queue of pending writes is bounded, once it is full write waits for the thread to catch up.
+Errors of the background writes are raised by the next call to write, flush or close. A depth of 0 writes on the
+calling thread
+"""
+
+import queue
+import threading
+
+class BlockWriter:
+
+    def __init__(self, outputFile_, depth_):
+        """
+        Initialize the object and start the writer thread
+
+        :param outputFile_: Binary file object the data is written to
+        :param depth_: Max number of writes queued. 0 writes each block when it is given
+        :return: None
+        """
+
+        if(depth_ < 0):
+            raise Exception("Invalid pipeline depth specified")
+
+        self.mOutputFile = outputFile_
+        self.mPendingWrites = queue.Queue(max(1, depth_))
+        self.mError = None
+        self.mThread = None
+
+        if(depth_ > 0):
+            self.mThread = threading.Thread(target=self._run, daemon=True)
+            self.mThread.start()
+
+    def _run(self):
+        """
+        Write queued data until close. After an error the queue is still drained so the producer never blocks
+
+        :return: None
+        """
+
+        while(True):
+            data = self.mPendingWrites.get()
+
+            try:
+                if(data is None):
+                    return
+
+                if(self.mError is None):
+                    self.mOutputFile.write(data)
+            except Exception as error:
+                self.mError = error
+            finally:
+                self.mPendingWrites.task_done()
+
+    def _check_error(self):
+        """
+        Raise the error of a failed background write
+
+        :return: None
+        """
+
+        if(self.mError is not None):
+            error = self.mError
+            self.mError = None
+            raise error
+
+    def write(self, data_):
+        """
+        Queue data to be written. The data must not be modified afterwards
+
+        :param data_: The data to write (bytes)
+        :return: None
+        """
+
+        self._check_error()
+
+        if(self.mThread is None):
+            self.mOutputFile.write(data_)
+        else:
+            self.mPendingWrites.put(data_)
+
+    def flush(self):
+        """
+        Wait until every queued write reached the file object
+
+        :return: None
+        """
+
+        if(self.mThread is not None):
+            self.mPendingWrites.join()
+
+        self._check_error()
+
+    def close(self):
+        """
+        Finish the queued writes and stop the writer thread. The output file itself is not closed
+
+        :return: None
+        """
+
+        if(self.mThread is not None):
+            self.mPendingWrites.put(None)
+            self.mThread.join()
+            self.mThread = None
+
+        self._check_error()
@@ -0,0 +1,131 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Reversible branch conversion (BCJ) filter for ARM Thumb/Thumb-2 code. The BL/B.W instructions carry PC relative
+offsets which look random to the context model. Converting them to absolute targets before encoding makes calls to the
+same function produce identical byte patterns which compress much better.
+
+Instructions are halfword aligned in memory but not necessarily in the file, record framing (e.g. S-record images) can
+put every instruction at an odd offset. The phase is the parity of the stream offsets instructions start at, it is
+detected for each block by counting the BL/B.W pairs found at either parity and stored with the block (see StreamFormat)
+"""
+
+def _is_branch_pair(data_, i_):
+    """
+    Check if the bytes at i_ hold a 32-bit BL/B.W instruction. The first halfword of the instruction is
+    11110xxx xxxxxxxx and the second 11111xxx xxxxxxxx (little endian in memory)
+
+    :param data_: The data being checked
+    :param i_: The position of the first halfword within data_
+    :return: True if a BL/B.W instruction starts at i_
+    """
+
+    return ((data_[i_ + 1] & 0xF8) == 0xF0) and ((data_[i_ + 3] & 0xF8) == 0xF8)
+
+def _count_branches(data_, dataLen_, start_):
+    """
+    Count the BL/B.W instructions found walking the data one halfword at a time
+
+    :param data_: The data being checked
+    :param dataLen_: The number of bytes of data_ that should be checked
+    :param start_: The position within data_ of the first halfword
+    :return: The number of branch instructions found
+    """
+
+    branchCount = 0
+    i = start_
+
+    while((i + 4) <= dataLen_):
+        if(_is_branch_pair(data_, i)):
+            branchCount += 1
+            i += 4
+        else:
+            i += 2
+
+    return branchCount
+
+def detectThumbPhase(data_, dataLen_, startOffset_=0):
+    """
+    Find the parity of the stream offsets the Thumb instructions of the data start at. Data without branches gets
+    phase 0
+
+    :param data_: The data being checked (bytes, bytearray or integer array)
+    :param dataLen_: The number of bytes of data_ that should be checked
+    :param startOffset_: The position of data_[0] within the stream
+    :return: 0 if instructions start at even stream offsets, 1 if at odd ones
+    """
+
+    evenStart = startOffset_ & 1
+    evenCount = _count_branches(data_, dataLen_, evenStart)
+    oddCount = _count_branches(data_, dataLen_, evenStart ^ 1)
+
+    return 1 if (oddCount > evenCount) else 0
+
+def _convertThumbBranches(data_, dataLen_, startOffset_, phase_, encoding_):
+    """
+    Walk the data one halfword at a time and convert the target of every 32-bit BL/B.W instruction
+
+    :param data_: The data being converted in place (bytearray or integer array)
+    :param dataLen_: The number of bytes of data_ that should be converted
+    :param startOffset_: The position of data_[0] within the full image. Used to calculate the instruction address
+    :param phase_: The parity of the offsets within the full image the instructions start at
+    :param encoding_: If True relative targets are converted to absolute, otherwise absolute are converted back
+    :return: The number of branch instructions converted
+    """
+
+    convertedCount = 0
+    i = (startOffset_ ^ phase_) & 1
+
+    while((i + 4) <= dataLen_):
+        if(_is_branch_pair(data_, i)):
+            source = (((data_[i + 1] & 0x07) << 19) | (data_[i] << 11) | ((data_[i + 3] & 0x07) << 8) | data_[i + 2]) << 1
+
+            # The branch target is relative to the address of the instruction plus 4 (Thumb pipeline). Instructions are
+            # halfword aligned so drop the lowest bit, otherwise an odd phase would make the conversion irreversible
+            instructionAddress = (startOffset_ + i + 4) & 0xFFFFFFFE
+
+            if(encoding_):
+                destination = (instructionAddress + source) & 0xFFFFFFFF
+            else:
+                destination = (source - instructionAddress) & 0xFFFFFFFF
+
+            destination >>= 1
+
+            data_[i + 1] = 0xF0 | ((destination >> 19) & 0x07)
+            data_[i] = (destination >> 11) & 0xFF
+            data_[i + 3] = 0xF8 | ((destination >> 8) & 0x07)
+            data_[i + 2] = destination & 0xFF
+
+            convertedCount += 1
+            i += 4
+        else:
+            i += 2
+
+    return convertedCount
+
+def thumbBranchEncode(data_, dataLen_, startOffset_=0, phase_=0):
+    """
+    Convert the relative BL/B.W targets in the data to absolute targets. Must be called before encoding
+
+    :param data_: The data being converted in place (bytearray or integer array)
+    :param dataLen_: The number of bytes of data_ that should be converted
+    :param startOffset_: The position of data_[0] within the full image
+    :param phase_: The parity of the offsets within the full image the instructions start at (detectThumbPhase)
+    :return: The number of branch instructions converted
+    """
+
+    return _convertThumbBranches(data_, dataLen_, startOffset_, phase_, True)
+
+def thumbBranchDecode(data_, dataLen_, startOffset_=0, phase_=0):
+    """
+    Convert the absolute BL/B.W targets in the data back to relative targets. Must be called after decoding with the
+    same startOffset_ and phase_ that were used by thumbBranchEncode
+
+    :param data_: The data being converted in place (bytearray or integer array)
+    :param dataLen_: The number of bytes of data_ that should be converted
+    :param startOffset_: The position of data_[0] within the full image
+    :param phase_: The parity of the offsets within the full image the instructions start at
+    :return: The number of branch instructions converted
+    """
+
+    return _convertThumbBranches(data_, dataLen_, startOffset_, phase_, False)
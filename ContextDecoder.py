@@ -2,24 +2,30 @@
 __author__ = 'Marko Milutinovic'
 
 """
-This class will implement a Context Decoder using Arithmetic Coding
+This class will implement a Context Decoder using Arithmetic Coding. Runs are expanded from the run length sent by
+ContextEncoder after RUN_TRIGGER equal symbols
 """
 
 import array
 import utils
-import math
+from AdaptationPolicy import AdaptationPolicy
+from EscapeEstimator import EscapeEstimator
+from ContextEncoder import ContextEncoder
+from SymbolModel import SymbolModel
 
 class ContextDecoder:
     ESCAPE_SYMBOL = -1
     TERMINATION_SYMBOL = -2
     BITS_IN_BYTE = 8
 
-    def __init__(self, wordSize_):
+    def __init__(self, wordSize_, escapeMethod_=EscapeEstimator.METHOD_C, adaptation_=None):
         """
         Initialize the object
 
-        :param wordSize_: The word size (bits) that will be used for compression. Must be greater than 2 and less than 16
-        :param terminationSymbol_: Symbol which indicates the end of encoded data where decoding should stop. This is required to properly terminate decoding
+        :param wordSize_: The word size (bits) that will be used for compression. Must be between utils.MIN_WORD_SIZE and
+               utils.MAX_WORD_SIZE
+        :param escapeMethod_: How the escape of the zero and first order tables is counted. Must match the encoder
+        :param adaptation_: The AdaptationPolicy the encoder used, None for the default
         :return: None
         """
 
@@ -28,6 +34,10 @@ class ContextDecoder:
         if(self.mMaxDecodingBytes == 0):
             raise Exception("Invalid word size specified")
 
+        self.mEscapeEstimator = EscapeEstimator(escapeMethod_, self.mMaxDecodingBytes, adaptation_)
+        self.mAdaptation = self.mEscapeEstimator.mAdaptation
+        self.mModelMaxCount = self.mEscapeEstimator.mMaxCounts[AdaptationPolicy.LEVEL_MODEL]
+
         self.mWordSize = wordSize_                                                                 # The tag word size
         self.mWordBitMask = 0x0000                                                                 # The word size bit-mask
         self.mWordMSBMask = (0x0000 | (1 << (self.mWordSize - 1)))                                # The bit mask for the top bit of the word
@@ -56,9 +66,10 @@ class ContextDecoder:
         self.mLowerTag = 0                                                      # The lower tag threshold
         self.mUpperTag = self.mWordBitMask                                      # The upper tag threshold
         self.mCurrentTag = 0                                                    # The current tag we are processing
+        self.mCurrentContext = None                                             # The previous symbol used as the first order context
+        self.mEscapeEstimator.reset()
 
-        self.mZeroOrderSymbols = []
-        self.mZeroOrderSymbols.append([self.ESCAPE_SYMBOL, 1])
+        self.mZeroOrderSymbols = self.mEscapeEstimator.createTable(0)
         self.mZeroOrderSymbolCount = 1
 
         self.mFirstOrderSymbols = []
@@ -71,6 +82,9 @@ class ContextDecoder:
         self.mBaseSymbols.append([self.TERMINATION_SYMBOL, 1])
         self.mBaseSymbolsCount = 257
 
+        self.mRunSlotModel = SymbolModel(ContextEncoder.RUN_SLOTS)
+        self.mRunExtraModels = [SymbolModel(256) for i in range(0, ContextEncoder.RUN_EXTRA_BYTES)]
+
     def _get_next_bit(self):
         """
         Get the next bit from encoded data (MSB first). If we move past the current byte move index over to the next one.
@@ -108,7 +122,7 @@ class ContextDecoder:
         totalSymbolCount_ += 1
 
         # If we have reached the max number of bytes, we need to normalize the stats to allow us to continue
-        if(totalSymbolCount_ >= self.mMaxDecodingBytes):
+        if(totalSymbolCount_ >= self.mModelMaxCount):
             totalSymbolCount_ = self._normalize_stats(symbolTable_)
 
         return totalSymbolCount_
@@ -164,8 +178,9 @@ class ContextDecoder:
         rangeDiff = prevUpperTag - prevLowerTag
         cumulativeCountPrevSymbol = cumulativeCountSymbol_ - symbolTable_[currentSymbolIndex_][1]
 
-        self.mLowerTag = int((prevLowerTag + math.floor(((rangeDiff + 1)*cumulativeCountPrevSymbol))/symbolTableCount_))
-        self.mUpperTag = int((prevLowerTag + math.floor(((rangeDiff + 1)*cumulativeCountSymbol_))/symbolTableCount_ - 1))
+        # Must match ContextEncoder._update_range_tags exactly, integer division keeps 32 bit words exact
+        self.mLowerTag = prevLowerTag + (((rangeDiff + 1)*cumulativeCountPrevSymbol) // symbolTableCount_)
+        self.mUpperTag = prevLowerTag + (((rangeDiff + 1)*cumulativeCountSymbol_) // symbolTableCount_) - 1
 
     def _decrement_count(self, indexToDecrement_, symbolTable_, totalSymbolCount_):
         """
@@ -187,28 +202,14 @@ class ContextDecoder:
 
     def _normalize_stats(self, symbolTable_):
         """
-        Divide the total count for each symbol by 2 but ensure each symbol count is at least 1.
+        Age the counts of a table as set by the adaptation policy, keeping each count at least 1.
         Get new total symbol count from the entries
 
         :param: symbolTable_: Current table we are normalizing
         :return: The new symbol count for table
         """
 
-        symbolCount = 0
-
-        # Go through all the entries in the cumulative count array
-        for i in range(0, len(symbolTable_)):
-
-            value = int(symbolTable_[i][1]/2)
-
-            # Ensure the count is at least 1
-            if(value == 0):
-                value = 1
-
-            symbolTable_[i][1] = value
-            symbolCount += value
-
-        return symbolCount
+        return self.mAdaptation.normalizeTable(symbolTable_, self.mModelMaxCount)
 
     def decodeFromTable(self, symbolTable_, symbolTableCount_, higherOrderTable_, actionOnSymbol_):
         finished = False
@@ -217,9 +218,8 @@ class ContextDecoder:
         symbolCumulativeCount = symbolTable_[0][1]
 
         currentSymbolIndex = 0
-        currentCumulativeCount = int(math.floor(
-            ((self.mCurrentTag - self.mLowerTag + 1) * symbolTableCount_ - 1) / (
-            self.mUpperTag - self.mLowerTag + 1)))
+        currentCumulativeCount = ((self.mCurrentTag - self.mLowerTag + 1) * symbolTableCount_ - 1) // (
+            self.mUpperTag - self.mLowerTag + 1)
 
         while (currentCumulativeCount >= symbolCumulativeCount):
             currentSymbolIndex += 1
@@ -249,7 +249,7 @@ class ContextDecoder:
         return [currentSymbol, finished, symbolTableCount_]
 
     def addSymbolTable(self, contextTable_, contextTableCounts_, contextSymbol_):
-        contextTable_.insert(len(contextTable_) - 1, [contextSymbol_, [[-1, 1]]])
+        contextTable_.insert(len(contextTable_) - 1, [contextSymbol_, self.mEscapeEstimator.createTable(1)])
         contextTableCounts_.insert(len(contextTable_) -2, 1)
 
     def findSymbolIndex(self, symbol_, symbolTable_):
@@ -270,23 +270,25 @@ class ContextDecoder:
     def zeroOrderDecode(self, firstOrderTable_):
         finished = False
 
-        # Attempt to decode from zero order table first
+        # Attempt to decode from zero order table first, the counts are updated once the symbol is known
+        self.mZeroOrderSymbolCount = self.mEscapeEstimator.prepareEscape(self.mZeroOrderSymbols, self.mZeroOrderSymbolCount, 0)
         [currentSymbol, finished, self.mZeroOrderSymbolCount] = self.decodeFromTable(self.mZeroOrderSymbols,
                                                                                      self.mZeroOrderSymbolCount,
                                                                                      firstOrderTable_,
-                                                                                     1)
-
-        # If we have reached the termination symbol then decoding is finished, otherwise store the decompressed symbol
-        if (not finished):
-            if (currentSymbol == self.ESCAPE_SYMBOL):
-                [currentSymbol, finished, self.mBaseSymbolsCount] = self.decodeFromTable(self.mBaseSymbols,
-                                                                                         self.mBaseSymbolsCount,
-                                                                                         [],
-                                                                                         -1)
-                self.mZeroOrderSymbols.insert(len(self.mZeroOrderSymbols) - 1, [currentSymbol, 0])
-                self.mZeroOrderSymbolCount = self._increment_count(len(self.mZeroOrderSymbols) - 2,
-                                                                   self.mZeroOrderSymbols,
-                                                                   self.mZeroOrderSymbolCount)
+                                                                                     0)
+
+        if (currentSymbol == self.ESCAPE_SYMBOL):
+            self.mEscapeEstimator.updateEscape(True)
+            [currentSymbol, finished, self.mBaseSymbolsCount] = self.decodeFromTable(self.mBaseSymbols,
+                                                                                     self.mBaseSymbolsCount,
+                                                                                     [],
+                                                                                     -1)
+            self.mZeroOrderSymbolCount = self.mEscapeEstimator.addSymbol(currentSymbol, self.mZeroOrderSymbols,
+                                                                         self.mZeroOrderSymbolCount)
+        else:
+            self.mEscapeEstimator.updateEscape(False)
+            self.mZeroOrderSymbolCount = self.mEscapeEstimator.countSymbol(self.findSymbolIndex(currentSymbol, self.mZeroOrderSymbols),
+                                                                           self.mZeroOrderSymbols, self.mZeroOrderSymbolCount)
         return [currentSymbol, finished]
 
     def modifyZeroOrder(self, symbolTable_, symbolTableCount_, higherOrderTable_):
@@ -309,84 +311,243 @@ class ContextDecoder:
     def restoreZeroOrder(self):
         return [self.mSymbolsBackup, self.mSymbolCountBackup]
 
-    def decode(self, encodedData_, encodedDataLen_, decodedData_, maxDecodedDataLen_):
+    def startDecode(self, encodedData_, encodedDataLen_):
         """
-        Decompress the data passed in. It is the responsibility of the caller to reset the decoder if required before
-        calling this function
+        Prepare to decode symbols one at a time with decodeSymbol and decodeModelSymbol. The symbols must be decoded in
+        the same order they were encoded. It is the responsibility of the caller to reset the decoder if required
 
         :param encodedData_: The data that needs to be decoded (bytearray)
         :param encodedDataLen_: The length of data that needs to be decoded
-        :param decodedData_: The decoded data (integer array)
-        :param maxDecodedDatalen_ : The max number of symbols that can be stored in decodedData_ array
-        :param firstDataBlock: If this is True then mCurrentTag must be loaded
-        :return: Returns the number of symbols stored in decodedData_
+        :return: None
         """
 
         # If the byte array is smaller than data length pass in throw exception
         if(len(encodedData_) < encodedDataLen_):
             raise Exception("Data passed in smaller than expected")
 
-        # If the byte array is smaller than data length pass in throw exception
-        if(len(decodedData_) < maxDecodedDataLen_):
-            raise Exception("Decompressed data byte array passed in smaller than expected")
-
         self.mEncodedData = encodedData_
         self.mEncodedDataCount = encodedDataLen_
-        self.mDecodedData = decodedData_
-        self.mDecodedDataLen = 0
         self.mCurrentEncodedDataByteIndex = 0
         self.mCurrentEncodedDataBit = 0
         self.mCurrentTag = 0
+        self.mCurrentContext = None
 
         # Load the first word size bits into the current tag
         for i in range(0, self.mWordSize):
             self.mCurrentTag = (self.mCurrentTag | (self._get_next_bit() << ((self.mWordSize - 1) - i)))
 
-        finished = False
-        currentContext = None
+    def decodeSymbol(self):
+        """
+        Decode a single symbol using the first order context of the previous symbol, escaping to the zero order and base
+        tables when required
 
-        # Until we have reached the end keep decompressing
-        while(not finished):
-            # If we don't have a context don't bother doing first order
-            if(currentContext == None):
-                [currentSymbol, finished] = self.zeroOrderDecode([])
-                currentContext = currentSymbol
-                self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, currentContext)
+        :return: [symbol, finished] finished is True once the termination symbol is decoded
+        """
+
+        # If we don't have a context don't bother doing first order
+        if(self.mCurrentContext == None):
+            [currentSymbol, finished] = self.zeroOrderDecode([])
+            self.mCurrentContext = currentSymbol
+            self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, self.mCurrentContext)
+        else:
+            symbolTableIndex = self.findSymbolIndex(self.mCurrentContext, self.mFirstOrderSymbols)
+
+            if(symbolTableIndex == -1):
+                raise Exception("Not in first order")
+
+            symbolTable = self.mFirstOrderSymbols[symbolTableIndex][1]
+            self.mFirstOrderSymbolCounts[symbolTableIndex] = \
+                self.mEscapeEstimator.prepareEscape(symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex], 1)
+
+            [currentSymbol, finished, self.mFirstOrderSymbolCounts[symbolTableIndex]] = self.decodeFromTable(symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex], [], 0)
+
+            #If the symbol is not in the table send escape symbol and use lsower order to encode symbol
+            if(currentSymbol == -1):
+                self.mEscapeEstimator.updateEscape(True)
+                [currentSymbol, finished] = self.zeroOrderDecode(symbolTable)
+
+                self.mFirstOrderSymbolCounts[symbolTableIndex] = \
+                    self.mEscapeEstimator.addSymbol(currentSymbol, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
             else:
-                symbolTableIndex = self.findSymbolIndex(currentContext, self.mFirstOrderSymbols)
+                self.mEscapeEstimator.updateEscape(False)
+                self.mFirstOrderSymbolCounts[symbolTableIndex] = \
+                    self.mEscapeEstimator.countSymbol(self.findSymbolIndex(currentSymbol, symbolTable), symbolTable,
+                                                      self.mFirstOrderSymbolCounts[symbolTableIndex])
+                symbolIndex = self.findSymbolIndex(currentSymbol, self.mZeroOrderSymbols)
+                self.mZeroOrderSymbolCount = self.mEscapeEstimator.countSymbol(symbolIndex, self.mZeroOrderSymbols, self.mZeroOrderSymbolCount)
+
+            self.setContext(currentSymbol)
+
+        return [currentSymbol, finished]
+
+    def setContext(self, contextSymbol_):
+        """
+        Set the symbol that will be used as the first order context for the next decoded symbol. Must mirror the calls
+        made on the encoder
 
-                if(symbolTableIndex == -1):
-                    raise Exception("Not in first order")
+        :param contextSymbol_: The symbol that precedes the next decoded symbol
+        :return: None
+        """
 
-                symbolTable = self.mFirstOrderSymbols[symbolTableIndex][1]
+        self.mCurrentContext = contextSymbol_
+        symbolTableIndex = self.findSymbolIndex(self.mCurrentContext, self.mFirstOrderSymbols)
 
-                [currentSymbol, finished, self.mFirstOrderSymbolCounts[symbolTableIndex]] = self.decodeFromTable(symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex], [], 1)
+        #If not in symbol table add it
+        if(symbolTableIndex == -1):
+            self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, self.mCurrentContext)
 
-                #If the symbol is not in the table send escape symbol and use lsower order to encode symbol
-                if(currentSymbol == -1):
-                    [currentSymbol, finished] = self.zeroOrderDecode(symbolTable)
+    def primeSymbol(self, symbol_):
+        """
+        Update the statistics as if the symbol had been coded, without producing any output. Used to prime the model
+        with data known to both the encoder and decoder. The updates must match ContextEncoder.primeSymbol
 
-                    symbolTable.insert(len(symbolTable) - 1, [currentSymbol, 0])
-                    self.mFirstOrderSymbolCounts[symbolTableIndex] = \
-                        self._increment_count(len(symbolTable) - 2, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
-                else:
-                    symbolIndex = self.findSymbolIndex(currentSymbol, self.mZeroOrderSymbols)
-                    self.mZeroOrderSymbolCount = self._increment_count(symbolIndex, self.mZeroOrderSymbols, self.mZeroOrderSymbolCount)
+        :param symbol_: The symbol to add to the statistics (0-255)
+        :return: None
+        """
 
-                currentContext = currentSymbol
-                symbolTableIndex = self.findSymbolIndex(currentContext, self.mFirstOrderSymbols)
+        # Add the symbol to the zero order table if it is not already there, the base table is only used the first time
+        zeroOrderIndex = self.findSymbolIndex(symbol_, self.mZeroOrderSymbols)
+
+        if(self.mCurrentContext != None):
+            symbolTableIndex = self.findSymbolIndex(self.mCurrentContext, self.mFirstOrderSymbols)
+            symbolTable = self.mFirstOrderSymbols[symbolTableIndex][1]
+            symbolIndex = self.findSymbolIndex(symbol_, symbolTable)
+
+            if(symbolIndex != -1):
+                self.mFirstOrderSymbolCounts[symbolTableIndex] = self.mEscapeEstimator.countSymbol(symbolIndex, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
+                self.mZeroOrderSymbolCount = self.mEscapeEstimator.countSymbol(zeroOrderIndex, self.mZeroOrderSymbols, self.mZeroOrderSymbolCount)
+                self.setContext(symbol_)
+                return
+
+        if(zeroOrderIndex == -1):
+            self.mZeroOrderSymbolCount = self.mEscapeEstimator.addSymbol(symbol_, self.mZeroOrderSymbols,
+                                                                         self.mZeroOrderSymbolCount)
+
+            symbolIndexBase = self.findSymbolIndex(symbol_, self.mBaseSymbols)
+            self.mBaseSymbolsCount = self._decrement_count(symbolIndexBase, self.mBaseSymbols, self.mBaseSymbolsCount)
+        else:
+            self.mZeroOrderSymbolCount = self.mEscapeEstimator.countSymbol(zeroOrderIndex, self.mZeroOrderSymbols, self.mZeroOrderSymbolCount)
+
+        if(self.mCurrentContext == None):
+            self.mCurrentContext = symbol_
+            self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, self.mCurrentContext)
+        else:
+            self.mFirstOrderSymbolCounts[symbolTableIndex] = \
+                self.mEscapeEstimator.addSymbol(symbol_, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
+            self.setContext(symbol_)
+
+    def decodeModelSymbol(self, symbolModel_):
+        """
+        Decode a symbol that was encoded with a stand-alone SymbolModel. The context is not changed
 
-                #If not in symbol table add it
-                if(symbolTableIndex == -1):
-                    self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, currentContext)
+        :param symbolModel_: The SymbolModel used to decode the symbol. It is updated with the symbol
+        :return: The decoded symbol
+        """
+
+        [currentSymbol, finished, symbolModel_.mSymbolCount] = self.decodeFromTable(symbolModel_.mSymbols,
+                                                                                    symbolModel_.mSymbolCount, [], 1)
+
+        return currentSymbol
+
+    def getCumulativeCount(self, totalCount_):
+        """
+        Get the cumulative count the current tag falls on for a table with the given total. Used by models that keep
+        their own frozen tables, the symbol whose range holds the count must then be passed to decodeRange
+
+        :param totalCount_: The total count of the table
+        :return: The cumulative count (0 to totalCount_ - 1)
+        """
+
+        return (((self.mCurrentTag - self.mLowerTag + 1) * totalCount_) - 1) // (self.mUpperTag - self.mLowerTag + 1)
+
+    def decodeRange(self, cumulativeCountLow_, cumulativeCountHigh_, totalCount_):
+        """
+        Remove the symbol found through getCumulativeCount from the tag. Must mirror ContextEncoder.encodeRange
+
+        :param cumulativeCountLow_: The cumulative count of all symbols before the symbol
+        :param cumulativeCountHigh_: The cumulative count including the symbol
+        :param totalCount_: The total count of the table
+        :return: None
+        """
+
+        rangeDiff = self.mUpperTag - self.mLowerTag + 1
+
+        self.mUpperTag = self.mLowerTag + ((rangeDiff * cumulativeCountHigh_) // totalCount_) - 1
+        self.mLowerTag = self.mLowerTag + ((rangeDiff * cumulativeCountLow_) // totalCount_)
+        self._rescale()
+
+    def _decode_run_length(self):
+        """
+        Decode the number of symbols left in a run. Must mirror ContextEncoder._encode_run_length
+
+        :return: The number of further repeats of the last symbol
+        """
+
+        slot = self.decodeModelSymbol(self.mRunSlotModel)
+
+        if(slot <= 1):
+            return slot
+
+        extraBits = 0
+
+        for i in range(0, ((slot - 1) + 7) // 8):
+            extraBits |= self.decodeModelSymbol(self.mRunExtraModels[i]) << (8 * i)
+
+        return (1 << (slot - 1)) + extraBits
+
+    def decode(self, encodedData_, encodedDataLen_, decodedData_, maxDecodedDataLen_):
+        """
+        Decompress the data passed in. It is the responsibility of the caller to reset the decoder if required before
+        calling this function
+
+        :param encodedData_: The data that needs to be decoded (bytearray)
+        :param encodedDataLen_: The length of data that needs to be decoded
+        :param decodedData_: The decoded data (integer array)
+        :param maxDecodedDatalen_ : The max number of symbols that can be stored in decodedData_ array
+        :return: Returns the number of symbols stored in decodedData_
+        """
+
+        # If the byte array is smaller than data length pass in throw exception
+        if(len(decodedData_) < maxDecodedDataLen_):
+            raise Exception("Decompressed data byte array passed in smaller than expected")
+
+        self.startDecode(encodedData_, encodedDataLen_)
+        self.mDecodedData = decodedData_
+        self.mDecodedDataLen = 0
+
+        finished = False
+        runSymbol = None
+        runCount = 0
+
+        # Until we have reached the end keep decompressing
+        while(not finished):
+            [currentSymbol, finished] = self.decodeSymbol()
 
             if(not finished):
+                # The buffer may be exactly as long as the decoded data, only fail if a symbol does not fit
+                if(self.mDecodedDataLen >= maxDecodedDataLen_):
+                    raise Exception('Not enough space to store decoded data')
+
                 self.mDecodedData[self.mDecodedDataLen] = currentSymbol
                 self.mDecodedDataLen += 1
 
-                # If there is no more room extend the bytearray by BASE_OUT_SIZE bytes
-                if(self.mDecodedDataLen >= maxDecodedDataLen_):
-                    raise Exception('Not enough space to store decoded data')
+                runCount = (runCount + 1) if (currentSymbol == runSymbol) else 1
+                runSymbol = currentSymbol
+
+                # Mirror the encoder, the rest of the run follows as a length
+                if(runCount == ContextEncoder.RUN_TRIGGER):
+                    runLength = self._decode_run_length()
+
+                    if((self.mDecodedDataLen + runLength) > maxDecodedDataLen_):
+                        raise Exception('Not enough space to store decoded data')
+
+                    for i in range(0, runLength):
+                        self.mDecodedData[self.mDecodedDataLen + i] = currentSymbol
+
+                    self.mDecodedDataLen += runLength
+                    runCount = 0
 
+        # Don't keep the caller's buffer alive, it may be a view of memory that is released after decoding
+        self.mDecodedData = None
 
-        return self.mDecodedDataLen
\ No newline at end of file
+        return self.mDecodedDataLen
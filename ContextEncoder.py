@@ -1,23 +1,34 @@
 __author__ = 'Marko Milutinovic'
 
 """
-This class will implement a context encoder using Arithmetic Coding
+This class will implement a context encoder using Arithmetic Coding. When encode sees RUN_TRIGGER equal symbols in a row
+the length of the rest of the run is sent with its own adaptive model instead of the symbols, so long fill runs (0x00 and
+0xFF padding) cost a few coder operations
 """
 
 import array
 import utils
-import math
+from AdaptationPolicy import AdaptationPolicy
+from EscapeEstimator import EscapeEstimator
+from SymbolModel import SymbolModel
 
 class ContextEncoder:
     ESCAPE_SYMBOL = -1
     TERMINATION_SYMBOL = -2
 
-    def __init__(self, wordSize_):
+    RUN_TRIGGER = 6                                                            # Equal symbols coded before a run length is sent
+    RUN_SLOTS = 33                                                             # Bit length of a run length, 0 to 32
+    RUN_EXTRA_BYTES = 4                                                        # Bytes used for the bits below the top run length bit
+
+    def __init__(self, wordSize_, escapeMethod_=EscapeEstimator.METHOD_C, adaptation_=None):
         """
-        Initialize the object. The word size must be greater than 2 and less than or equal to 16
+        Initialize the object. The word size must be between utils.MIN_WORD_SIZE and utils.MAX_WORD_SIZE
 
-        :param wordSize_: The word size (bits) that will be used for encoding. Must be greater than 2 and less than or equal to 16
-        :param vocabularySize_: The size of the vocabulary. Symbols run from 0 to (vocabularySize_ - 1)
+        :param wordSize_: The word size (bits) that will be used for encoding. Must be between utils.MIN_WORD_SIZE and utils.MAX_WORD_SIZE
+        :param escapeMethod_: How the escape of the zero and first order tables is counted, one of the
+               EscapeEstimator.METHOD_ values. The decoder must use the same method
+        :param adaptation_: The AdaptationPolicy deciding the max total of each level of the model and how its tables
+               are aged, None for the default. The decoder must use the same policy
         :return:
         """
         self.mMaxEncodeBytes = utils.calculateMaxBytes(wordSize_)                                 # The max number of bytes we can compress before the statistics need to be re-normalized
@@ -25,6 +36,10 @@ class ContextEncoder:
         if(self.mMaxEncodeBytes == 0):
             raise Exception("Invalid word size specified")
 
+        self.mEscapeEstimator = EscapeEstimator(escapeMethod_, self.mMaxEncodeBytes, adaptation_)
+        self.mAdaptation = self.mEscapeEstimator.mAdaptation
+        self.mModelMaxCount = self.mEscapeEstimator.mMaxCounts[AdaptationPolicy.LEVEL_MODEL]
+
         self.mWordSize = wordSize_                                                                 # The tag word size
         self.mWordBitMask = 0x0000                                                                 # The word size bit-mask
         self.mWordMSBMask = (0x0000 | (1 << (self.mWordSize - 1)))                                # The bit mask for the top bit of the word
@@ -49,9 +64,10 @@ class ContextEncoder:
         self.mEncodedDataCount = int(0)                                            # The number of bytes compressed data is taking up
         self.mE3ScaleCount = 0                                                     # Holds the number of E3 mappings currently outstanding
         self.mCurrentBitCount = 0                                                  # The current number of bits loaded onto the mCurrentByte variable
+        self.mCurrentContext = None                                                # The previous symbol used as the first order context
+        self.mEscapeEstimator.reset()
 
-        self.mZeroOrderSymbols = []
-        self.mZeroOrderSymbols.append([self.ESCAPE_SYMBOL, 1])
+        self.mZeroOrderSymbols = self.mEscapeEstimator.createTable(0)
         self.mZeroOrderSymbolCount = 1
         self.mZeroOrderSymbolsBackup = []
         self.mZeroOrderSymbolCountBackup = 0
@@ -66,6 +82,9 @@ class ContextEncoder:
         self.mBaseSymbols.append([self.TERMINATION_SYMBOL, 1])
         self.mBaseSymbolsCount = len(self.mBaseSymbols)
 
+        self.mRunSlotModel = SymbolModel(self.RUN_SLOTS)
+        self.mRunExtraModels = [SymbolModel(256) for i in range(0, self.RUN_EXTRA_BYTES)]
+
         # Initialize the range tags to min and max
         self.mLowerTag = 0
         self.mUpperTag = self.mWordBitMask
@@ -111,7 +130,7 @@ class ContextEncoder:
         totalSymbolCount_ += 1
 
         # If we have reached the max number of bytes, we need to normalize the stats to allow us to continue
-        if(totalSymbolCount_ >= self.mMaxEncodeBytes):
+        if(totalSymbolCount_ >= self.mModelMaxCount):
             totalSymbolCount_ = self._normalize_stats(symbolTable_)
 
         return totalSymbolCount_
@@ -199,35 +218,22 @@ class ContextEncoder:
 
         cumulativeCountPrevSymbol = cumulativeCountSymbol - symbolTable_[currentSymbolIndex_][1]
 
-        upperTag_ = int((lowerTag_ + math.floor(((rangeDiff + 1)*cumulativeCountSymbol))/symbolTableCount_ - 1))
-        lowerTag_ = int((lowerTag_ + math.floor(((rangeDiff + 1)*cumulativeCountPrevSymbol))/symbolTableCount_))
+        # Integer division, a float quotient rounds up to the next integer for the large totals of 32 bit words
+        upperTag_ = lowerTag_ + (((rangeDiff + 1)*cumulativeCountSymbol) // symbolTableCount_) - 1
+        lowerTag_ = lowerTag_ + (((rangeDiff + 1)*cumulativeCountPrevSymbol) // symbolTableCount_)
 
         return [lowerTag_, upperTag_]
 
     def _normalize_stats(self, symbolTable_):
         """
-        Divide the total count for each symbol by 2 but ensure each symbol count is at least 1.
+        Age the counts of a table as set by the adaptation policy, keeping each count at least 1.
         Get new total symbol count from the entries
 
         :param: symbolTable_: Current table we are normalizing
         :return: The new symbol count for table
         """
 
-        symbolCount = 0
-
-        # Go through all the entries in the cumulative count array
-        for i in range(0, len(symbolTable_)):
-
-            value = int(symbolTable_[i][1]/2)
-
-            # Ensure the count is at least 1
-            if(value == 0):
-                value = 1
-
-            symbolTable_[i][1] = value
-            symbolCount += value
-
-        return symbolCount
+        return self.mAdaptation.normalizeTable(symbolTable_, self.mModelMaxCount)
 
     def findSymbolIndex(self, symbol_, symbolTable_):
         """
@@ -245,6 +251,7 @@ class ContextEncoder:
         return -1
 
     def zeroOrderEncode(self, symbolToEncode_, firstOrderTable_):
+        self.mZeroOrderSymbolCount = self.mEscapeEstimator.prepareEscape(self.mZeroOrderSymbols, self.mZeroOrderSymbolCount, 0)
         symbolIndex = self.findSymbolIndex(symbolToEncode_, self.mZeroOrderSymbols)
         symbolFound = False
 
@@ -259,11 +266,9 @@ class ContextEncoder:
             [self.mLowerTag, self.mUpperTag] = self._rescale(self.mLowerTag, self.mUpperTag)
             self.restoreZeroOrder()
 
-            self.mZeroOrderSymbolCount = self._increment_count(len(self.mZeroOrderSymbols) - 1, self.mZeroOrderSymbols,
-                                                               self.mZeroOrderSymbolCount)
-            self.mZeroOrderSymbols.insert(len(self.mZeroOrderSymbols) - 1, [symbolToEncode_, 0])
-            self.mZeroOrderSymbolCount = self._increment_count(len(self.mZeroOrderSymbols) - 2, self.mZeroOrderSymbols,
-                                                               self.mZeroOrderSymbolCount)
+            self.mEscapeEstimator.updateEscape(True)
+            self.mZeroOrderSymbolCount = self.mEscapeEstimator.addSymbol(symbolToEncode_, self.mZeroOrderSymbols,
+                                                                         self.mZeroOrderSymbolCount)
 
             # Send base symbol encoding
             symbolIndexBase = self.findSymbolIndex(symbolToEncode_, self.mBaseSymbols)
@@ -286,12 +291,13 @@ class ContextEncoder:
                                                                        self.mUpperTag)
             self.restoreZeroOrder()
 
-            self.mZeroOrderSymbolCount = self._increment_count(symbolIndex, self.mZeroOrderSymbols,
-                                                               self.mZeroOrderSymbolCount)
+            self.mEscapeEstimator.updateEscape(False)
+            self.mZeroOrderSymbolCount = self.mEscapeEstimator.countSymbol(symbolIndex, self.mZeroOrderSymbols,
+                                                                           self.mZeroOrderSymbolCount)
             [self.mLowerTag, self.mUpperTag] = self._rescale(self.mLowerTag, self.mUpperTag)
 
     def addSymbolTable(self, contextTable_, contextTableCounts_, contextSymbol_):
-        contextTable_.insert(len(contextTable_) - 1, [contextSymbol_, [[-1, 1]]])
+        contextTable_.insert(len(contextTable_) - 1, [contextSymbol_, self.mEscapeEstimator.createTable(1)])
         contextTableCounts_.insert(len(contextTable_) -2, 1)
 
     def modifyZeroOrder(self, symbolTable_):
@@ -314,25 +320,16 @@ class ContextEncoder:
         self.mZeroOrderSymbolCount = self.mZeroOrderSymbolCountBackup
 
 
-    def encode(self, dataToEncode_, dataLen_, encodedData_, maxEncodedDataLen_, lastDataBlock=True):
+    def startEncode(self, encodedData_, maxEncodedDataLen_):
         """
-        Encode the data passed in. The encoded data will be stored in encodedData_ and if there is not enough room an
-        exception will be thrown. Encoding statistics will not be reset when this function is called. It is up-to the caller
-        to ensure that statistics are initialized properly if required.
+        Prepare to encode symbols one at a time with encodeSymbol and encodeModelSymbol. Encoding statistics will not be
+        reset. Once all the symbols have been encoded finishEncode must be called
 
-        :param dataToEncode_: The data that needs to be compressed (integer array)
-        :param dataLen_: The length of data that needs to be compressed
         :param encodedData_: The compressed data should be stored in this byte array
         :param maxEncodedDataLen_ : The max length of compressed data that can be stored in encodedData_
-        :param lastDataBlock: Is this the last data block being encoded. If not we need to take special care to terminate
-               properly so that decoder can work properly
-        :return: The number of bytes stored in encodedData_
+        :return: None
         """
 
-        # If the byte array is smaller than data length pass in throw exception
-        if(len(dataToEncode_) < dataLen_):
-            raise Exception("Data byte array passed in smaller than expected")
-
         # If the byte array is smaller than data length pass in throw exception
         if(len(encodedData_) < maxEncodedDataLen_):
             raise Exception("Encoded data byte array passed in smaller than expected")
@@ -341,59 +338,154 @@ class ContextEncoder:
         self.mEncodedDataCount = 0
         self.mCurrentBitCount = 0
         self.mMaxEncodedDataLen = maxEncodedDataLen_
+        self.mCurrentContext = None
 
-        currentContext = None
+    def encodeSymbol(self, symbolToEncode_):
+        """
+        Encode a single symbol using the first order context of the previous symbol, escaping to the zero order and base
+        tables when required
 
-        # Go through and compress data one byte at a time
-        for i in range(0, dataLen_):
-            symbolIndex = -1
-
-            # If we don't have a context don't bother doing first order
-            if(currentContext == None):
-                self.zeroOrderEncode(dataToEncode_[i], [])
-                currentContext = dataToEncode_[i]
-                self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, currentContext)
+        :param symbolToEncode_: The symbol to encode (0-255 or TERMINATION_SYMBOL)
+        :return: None
+        """
+
+        # If we don't have a context don't bother doing first order
+        if(self.mCurrentContext == None):
+            self.zeroOrderEncode(symbolToEncode_, [])
+            self.mCurrentContext = symbolToEncode_
+            self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, self.mCurrentContext)
+        else:
+            symbolTableIndex = self.findSymbolIndex(self.mCurrentContext, self.mFirstOrderSymbols)
+
+            if(symbolTableIndex == -1):
+                raise Exception("Not in first order")
+
+            symbolTable = self.mFirstOrderSymbols[symbolTableIndex][1]
+            self.mFirstOrderSymbolCounts[symbolTableIndex] = \
+                self.mEscapeEstimator.prepareEscape(symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex], 1)
+            symbolIndex = self.findSymbolIndex(symbolToEncode_, symbolTable)
+
+            #If the symbol is not in the table send escape symbol and use lower order to encode symbol
+            if(symbolIndex == -1):
+                [self.mLowerTag, self.mUpperTag] = self._update_range_tags(len(symbolTable) - 1,
+                                                                           symbolTable,
+                                                                           self.mFirstOrderSymbolCounts[symbolTableIndex],
+                                                                           self.mLowerTag,
+                                                                           self.mUpperTag)
+                [self.mLowerTag, self.mUpperTag] = self._rescale(self.mLowerTag, self.mUpperTag)
+                self.mEscapeEstimator.updateEscape(True)
+
+                self.zeroOrderEncode(symbolToEncode_, symbolTable)
+
+                self.mFirstOrderSymbolCounts[symbolTableIndex] = \
+                    self.mEscapeEstimator.addSymbol(symbolToEncode_, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
             else:
-                symbolTableIndex = self.findSymbolIndex(currentContext, self.mFirstOrderSymbols)
+                [self.mLowerTag, self.mUpperTag] = self._update_range_tags(symbolIndex, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex], self.mLowerTag, self.mUpperTag)
+                self.mEscapeEstimator.updateEscape(False)
+                self.mFirstOrderSymbolCounts[symbolTableIndex] = self.mEscapeEstimator.countSymbol(symbolIndex, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
+                [self.mLowerTag, self.mUpperTag] = self._rescale(self.mLowerTag, self.mUpperTag)
+
+                symbolIndex = self.findSymbolIndex(symbolToEncode_, self.mZeroOrderSymbols)
+                self.mZeroOrderSymbolCount = self.mEscapeEstimator.countSymbol(symbolIndex, self.mZeroOrderSymbols, self.mZeroOrderSymbolCount)
+
+            self.setContext(symbolToEncode_)
+
+    def setContext(self, contextSymbol_):
+        """
+        Set the symbol that will be used as the first order context for the next encoded symbol. Used by front ends that
+        emit symbols without passing them through encodeSymbol (e.g. matches)
+
+        :param contextSymbol_: The symbol that precedes the next encoded symbol
+        :return: None
+        """
+
+        self.mCurrentContext = contextSymbol_
+        symbolTableIndex = self.findSymbolIndex(self.mCurrentContext, self.mFirstOrderSymbols)
+
+        #If not in symbol table add it
+        if(symbolTableIndex == -1):
+            self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, self.mCurrentContext)
+
+    def primeSymbol(self, symbol_):
+        """
+        Update the statistics as if the symbol had been coded, without producing any output. Used to prime the model
+        with data known to both the encoder and decoder. The updates must match ContextDecoder.primeSymbol
+
+        :param symbol_: The symbol to add to the statistics (0-255)
+        :return: None
+        """
+
+        # Add the symbol to the zero order table if it is not already there, the base table is only used the first time
+        zeroOrderIndex = self.findSymbolIndex(symbol_, self.mZeroOrderSymbols)
+
+        if(self.mCurrentContext != None):
+            symbolTableIndex = self.findSymbolIndex(self.mCurrentContext, self.mFirstOrderSymbols)
+            symbolTable = self.mFirstOrderSymbols[symbolTableIndex][1]
+            symbolIndex = self.findSymbolIndex(symbol_, symbolTable)
+
+            if(symbolIndex != -1):
+                self.mFirstOrderSymbolCounts[symbolTableIndex] = self.mEscapeEstimator.countSymbol(symbolIndex, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
+                self.mZeroOrderSymbolCount = self.mEscapeEstimator.countSymbol(zeroOrderIndex, self.mZeroOrderSymbols, self.mZeroOrderSymbolCount)
+                self.setContext(symbol_)
+                return
+
+        if(zeroOrderIndex == -1):
+            self.mZeroOrderSymbolCount = self.mEscapeEstimator.addSymbol(symbol_, self.mZeroOrderSymbols,
+                                                                         self.mZeroOrderSymbolCount)
+
+            symbolIndexBase = self.findSymbolIndex(symbol_, self.mBaseSymbols)
+            self.mBaseSymbolsCount = self._decrement_count(symbolIndexBase, self.mBaseSymbols, self.mBaseSymbolsCount)
+        else:
+            self.mZeroOrderSymbolCount = self.mEscapeEstimator.countSymbol(zeroOrderIndex, self.mZeroOrderSymbols, self.mZeroOrderSymbolCount)
 
-                if(symbolTableIndex == -1):
-                    raise Exception("Not in first order")
+        if(self.mCurrentContext == None):
+            self.mCurrentContext = symbol_
+            self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, self.mCurrentContext)
+        else:
+            self.mFirstOrderSymbolCounts[symbolTableIndex] = \
+                self.mEscapeEstimator.addSymbol(symbol_, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
+            self.setContext(symbol_)
 
-                symbolTable = self.mFirstOrderSymbols[symbolTableIndex][1]
-                symbolIndex = self.findSymbolIndex(dataToEncode_[i], symbolTable)
+    def encodeModelSymbol(self, symbolToEncode_, symbolModel_):
+        """
+        Encode a symbol using a stand-alone SymbolModel instead of the context tables. The context is not changed
 
-                #If the symbol is not in the table send escape symbol and use lower order to encode symbol
-                if(symbolIndex == -1):
-                    [self.mLowerTag, self.mUpperTag] = self._update_range_tags(len(symbolTable) - 1,
-                                                                               symbolTable,
-                                                                               self.mFirstOrderSymbolCounts[symbolTableIndex],
-                                                                               self.mLowerTag,
-                                                                               self.mUpperTag)
-                    [self.mLowerTag, self.mUpperTag] = self._rescale(self.mLowerTag, self.mUpperTag)
+        :param symbolToEncode_: The symbol to encode. Must be in the range of the model
+        :param symbolModel_: The SymbolModel used to encode the symbol. It is updated with the symbol
+        :return: None
+        """
 
-                    self.zeroOrderEncode(dataToEncode_[i], symbolTable)
+        [self.mLowerTag, self.mUpperTag] = self._update_range_tags(symbolToEncode_, symbolModel_.mSymbols,
+                                                                   symbolModel_.mSymbolCount, self.mLowerTag,
+                                                                   self.mUpperTag)
+        [self.mLowerTag, self.mUpperTag] = self._rescale(self.mLowerTag, self.mUpperTag)
+        symbolModel_.mSymbolCount = self._increment_count(symbolToEncode_, symbolModel_.mSymbols, symbolModel_.mSymbolCount)
 
-                    symbolTable.insert(len(symbolTable) - 1, [dataToEncode_[i], 0])
-                    self.mFirstOrderSymbolCounts[symbolTableIndex] = \
-                        self._increment_count(len(symbolTable) - 2, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
-                    self.mFirstOrderSymbolCounts[symbolTableIndex] = \
-                        self._increment_count(len(symbolTable) - 1, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
+    def encodeRange(self, cumulativeCountLow_, cumulativeCountHigh_, totalCount_):
+        """
+        Encode a symbol given directly as its cumulative count range. Used by models that keep their own frozen
+        tables. The total must not exceed the max symbol count for the word size
 
+        :param cumulativeCountLow_: The cumulative count of all symbols before the symbol
+        :param cumulativeCountHigh_: The cumulative count including the symbol
+        :param totalCount_: The total count of the table
+        :return: None
+        """
 
-                else:
-                    [self.mLowerTag, self.mUpperTag] = self._update_range_tags(symbolIndex, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex], self.mLowerTag, self.mUpperTag)
-                    self.mFirstOrderSymbolCounts[symbolTableIndex] = self._increment_count(symbolIndex, symbolTable, self.mFirstOrderSymbolCounts[symbolTableIndex])
-                    [self.mLowerTag, self.mUpperTag] = self._rescale(self.mLowerTag, self.mUpperTag)
+        rangeDiff = self.mUpperTag - self.mLowerTag + 1
 
-                    symbolIndex = self.findSymbolIndex(dataToEncode_[i], self.mZeroOrderSymbols)
-                    self.mZeroOrderSymbolCount = self._increment_count(symbolIndex, self.mZeroOrderSymbols, self.mZeroOrderSymbolCount)
+        self.mUpperTag = self.mLowerTag + ((rangeDiff * cumulativeCountHigh_) // totalCount_) - 1
+        self.mLowerTag = self.mLowerTag + ((rangeDiff * cumulativeCountLow_) // totalCount_)
+        [self.mLowerTag, self.mUpperTag] = self._rescale(self.mLowerTag, self.mUpperTag)
 
-                currentContext = dataToEncode_[i]
-                symbolTableIndex = self.findSymbolIndex(currentContext, self.mFirstOrderSymbols)
+    def finishEncode(self, lastDataBlock=True):
+        """
+        Terminate the encoded data started with startEncode
 
-                #If not in symbol table add it
-                if(symbolTableIndex == -1):
-                    self.addSymbolTable(self.mFirstOrderSymbols, self.mFirstOrderSymbolCounts, currentContext)
+        :param lastDataBlock: Is this the last data block being encoded. If not we need to take special care to terminate
+               properly so that decoder can work properly
+        :return: The number of bytes stored in encodedData_
+        """
 
         lowerTagToSend = self.mLowerTag
 
@@ -416,8 +508,75 @@ class ContextEncoder:
                 self._append_bit((~bitValue) & 0x0001)
                 self.mE3ScaleCount -= 1
 
-        # Ensure that the current byte is added to the compressed data length if there are any outstanding bits on it
+        # Ensure that the current byte is added to the compressed data length if there are any outstanding bits on it.
+        # The decoder reads bits MSB first so the outstanding bits must be moved to the top of the byte
         if(self.mCurrentBitCount != 0):
+            self.mEncodedData[self.mEncodedDataCount] = (self.mEncodedData[self.mEncodedDataCount] << (8 - self.mCurrentBitCount)) & 0xFF
             self.mEncodedDataCount += 1
 
-        return self.mEncodedDataCount
\ No newline at end of file
+        return self.mEncodedDataCount
+
+    def encode(self, dataToEncode_, dataLen_, encodedData_, maxEncodedDataLen_, lastDataBlock=True):
+        """
+        Encode the data passed in. The encoded data will be stored in encodedData_ and if there is not enough room an
+        exception will be thrown. Encoding statistics will not be reset when this function is called. It is up-to the caller
+        to ensure that statistics are initialized properly if required.
+
+        :param dataToEncode_: The data that needs to be compressed (integer array)
+        :param dataLen_: The length of data that needs to be compressed
+        :param encodedData_: The compressed data should be stored in this byte array
+        :param maxEncodedDataLen_ : The max length of compressed data that can be stored in encodedData_
+        :param lastDataBlock: Is this the last data block being encoded. If not we need to take special care to terminate
+               properly so that decoder can work properly
+        :return: The number of bytes stored in encodedData_
+        """
+
+        # If the byte array is smaller than data length pass in throw exception
+        if(len(dataToEncode_) < dataLen_):
+            raise Exception("Data byte array passed in smaller than expected")
+
+        self.startEncode(encodedData_, maxEncodedDataLen_)
+
+        runSymbol = None
+        runCount = 0
+        i = 0
+
+        # Go through and compress data one byte at a time
+        while(i < dataLen_):
+            symbol = dataToEncode_[i]
+            self.encodeSymbol(symbol)
+            i += 1
+
+            runCount = (runCount + 1) if (symbol == runSymbol) else 1
+            runSymbol = symbol
+
+            # The decoder counts the same way, after RUN_TRIGGER equal symbols it expects the length of the rest of the run
+            if((runCount == self.RUN_TRIGGER) and (symbol != self.TERMINATION_SYMBOL)):
+                runLength = 0
+
+                while(((i + runLength) < dataLen_) and (dataToEncode_[i + runLength] == symbol)):
+                    runLength += 1
+
+                self._encode_run_length(runLength)
+                i += runLength
+                runCount = 0
+
+        return self.finishEncode(lastDataBlock)
+
+    def _encode_run_length(self, runLength_):
+        """
+        Encode the number of symbols left in a run as its bit length followed by the bits below the top bit. The run
+        models are not part of the context tables and the context is not changed
+
+        :param runLength_: The number of further repeats of the last symbol (at most 32 bits)
+        :return: None
+        """
+
+        slot = runLength_.bit_length()
+        self.encodeModelSymbol(slot, self.mRunSlotModel)
+
+        if(slot > 1):
+            extraBits = runLength_ - (1 << (slot - 1))
+
+            for i in range(0, ((slot - 1) + 7) // 8):
+                self.encodeModelSymbol((extraBits >> (8 * i)) & 0xFF, self.mRunExtraModels[i])
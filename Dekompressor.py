@@ -0,0 +1,479 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will decompress a stream produced by Kompressor. Each block is decoded with the ContextDecoder and any
+pre-filters recorded in the stream header are undone. Blocks split into sub-streams can be decoded on a process pool
+"""
+
+import zlib
+import StreamFormat
+import BranchFilter
+from ContextDecoder import ContextDecoder
+from AdaptationPolicy import AdaptationPolicy
+from DldRecordDecoder import DldRecordDecoder
+from LZContextDecoder import LZContextDecoder
+from DeltaDecoder import DeltaDecoder
+from SemiStaticDecoder import SemiStaticDecoder
+from MixingDecoder import MixingDecoder
+from HalfwordDecoder import HalfwordDecoder
+from BlockReader import BlockReader
+from BlockWriter import BlockWriter
+
+# Dekompressor per stream header, kept by worker processes decoding sub-streams
+gSubStreamDekompressors = {}
+
+def decompressSubStream(headerData_, encodedData_, originalLen_, streamOffset_):
+    """
+    Decode one sub-stream of a block. Used to decode the sub-streams of a block on the workers of a process pool, each
+    worker keeps a Dekompressor for every stream header it sees
+
+    :param headerData_: The stream header of the stream the sub-stream belongs to (without a reference header)
+    :param encodedData_: The encoded data of the sub-stream
+    :param originalLen_: The number of bytes the sub-stream held before compression
+    :param streamOffset_: The position of the sub-stream within the stream
+    :return: The decompressed data (bytearray)
+    """
+
+    dekompressor = gSubStreamDekompressors.get(headerData_)
+
+    if(dekompressor is None):
+        dekompressor = Dekompressor()
+        dekompressor.setHeader(headerData_)
+        gSubStreamDekompressors[headerData_] = dekompressor
+
+    return dekompressor.decodeSubStream(encodedData_, len(encodedData_), originalLen_, streamOffset_)
+
+class Dekompressor:
+    DEFAULT_PIPELINE_DEPTH = 2
+
+    def __init__(self, referenceData_=None, executor_=None, pipelineDepth_=DEFAULT_PIPELINE_DEPTH):
+        """
+        Initialize the object. The decoder is created once the stream header is read
+
+        :param referenceData_: The reference image, required to decompress streams delta coded against a reference
+        :param executor_: Optional concurrent.futures process pool. The sub-streams of each block are decoded on it in
+               parallel. Streams delta coded against a reference are always decoded in this process
+        :param pipelineDepth_: Number of blocks decompress reads ahead and queues for writing on background threads, 0 to
+               read, decode and write strictly in turn
+        :return: None
+        """
+
+        self.mReferenceData = referenceData_
+        self.mExecutor = executor_
+        self.mPipelineDepth = pipelineDepth_
+        self.mDeltaDecoder = None
+        self.mDecoder = None
+        self.mRecordDecoder = None
+        self.mLZDecoder = None
+        self.mSemiStaticDecoder = None
+        self.mMixingDecoder = None
+        self.mHalfwordDecoder = None
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the position within the stream. Must be called before starting a new stream
+
+        :return: None
+        """
+
+        self.mWordSize = 0
+        self.mFlags = 0
+        self.mModelFlags = 0
+        self.mBlockSize = 0
+        self.mStreamOffset = 0                                                     # Number of bytes decompressed so far
+        self.mStreamChecksum = 0                                                   # CRC32 of the data decompressed so far
+        self.mEndOfStream = False                                                  # True once the end marker was read
+
+    def setStreamOffset(self, streamOffset_):
+        """
+        Set the position within the stream of the next block. Blocks are independent so they can be decompressed out of
+        order (e.g. by parallel workers) as long as each one is given its offset
+
+        :param streamOffset_: The number of bytes in the stream before the next block
+        :return: None
+        """
+
+        self.mStreamOffset = streamOffset_
+
+    def setHeader(self, headerData_):
+        """
+        Parse the stream header and prepare the decoder
+
+        :param headerData_: The stream header bytes, followed by the adaptation and reference headers if the stream has
+               them
+        :return: None
+        """
+
+        self.reset()
+        [self.mWordSize, self.mFlags, self.mBlockSize, self.mEscapeMethod, self.mModelFlags] = \
+            StreamFormat.unpackStreamHeader(headerData_)
+        headerSize = StreamFormat.STREAM_HEADER_SIZE
+        adaptation = AdaptationPolicy()
+
+        if(self.mModelFlags & StreamFormat.MODEL_FLAG_ADAPTATION):
+            [zeroOrderBits, firstOrderBits, modelBits, agingShift, epochBits] = \
+                StreamFormat.unpackAdaptationHeader(headerData_[headerSize:])
+            adaptation = AdaptationPolicy([zeroOrderBits, firstOrderBits, modelBits], agingShift, epochBits)
+            headerSize += StreamFormat.ADAPTATION_HEADER_SIZE
+
+        self.mHeaderData = bytes(headerData_[:headerSize])
+
+        if(self.mFlags & StreamFormat.FLAG_REFERENCE_DELTA):
+            if(self.mReferenceData is None):
+                raise Exception("Stream requires a reference image")
+
+            StreamFormat.checkReferenceHeader(headerData_[headerSize:], self.mReferenceData)
+
+            referenceData = list(self.mReferenceData)
+
+            if(self.mFlags & StreamFormat.FLAG_THUMB_FILTER):
+                BranchFilter.thumbBranchEncode(referenceData, len(referenceData), 0,
+                                               BranchFilter.detectThumbPhase(referenceData, len(referenceData)))
+
+            self.mDeltaDecoder = DeltaDecoder(self.mWordSize, referenceData, self.mEscapeMethod, adaptation)
+
+        if((self.mDecoder is None) or (self.mDecoder.mWordSize != self.mWordSize) or
+           (self.mDecoder.mEscapeEstimator.mMethod != self.mEscapeMethod) or
+           (self.mDecoder.mAdaptation.getFields() != adaptation.getFields())):
+            self.mDecoder = ContextDecoder(self.mWordSize, self.mEscapeMethod, adaptation)
+
+        if(self.mFlags & StreamFormat.FLAG_DLD_RECORDS):
+            self.mRecordDecoder = DldRecordDecoder(self.mWordSize, (self.mFlags & StreamFormat.FLAG_THUMB_FILTER) != 0,
+                                                   self.mEscapeMethod, adaptation)
+
+        if(self.mFlags & StreamFormat.FLAG_LZ_MATCHES):
+            self.mLZDecoder = LZContextDecoder(self.mWordSize, self.mEscapeMethod, adaptation)
+
+        if(self.mFlags & StreamFormat.FLAG_SEMI_STATIC):
+            self.mSemiStaticDecoder = SemiStaticDecoder(self.mWordSize)
+
+        if(self.mFlags & StreamFormat.FLAG_CONTEXT_MIXING):
+            self.mMixingDecoder = MixingDecoder(self.mWordSize)
+
+        if(self.mModelFlags & StreamFormat.MODEL_FLAG_HALFWORD_SYMBOLS):
+            self.mHalfwordDecoder = HalfwordDecoder(self.mWordSize)
+
+    def decompressBlock(self, encodedData_, encodedDataLen_, originalLen_, checksum_=None):
+        """
+        Decompress a single block of data
+
+        :param encodedData_: The encoded data of the block (without the block header)
+        :param encodedDataLen_: The number of encoded bytes
+        :param originalLen_: The number of bytes the block held before compression
+        :param checksum_: The CRC32 stored with the block, None if the stream has no checksums
+        :return: The decompressed data (bytearray)
+        """
+
+        blockData = bytearray(originalLen_)
+        self.decodeBlockInto(encodedData_, encodedDataLen_, blockData, self.mStreamOffset)
+
+        if((checksum_ is not None) and ((zlib.crc32(blockData) & 0xFFFFFFFF) != checksum_)):
+            raise Exception("Block checksum does not match at offset " + str(self.mStreamOffset))
+
+        self.mStreamOffset += originalLen_
+        self.mStreamChecksum = zlib.crc32(blockData, self.mStreamChecksum) & 0xFFFFFFFF
+
+        return blockData
+
+    def decodeBlockInto(self, encodedData_, encodedDataLen_, outputData_, streamOffset_):
+        """
+        Decode a block straight into the memory it belongs in (e.g. its slice of a shared output buffer). The stream
+        offset and checksum are not changed
+
+        :param encodedData_: The encoded data of the block (without the block header)
+        :param encodedDataLen_: The number of encoded bytes
+        :param outputData_: Writable buffer (bytearray or memoryview) exactly as long as the decompressed block
+        :param streamOffset_: The position of the block within the stream
+        :return: None
+        """
+
+        if(self.mDecoder is None):
+            raise Exception("Stream header not set")
+
+        blockMode = StreamFormat.unpackBlockMode(encodedData_[:encodedDataLen_])
+        encodedData = bytes(encodedData_[StreamFormat.BLOCK_MODE_SIZE:encodedDataLen_])
+        encodedDataLen = len(encodedData)
+        originalLen = len(outputData_)
+
+        if(blockMode == StreamFormat.BLOCK_MODE_STORED):
+            if(encodedDataLen != originalLen):
+                raise Exception("Decoded block length does not match")
+
+            outputData_[:] = encodedData
+        elif(self.mFlags & StreamFormat.FLAG_DLD_RECORDS):
+            blockData = self._decompress_record_block(encodedData, encodedDataLen)
+
+            if(len(blockData) != originalLen):
+                raise Exception("Decoded block length does not match")
+
+            outputData_[:] = blockData
+        elif(self.mFlags & StreamFormat.FLAG_SUB_STREAMS):
+            self._decompress_sub_streams(encodedData, encodedDataLen, outputData_, streamOffset_)
+        else:
+            self.decodeSubStreamInto(encodedData, encodedDataLen, outputData_, streamOffset_)
+
+    def checkStreamChecksum(self, checksum_):
+        """
+        Check the checksum of the end marker against all the data decompressed since the stream header was set
+
+        :param checksum_: The CRC32 stored in the end marker
+        :return: None
+        """
+
+        if(checksum_ != self.mStreamChecksum):
+            raise Exception("Stream checksum does not match")
+
+    def decompressBlockData(self, blockData_):
+        """
+        Decompress a block held in memory, as returned by Kompressor.compressBlock
+
+        :param blockData_: The block header (and checksum) followed by the encoded data
+        :return: The decompressed data (bytearray)
+        """
+
+        blockHeaderSize = StreamFormat.getBlockHeaderSize(self.mFlags)
+        [originalLen, compressedLen] = StreamFormat.unpackBlockHeader(blockData_)
+        checksum = None
+
+        if(self.mFlags & StreamFormat.FLAG_CHECKSUM):
+            checksum = StreamFormat.unpackChecksum(blockData_[StreamFormat.BLOCK_HEADER_SIZE:blockHeaderSize])
+
+        if(len(blockData_) != (blockHeaderSize + compressedLen)):
+            raise Exception("Block data truncated")
+
+        return self.decompressBlock(blockData_[blockHeaderSize:], compressedLen, originalLen, checksum)
+
+    def _decompress_sub_streams(self, encodedData_, encodedDataLen_, outputData_, streamOffset_):
+        """
+        Decode every sub-stream of a block, on the executor if one was provided
+
+        :param encodedData_: The encoded data of the block (without the block header)
+        :param encodedDataLen_: The number of encoded bytes
+        :param outputData_: Writable buffer exactly as long as the decompressed block
+        :param streamOffset_: The position of the block within the stream
+        :return: None
+        """
+
+        [subStreams, offset] = StreamFormat.unpackSubStreamTable(encodedData_[:encodedDataLen_])
+        subStreamData = []
+        streamOffsets = []
+        streamOffset = streamOffset_
+
+        for [originalLen, compressedLen] in subStreams:
+            if((offset + compressedLen) > encodedDataLen_):
+                raise Exception("Sub-stream data truncated")
+
+            subStreamData.append(bytes(encodedData_[offset:offset + compressedLen]))
+            streamOffsets.append(streamOffset)
+            offset += compressedLen
+            streamOffset += originalLen
+
+        originalLens = [subStream[0] for subStream in subStreams]
+
+        if(sum(originalLens) != len(outputData_)):
+            raise Exception("Decoded block length does not match")
+
+        outputOffset = 0
+
+        # Views of outputData_ are released right away, it may be a slice of shared memory that is closed afterwards
+        with memoryview(outputData_) as outputView:
+            if((self.mExecutor is not None) and (not (self.mFlags & StreamFormat.FLAG_REFERENCE_DELTA))):
+                results = self.mExecutor.map(decompressSubStream, [self.mHeaderData] * len(subStreams), subStreamData,
+                                             originalLens, streamOffsets)
+
+                for result in results:
+                    outputView[outputOffset:outputOffset + len(result)] = result
+                    outputOffset += len(result)
+            else:
+                for i in range(0, len(subStreams)):
+                    with outputView[outputOffset:outputOffset + originalLens[i]] as subStreamView:
+                        self.decodeSubStreamInto(subStreamData[i], len(subStreamData[i]), subStreamView, streamOffsets[i])
+
+                    outputOffset += originalLens[i]
+
+    def decodeSubStream(self, encodedData_, encodedDataLen_, originalLen_, streamOffset_):
+        """
+        Decode a run of data coded with a freshly reset model and undo the filters. The stream offset is not changed
+
+        :param encodedData_: The encoded data
+        :param encodedDataLen_: The number of encoded bytes
+        :param originalLen_: The number of bytes before compression
+        :param streamOffset_: The position of the data within the stream
+        :return: The decompressed data (bytearray)
+        """
+
+        blockData = bytearray(originalLen_)
+        self.decodeSubStreamInto(encodedData_, encodedDataLen_, blockData, streamOffset_)
+
+        return blockData
+
+    def decodeSubStreamInto(self, encodedData_, encodedDataLen_, outputData_, streamOffset_):
+        """
+        Decode a run of data coded with a freshly reset model straight into outputData_ and undo the filters there
+
+        :param encodedData_: The encoded data
+        :param encodedDataLen_: The number of encoded bytes
+        :param outputData_: Writable buffer (bytearray or memoryview) exactly as long as the data before compression
+        :param streamOffset_: The position of the data within the stream
+        :return: None
+        """
+
+        if(self.mDecoder is None):
+            raise Exception("Stream header not set")
+
+        originalLen = len(outputData_)
+        phase = 0
+
+        if(StreamFormat.hasThumbPhase(self.mFlags, self.mModelFlags)):
+            phase = StreamFormat.unpackThumbPhase(encodedData_)
+            encodedData_ = encodedData_[StreamFormat.THUMB_PHASE_SIZE:encodedDataLen_]
+            encodedDataLen_ -= StreamFormat.THUMB_PHASE_SIZE
+
+        if(self.mFlags & StreamFormat.FLAG_LZ_MATCHES):
+            self.mLZDecoder.reset()
+            decodedLen = self.mLZDecoder.decode(encodedData_, encodedDataLen_, outputData_, originalLen)
+        elif(self.mFlags & StreamFormat.FLAG_REFERENCE_DELTA):
+            self.mDeltaDecoder.reset()
+            decodedLen = self.mDeltaDecoder.decode(encodedData_, encodedDataLen_, outputData_, originalLen, originalLen,
+                                                   streamOffset_)
+        elif(self.mFlags & StreamFormat.FLAG_SEMI_STATIC):
+            decodedLen = self.mSemiStaticDecoder.decode(encodedData_, encodedDataLen_, outputData_, originalLen,
+                                                        originalLen)
+        elif(self.mFlags & StreamFormat.FLAG_CONTEXT_MIXING):
+            decodedLen = self.mMixingDecoder.decode(encodedData_, encodedDataLen_, outputData_, originalLen, originalLen)
+        elif(self.mModelFlags & StreamFormat.MODEL_FLAG_HALFWORD_SYMBOLS):
+            decodedLen = self.mHalfwordDecoder.decode(encodedData_, encodedDataLen_, outputData_, originalLen, originalLen,
+                                                      streamOffset_, phase)
+        else:
+            self.mDecoder.reset()
+            decodedLen = self.mDecoder.decode(encodedData_, encodedDataLen_, outputData_, originalLen)
+
+        if(decodedLen != originalLen):
+            raise Exception("Decoded block length does not match")
+
+        if(self.mFlags & StreamFormat.FLAG_THUMB_FILTER):
+            BranchFilter.thumbBranchDecode(outputData_, decodedLen, streamOffset_, phase)
+
+    def _decompress_record_block(self, encodedData_, encodedDataLen_):
+        """
+        Decompress a block of .dld lines coded with the record aware front end
+
+        :param encodedData_: The encoded data of the block (without the block header)
+        :param encodedDataLen_: The number of encoded bytes
+        :return: The decompressed text (bytearray)
+        """
+
+        self.mRecordDecoder.reset()
+
+        return self.mRecordDecoder.decode(encodedData_, encodedDataLen_)
+
+    def readHeader(self, inputFile_):
+        """
+        Read the stream header (and the adaptation and reference headers if present) from the file and prepare the
+        decoder
+
+        :param inputFile_: Binary file object positioned at the start of the stream
+        :return: None
+        """
+
+        headerData = inputFile_.read(StreamFormat.STREAM_HEADER_SIZE)
+        [wordSize, flags, blockSize, escapeMethod, modelFlags] = StreamFormat.unpackStreamHeader(headerData)
+        headerData += inputFile_.read(StreamFormat.getStreamHeaderSize(flags, modelFlags) - len(headerData))
+
+        self.setHeader(headerData)
+
+    def readBlockData(self, inputFile_):
+        """
+        Read the next block from the file without decompressing it. Only uses the stream header so it can run on the
+        reader thread of decompress while the previous block is decoded
+
+        :param inputFile_: Binary file object positioned at a block header
+        :return: [originalLen, encodedData, checksum] or None once the end of the stream is reached. encodedData is None
+                 for the end marker of a stream with checksums
+        """
+
+        if(self.mEndOfStream):
+            return None
+
+        headerData = inputFile_.read(StreamFormat.getBlockHeaderSize(self.mFlags))
+
+        if(len(headerData) == 0):
+            if(self.mFlags & StreamFormat.FLAG_CHECKSUM):
+                raise Exception("Stream truncated, end marker missing")
+
+            return None
+
+        [originalLen, compressedLen] = StreamFormat.unpackBlockHeader(headerData)
+        checksum = None
+
+        if(self.mFlags & StreamFormat.FLAG_CHECKSUM):
+            checksum = StreamFormat.unpackChecksum(headerData[StreamFormat.BLOCK_HEADER_SIZE:])
+
+            # Nothing after the end marker belongs to the stream, don't read ahead into it
+            if((originalLen == 0) and (compressedLen == 0)):
+                self.mEndOfStream = True
+                return [0, None, checksum]
+
+        encodedData = inputFile_.read(compressedLen)
+
+        if(len(encodedData) != compressedLen):
+            raise Exception("Block data truncated")
+
+        return [originalLen, encodedData, checksum]
+
+    def _decompress_block_data(self, blockData_):
+        """
+        Decompress a block returned by readBlockData
+
+        :param blockData_: [originalLen, encodedData, checksum] or None
+        :return: The decompressed data or None once the end of the stream is reached
+        """
+
+        if(blockData_ is None):
+            return None
+
+        [originalLen, encodedData, checksum] = blockData_
+
+        if(encodedData is None):
+            self.checkStreamChecksum(checksum)
+            return None
+
+        return self.decompressBlock(encodedData, len(encodedData), originalLen, checksum)
+
+    def readBlock(self, inputFile_):
+        """
+        Read the next block from the file and decompress it
+
+        :param inputFile_: Binary file object positioned at a block header
+        :return: The decompressed data or None once the end of the stream is reached
+        """
+
+        return self._decompress_block_data(self.readBlockData(inputFile_))
+
+    def decompress(self, inputFile_, outputFile_):
+        """
+        Decompress the stream read from inputFile_ and write the original data to outputFile_. The next blocks are read
+        and the decompressed ones written on background threads while the current block is decoded
+
+        :param inputFile_: Binary file object holding the compressed stream
+        :param outputFile_: Binary file object the decompressed data is written to
+        :return: The number of bytes decompressed
+        """
+
+        self.readHeader(inputFile_)
+
+        reader = BlockReader(lambda buffer_: self.readBlockData(inputFile_), self.mPipelineDepth)
+        writer = BlockWriter(outputFile_, self.mPipelineDepth)
+
+        try:
+            blockData = self._decompress_block_data(reader.next())
+
+            while(blockData is not None):
+                writer.write(blockData)
+                blockData = self._decompress_block_data(reader.next())
+        finally:
+            reader.close()
+            writer.close()
+
+        return self.mStreamOffset
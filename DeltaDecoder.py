@@ -0,0 +1,151 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement the decoder for data produced by DeltaEncoder. It must be given the same reference image
+that was used for encoding
+"""
+
+import array
+from ContextDecoder import ContextDecoder
+from EscapeEstimator import EscapeEstimator
+from DeltaEncoder import DeltaEncoder
+from ReferenceIndex import ReferenceIndex
+from SymbolModel import SymbolModel
+
+class DeltaDecoder:
+
+    def __init__(self, wordSize_, referenceData_, escapeMethod_=EscapeEstimator.METHOD_C, adaptation_=None):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that was used for encoding
+        :param referenceData_: The reference image used for encoding
+        :param escapeMethod_: How escapes of the literal context model are counted. Must match the encoder
+        :param adaptation_: The AdaptationPolicy of the literal context model. Must match the encoder
+        :return: None
+        """
+
+        self.mDecoder = ContextDecoder(wordSize_, escapeMethod_, adaptation_)
+        self.mReferenceData = array.array("B", referenceData_)
+
+        self.mTokenModels = [SymbolModel(DeltaEncoder.NUM_TOKENS), SymbolModel(DeltaEncoder.NUM_TOKENS)]
+        self.mPrimeModel = SymbolModel(2)
+        self.mCopyLenSlotModel = SymbolModel(DeltaEncoder.VALUE_SLOTS)
+        self.mCopyOffsetSlotModel = SymbolModel(DeltaEncoder.VALUE_SLOTS)
+        self.mCopyLenExtraModels = []
+        self.mCopyOffsetExtraModels = []
+        for i in range(0, DeltaEncoder.VALUE_EXTRA_BYTES):
+            self.mCopyLenExtraModels.append(SymbolModel(256))
+            self.mCopyOffsetExtraModels.append(SymbolModel(256))
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the context model and the token models
+
+        :return: None
+        """
+
+        self.mDecoder.reset()
+
+        for model in self.mTokenModels + self.mCopyLenExtraModels + self.mCopyOffsetExtraModels + \
+                     [self.mPrimeModel, self.mCopyLenSlotModel, self.mCopyOffsetSlotModel]:
+            model.reset()
+
+        self.mLastTokenWasCopy = 0                                             # Selects the token model
+
+    def _decode_token(self):
+        """
+        Decode the token type using the model selected by the previous token
+
+        :return: One of the TOKEN_ values
+        """
+
+        token = self.mDecoder.decodeModelSymbol(self.mTokenModels[self.mLastTokenWasCopy])
+        self.mLastTokenWasCopy = 1 if (token == DeltaEncoder.TOKEN_COPY) else 0
+
+        return token
+
+    def _decode_value(self, slotModel_, extraModels_):
+        """
+        Decode a value sent as its bit length followed by the bits below the top bit
+
+        :param slotModel_: Model for the bit length
+        :param extraModels_: Models for each byte of the remaining bits
+        :return: The decoded value
+        """
+
+        slot = self.mDecoder.decodeModelSymbol(slotModel_)
+
+        if(slot <= 1):
+            return slot
+
+        extraBits = 0
+
+        for i in range(0, ((slot - 1) + 7) // 8):
+            extraBits |= self.mDecoder.decodeModelSymbol(extraModels_[i]) << (8 * i)
+
+        return (1 << (slot - 1)) + extraBits
+
+    def decode(self, encodedData_, encodedDataLen_, decodedData_, maxDecodedDataLen_, originalLen_, startOffset_=0):
+        """
+        Decompress the data passed in. The context model is primed first if the encoder did, it is up-to the caller to
+        reset the decoder if required
+
+        :param encodedData_: The data that needs to be decoded (bytearray)
+        :param encodedDataLen_: The length of data that needs to be decoded
+        :param decodedData_: The decoded data (integer array)
+        :param maxDecodedDataLen_ : The max number of symbols that can be stored in decodedData_ array
+        :param originalLen_: The number of bytes that were encoded. Required to prime the model the same way
+        :param startOffset_: The offset of the data within its image, must match the one used for encoding
+        :return: Returns the number of symbols stored in decodedData_
+        """
+
+        if(len(decodedData_) < maxDecodedDataLen_):
+            raise Exception("Decompressed data byte array passed in smaller than expected")
+
+        self.mDecoder.startDecode(encodedData_, encodedDataLen_)
+
+        if(self.mDecoder.decodeModelSymbol(self.mPrimeModel)):
+            [primeStart, primeEnd] = DeltaEncoder.getPrimeRange(len(self.mReferenceData), startOffset_, originalLen_)
+
+            for i in range(primeStart, primeEnd):
+                self.mDecoder.primeSymbol(self.mReferenceData[i])
+
+        blockLen = ReferenceIndex.BLOCK_LEN
+        expectedOffset = startOffset_
+        decodedLen = 0
+        token = self._decode_token()
+
+        while(token != DeltaEncoder.TOKEN_END):
+            if(token == DeltaEncoder.TOKEN_LITERAL):
+                [currentSymbol, finished] = self.mDecoder.decodeSymbol()
+
+                if(finished or (decodedLen >= maxDecodedDataLen_)):
+                    raise Exception('Not enough space to store decoded data')
+
+                decodedData_[decodedLen] = currentSymbol
+                decodedLen += 1
+                expectedOffset += 1
+            else:
+                copyLen = self._decode_value(self.mCopyLenSlotModel, self.mCopyLenExtraModels) + blockLen
+                offsetValue = self._decode_value(self.mCopyOffsetSlotModel, self.mCopyOffsetExtraModels)
+                offsetDelta = (offsetValue >> 1) if ((offsetValue & 0x01) == 0) else -((offsetValue + 1) >> 1)
+                referenceOffset = expectedOffset + offsetDelta
+
+                if((referenceOffset < 0) or ((referenceOffset + copyLen) > len(self.mReferenceData))):
+                    raise Exception("Invalid copy offset")
+
+                if((decodedLen + copyLen) > maxDecodedDataLen_):
+                    raise Exception('Not enough space to store decoded data')
+
+                decodedData_[decodedLen:decodedLen + copyLen] = self.mReferenceData[referenceOffset:referenceOffset + copyLen]
+                decodedLen += copyLen
+                expectedOffset = referenceOffset + copyLen
+
+                self.mDecoder.setContext(decodedData_[decodedLen - 1])
+
+            token = self._decode_token()
+
+        return decodedLen
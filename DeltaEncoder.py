@@ -0,0 +1,244 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement delta compression of an image against a reference image that the decoder also has (e.g. the
+previous firmware version). Runs shared with the reference are found through a rolling hash ReferenceIndex and sent as
+copy operations. The remaining bytes are coded with the context model. When enough of them equal the reference byte
+they line up with the model is first primed with the part of the reference that lines up with the data being
+compressed, a reference that shares nothing with the data would only skew the statistics. The choice is the first symbol
+of the block
+"""
+
+from ContextEncoder import ContextEncoder
+from EscapeEstimator import EscapeEstimator
+from ReferenceIndex import ReferenceIndex
+from SymbolModel import SymbolModel
+
+class DeltaEncoder:
+    TOKEN_LITERAL = 0
+    TOKEN_COPY = 1
+    TOKEN_END = 2
+    NUM_TOKENS = 3
+
+    VALUE_SLOTS = 33                                                           # Bit length of a coded value, 0 to 32
+    VALUE_EXTRA_BYTES = 4                                                      # Bytes used for the bits below the top value bit
+    PRIME_MATCH_SHARE = 4                                                      # Prime when 1/N of the literals match the reference
+
+    def __init__(self, wordSize_, referenceData_, escapeMethod_=EscapeEstimator.METHOD_C, adaptation_=None):
+        """
+        Initialize the object and index the reference
+
+        :param wordSize_: The word size (bits) that will be used for encoding
+        :param referenceData_: The reference image. The decoder must be given exactly the same data
+        :param escapeMethod_: How escapes of the literal context model are counted, one of the EscapeEstimator.METHOD_ values
+        :param adaptation_: The AdaptationPolicy of the literal context model, None for the default
+        :return: None
+        """
+
+        self.mEncoder = ContextEncoder(wordSize_, escapeMethod_, adaptation_)
+        self.mReferenceIndex = ReferenceIndex(referenceData_)
+        self.mReferenceData = referenceData_
+
+        # Token models are selected by the previous token so runs of literals and of copies are both cheap
+        self.mTokenModels = [SymbolModel(self.NUM_TOKENS), SymbolModel(self.NUM_TOKENS)]
+        self.mPrimeModel = SymbolModel(2)
+        self.mCopyLenSlotModel = SymbolModel(self.VALUE_SLOTS)
+        self.mCopyOffsetSlotModel = SymbolModel(self.VALUE_SLOTS)
+        self.mCopyLenExtraModels = []
+        self.mCopyOffsetExtraModels = []
+        for i in range(0, self.VALUE_EXTRA_BYTES):
+            self.mCopyLenExtraModels.append(SymbolModel(256))
+            self.mCopyOffsetExtraModels.append(SymbolModel(256))
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the context model and the token models
+
+        :return: None
+        """
+
+        self.mEncoder.reset()
+
+        for model in self.mTokenModels + self.mCopyLenExtraModels + self.mCopyOffsetExtraModels + \
+                     [self.mPrimeModel, self.mCopyLenSlotModel, self.mCopyOffsetSlotModel]:
+            model.reset()
+
+        self.mLastTokenWasCopy = 0                                             # Selects the token model
+
+    @staticmethod
+    def getPrimeRange(referenceLen_, startOffset_, dataLen_):
+        """
+        Get the part of the reference used to prime the context model. This is the reference data at the same offset as
+        the data being compressed, moved back if the reference is shorter
+
+        :param referenceLen_: The length of the reference
+        :param startOffset_: The offset of the data being compressed within its image
+        :param dataLen_: The number of bytes being compressed
+        :return: [primeStart, primeEnd]
+        """
+
+        primeStart = max(0, min(startOffset_, referenceLen_ - dataLen_))
+        primeEnd = min(referenceLen_, primeStart + dataLen_)
+
+        return [primeStart, primeEnd]
+
+    def _find_copies(self, dataToEncode_, dataLen_):
+        """
+        Find the runs the data shares with the reference
+
+        :param dataToEncode_: The data that needs to be compressed (integer array)
+        :param dataLen_: The length of data that needs to be compressed
+        :return: List of [copyStart, referenceOffset, copyLen] in the order of the data
+        """
+
+        copies = []
+        blockLen = self.mReferenceIndex.BLOCK_LEN
+        literalStart = 0
+        position = 0
+
+        if(dataLen_ >= blockLen):
+            hashValue = self.mReferenceIndex.hash(dataToEncode_, 0)
+
+        while((position + blockLen) <= dataLen_):
+            [copyStart, referenceOffset, copyLen] = self.mReferenceIndex.findCopy(dataToEncode_, dataLen_, position,
+                                                                                  hashValue, literalStart)
+
+            if(copyLen == 0):
+                if((position + blockLen) < dataLen_):
+                    hashValue = self.mReferenceIndex.roll(hashValue, dataToEncode_[position], dataToEncode_[position + blockLen])
+
+                position += 1
+                continue
+
+            copies.append([copyStart, referenceOffset, copyLen])
+            position = copyStart + copyLen
+            literalStart = position
+
+            if((position + blockLen) <= dataLen_):
+                hashValue = self.mReferenceIndex.hash(dataToEncode_, position)
+
+        return copies
+
+    def _count_literal_matches(self, dataToEncode_, dataLen_, startOffset_, copies_):
+        """
+        Count the bytes left between the copies and how many of them equal the reference byte they line up with, a
+        cheap estimate of whether priming the context model with the reference pays off
+
+        :param dataToEncode_: The data that needs to be compressed (integer array)
+        :param dataLen_: The length of data that needs to be compressed
+        :param startOffset_: The offset of dataToEncode_[0] within its image
+        :param copies_: The copies found by _find_copies
+        :return: [literalCount, matchCount]
+        """
+
+        reference = self.mReferenceData
+        referenceLen = len(reference)
+        literalCount = 0
+        matchCount = 0
+        literalStart = 0
+        expectedOffset = startOffset_
+
+        for [copyStart, referenceOffset, copyLen] in copies_ + [[dataLen_, 0, 0]]:
+            for i in range(literalStart, copyStart):
+                if((expectedOffset < referenceLen) and (dataToEncode_[i] == reference[expectedOffset])):
+                    matchCount += 1
+
+                expectedOffset += 1
+
+            literalCount += copyStart - literalStart
+            literalStart = copyStart + copyLen
+            expectedOffset = referenceOffset + copyLen
+
+        return [literalCount, matchCount]
+
+    def _encode_token(self, token_):
+        """
+        Encode the token type using the model selected by the previous token
+
+        :param token_: One of the TOKEN_ values
+        :return: None
+        """
+
+        self.mEncoder.encodeModelSymbol(token_, self.mTokenModels[self.mLastTokenWasCopy])
+        self.mLastTokenWasCopy = 1 if (token_ == self.TOKEN_COPY) else 0
+
+    def _encode_value(self, value_, slotModel_, extraModels_):
+        """
+        Encode a non-negative value (at most 32 bits) as its bit length followed by the bits below the top bit
+
+        :param value_: The value to encode
+        :param slotModel_: Model for the bit length
+        :param extraModels_: Models for each byte of the remaining bits
+        :return: None
+        """
+
+        slot = value_.bit_length()
+        self.mEncoder.encodeModelSymbol(slot, slotModel_)
+
+        if(slot > 1):
+            extraBits = value_ - (1 << (slot - 1))
+
+            for i in range(0, ((slot - 1) + 7) // 8):
+                self.mEncoder.encodeModelSymbol((extraBits >> (8 * i)) & 0xFF, extraModels_[i])
+
+    def encode(self, dataToEncode_, dataLen_, encodedData_, maxEncodedDataLen_, startOffset_=0):
+        """
+        Encode the data passed in against the reference. The context model is primed if enough of the bytes left
+        between the copies match the reference, it is up-to the caller to reset the encoder if required
+
+        :param dataToEncode_: The data that needs to be compressed (integer array)
+        :param dataLen_: The length of data that needs to be compressed
+        :param encodedData_: The compressed data should be stored in this byte array
+        :param maxEncodedDataLen_ : The max length of compressed data that can be stored in encodedData_
+        :param startOffset_: The offset of dataToEncode_[0] within its image. Used to line the data up with the reference
+        :return: The number of bytes stored in encodedData_
+        """
+
+        if(len(dataToEncode_) < dataLen_):
+            raise Exception("Data byte array passed in smaller than expected")
+
+        copies = self._find_copies(dataToEncode_, dataLen_)
+        [literalCount, matchCount] = self._count_literal_matches(dataToEncode_, dataLen_, startOffset_, copies)
+        prime = (matchCount > 0) and ((matchCount * self.PRIME_MATCH_SHARE) >= literalCount)
+
+        self.mEncoder.startEncode(encodedData_, maxEncodedDataLen_)
+        self.mEncoder.encodeModelSymbol(1 if prime else 0, self.mPrimeModel)
+
+        if(prime):
+            [primeStart, primeEnd] = self.getPrimeRange(len(self.mReferenceData), startOffset_, dataLen_)
+
+            for i in range(primeStart, primeEnd):
+                self.mEncoder.primeSymbol(self.mReferenceData[i])
+
+        blockLen = self.mReferenceIndex.BLOCK_LEN
+        expectedOffset = startOffset_                                          # Reference offset lined up with the current position
+        literalStart = 0
+
+        for [copyStart, referenceOffset, copyLen] in copies:
+            # Bytes between the previous copy and this one are literals
+            for i in range(literalStart, copyStart):
+                self._encode_token(self.TOKEN_LITERAL)
+                self.mEncoder.encodeSymbol(dataToEncode_[i])
+                expectedOffset += 1
+
+            # The offset is sent relative to where the reference would line up if nothing moved (zig-zag for the sign)
+            offsetDelta = referenceOffset - expectedOffset
+            offsetValue = (offsetDelta << 1) if (offsetDelta >= 0) else (((-offsetDelta) << 1) - 1)
+
+            self._encode_token(self.TOKEN_COPY)
+            self._encode_value(copyLen - blockLen, self.mCopyLenSlotModel, self.mCopyLenExtraModels)
+            self._encode_value(offsetValue, self.mCopyOffsetSlotModel, self.mCopyOffsetExtraModels)
+
+            literalStart = copyStart + copyLen
+            expectedOffset = referenceOffset + copyLen
+            self.mEncoder.setContext(dataToEncode_[literalStart - 1])
+
+        for i in range(literalStart, dataLen_):
+            self._encode_token(self.TOKEN_LITERAL)
+            self.mEncoder.encodeSymbol(dataToEncode_[i])
+
+        self._encode_token(self.TOKEN_END)
+
+        return self.mEncoder.finishEncode(False)
@@ -0,0 +1,193 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement the record aware decoder for .dld download files. It mirrors DldRecordEncoder and recreates
+the upper case hex text of every line, lines coded as raw text are copied out as they were
+"""
+
+import BranchFilter
+from ContextDecoder import ContextDecoder
+from EscapeEstimator import EscapeEstimator
+from DldRecordEncoder import DldRecordEncoder
+from SymbolModel import SymbolModel
+
+class DldRecordDecoder:
+
+    def __init__(self, wordSize_, thumbFilter_=False, escapeMethod_=EscapeEstimator.METHOD_C, adaptation_=None):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that was used for encoding
+        :param thumbFilter_: If True the payload was passed through the ARM Thumb branch filter
+        :param escapeMethod_: How escapes of the payload context model are counted. Must match the encoder
+        :param adaptation_: The AdaptationPolicy of the payload context model. Must match the encoder
+        :return: None
+        """
+
+        self.mDecoder = ContextDecoder(wordSize_, escapeMethod_, adaptation_)
+        self.mThumbFilter = thumbFilter_
+
+        self.mLineKindModel = SymbolModel(4)
+        self.mLineEndingModel = SymbolModel(3)
+        self.mLineTypeModel = SymbolModel(256)
+        self.mLineTagModel = SymbolModel(256)
+        self.mRecordCountModel = SymbolModel(DldRecordEncoder.MAX_RECORDS_PER_LINE + 1)
+        self.mCountFieldFlagModel = SymbolModel(2)
+        self.mCountFieldModels = [SymbolModel(256), SymbolModel(256)]
+        self.mRecordTypeModel = SymbolModel(len(DldRecordEncoder.RECORD_ADDRESS_SIZES))
+        self.mByteCountModel = SymbolModel(256)
+        self.mAddressFlagModel = SymbolModel(2)
+        self.mAddressDeltaModels = [SymbolModel(256), SymbolModel(256), SymbolModel(256), SymbolModel(256)]
+        self.mChecksumFlagModel = SymbolModel(2)
+        self.mChecksumModel = SymbolModel(256)
+        self.mHexLengthModels = [SymbolModel(256), SymbolModel(256), SymbolModel(256)]
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the context model and all the header models
+
+        :return: None
+        """
+
+        self.mDecoder.reset()
+
+        for model in [self.mLineKindModel, self.mLineEndingModel, self.mLineTypeModel, self.mLineTagModel,
+                      self.mRecordCountModel, self.mCountFieldFlagModel, self.mRecordTypeModel, self.mByteCountModel,
+                      self.mAddressFlagModel, self.mChecksumFlagModel, self.mChecksumModel] + \
+                     self.mCountFieldModels + self.mAddressDeltaModels + self.mHexLengthModels:
+            model.reset()
+
+        self.mExpectedAddress = 0                                              # Address following the previous record
+
+    def _decode_payload(self, payloadLen_):
+        """
+        Decode payloadLen_ symbols through the context model
+
+        :param payloadLen_: The number of symbols to decode
+        :return: List of decoded symbols
+        """
+
+        payload = []
+
+        for i in range(0, payloadLen_):
+            [currentSymbol, finished] = self.mDecoder.decodeSymbol()
+
+            if(finished):
+                raise Exception("Unexpected termination symbol")
+
+            payload.append(currentSymbol)
+
+        return payload
+
+    def _decode_line_records(self):
+        """
+        Decode the line header and every S-record of a parsed line
+
+        :return: The binary data of the line (bytearray)
+        """
+
+        lineData = bytearray()
+        lineData.append(self.mDecoder.decodeModelSymbol(self.mLineTypeModel))
+        lineData.append(self.mDecoder.decodeModelSymbol(self.mLineTagModel))
+        recordCount = self.mDecoder.decodeModelSymbol(self.mRecordCountModel)
+
+        if(self.mDecoder.decodeModelSymbol(self.mCountFieldFlagModel) == 1):
+            lineData.append(recordCount & 0xFF)
+            lineData.append((recordCount >> 8) & 0xFF)
+        else:
+            lineData.append(self.mDecoder.decodeModelSymbol(self.mCountFieldModels[0]))
+            lineData.append(self.mDecoder.decodeModelSymbol(self.mCountFieldModels[1]))
+
+        for i in range(0, recordCount):
+            recordType = self.mDecoder.decodeModelSymbol(self.mRecordTypeModel)
+            byteCount = self.mDecoder.decodeModelSymbol(self.mByteCountModel)
+            addressSize = DldRecordEncoder.RECORD_ADDRESS_SIZES[recordType]
+
+            if(self.mDecoder.decodeModelSymbol(self.mAddressFlagModel) == 1):
+                address = self.mExpectedAddress
+            else:
+                addressDelta = 0
+
+                for j in range(0, len(self.mAddressDeltaModels)):
+                    addressDelta |= self.mDecoder.decodeModelSymbol(self.mAddressDeltaModels[j]) << (8 * j)
+
+                address = (self.mExpectedAddress + addressDelta) & 0xFFFFFFFF
+
+            payloadLen = byteCount - addressSize - 1
+            payload = self._decode_payload(payloadLen)
+
+            if(self.mThumbFilter):
+                BranchFilter.thumbBranchDecode(payload, payloadLen, address)
+
+            record = bytes([byteCount]) + address.to_bytes(addressSize, 'big') + bytes(payload)
+
+            if(self.mDecoder.decodeModelSymbol(self.mChecksumFlagModel) == 1):
+                checksum = DldRecordEncoder.calculateChecksum(record)
+            else:
+                checksum = self.mDecoder.decodeModelSymbol(self.mChecksumModel)
+
+            lineData.append(DldRecordEncoder.RECORD_START)
+            lineData.append(recordType)
+            lineData.extend(record)
+            lineData.append(checksum)
+
+            self.mExpectedAddress = (address + payloadLen) & 0xFFFFFFFF
+
+        return lineData
+
+    def _decode_line_hex(self):
+        """
+        Decode a hex line that does not hold S-records
+
+        :return: The binary data of the line (bytearray)
+        """
+
+        lineLen = 0
+
+        for i in range(0, len(self.mHexLengthModels)):
+            lineLen |= self.mDecoder.decodeModelSymbol(self.mHexLengthModels[i]) << (8 * i)
+
+        return bytearray(self._decode_payload(lineLen))
+
+    def _decode_line_raw(self):
+        """
+        Decode a line that was coded as raw text
+
+        :return: The text of the line without the line ending (bytearray)
+        """
+
+        return self._decode_line_hex()
+
+    def decode(self, encodedData_, encodedDataLen_):
+        """
+        Decode the data produced by DldRecordEncoder. Statistics are not reset, it is up-to the caller to reset the
+        decoder if required
+
+        :param encodedData_: The data that needs to be decoded (bytearray)
+        :param encodedDataLen_: The length of data that needs to be decoded
+        :return: The .dld text (bytearray)
+        """
+
+        self.mDecoder.startDecode(encodedData_, encodedDataLen_)
+
+        textData = bytearray()
+        lineKind = self.mDecoder.decodeModelSymbol(self.mLineKindModel)
+
+        while(lineKind != DldRecordEncoder.LINE_END):
+            if(lineKind == DldRecordEncoder.LINE_RECORDS):
+                lineText = self._decode_line_records().hex().upper().encode('ascii')
+            elif(lineKind == DldRecordEncoder.LINE_HEX):
+                lineText = self._decode_line_hex().hex().upper().encode('ascii')
+            else:
+                lineText = self._decode_line_raw()
+
+            lineEnding = self.mDecoder.decodeModelSymbol(self.mLineEndingModel)
+
+            textData.extend(lineText)
+            textData.extend(DldRecordEncoder.LINE_ENDINGS[lineEnding])
+
+            lineKind = self.mDecoder.decodeModelSymbol(self.mLineKindModel)
+
+        return textData
@@ -0,0 +1,268 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement a record aware encoder for .dld download files. Each line of the file is a hex encoded
+record made of a 4 byte line header (type, tag, record count) followed by S-records (S, type, byte count, address,
+payload, checksum). The header fields are coded with their own small models, addresses as deltas from the end of the
+previous record and checksums as a single flag, so only the payload goes through the context model. Lines that are not
+upper case hex (lower case, stray characters) are coded as raw text so any file can be compressed.
+"""
+
+import BranchFilter
+from ContextEncoder import ContextEncoder
+from EscapeEstimator import EscapeEstimator
+from SymbolModel import SymbolModel
+
+class DldRecordEncoder:
+    LINE_RECORDS = 0                                                           # Line parsed into S-records
+    LINE_HEX = 1                                                               # Hex line that does not hold S-records
+    LINE_END = 2                                                               # No more lines in the block
+    LINE_RAW = 3                                                               # Line that is not upper case hex, coded as its text
+
+    LINE_ENDING_CRLF = 0
+    LINE_ENDING_LF = 1
+    LINE_ENDING_NONE = 2
+
+    LINE_ENDINGS = [b'\r\n', b'\n', b'']
+
+    RECORD_START = 0x53                                                        # 'S' marks the start of every record
+    RECORD_ADDRESS_SIZES = [2, 2, 3, 4, 0, 2, 3, 4, 3, 2]                      # Address bytes for record types S0-S9 (S4 is reserved)
+    MAX_RECORDS_PER_LINE = 255
+
+    def __init__(self, wordSize_, thumbFilter_=False, escapeMethod_=EscapeEstimator.METHOD_C, adaptation_=None):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that will be used for encoding
+        :param thumbFilter_: If True convert ARM Thumb branch targets in the payload using the record addresses
+        :param escapeMethod_: How escapes of the payload context model are counted, one of the EscapeEstimator.METHOD_ values
+        :param adaptation_: The AdaptationPolicy of the payload context model, None for the default
+        :return: None
+        """
+
+        self.mEncoder = ContextEncoder(wordSize_, escapeMethod_, adaptation_)
+        self.mThumbFilter = thumbFilter_
+
+        self.mLineKindModel = SymbolModel(4)
+        self.mLineEndingModel = SymbolModel(3)
+        self.mLineTypeModel = SymbolModel(256)
+        self.mLineTagModel = SymbolModel(256)
+        self.mRecordCountModel = SymbolModel(self.MAX_RECORDS_PER_LINE + 1)
+        self.mCountFieldFlagModel = SymbolModel(2)
+        self.mCountFieldModels = [SymbolModel(256), SymbolModel(256)]
+        self.mRecordTypeModel = SymbolModel(len(self.RECORD_ADDRESS_SIZES))
+        self.mByteCountModel = SymbolModel(256)
+        self.mAddressFlagModel = SymbolModel(2)
+        self.mAddressDeltaModels = [SymbolModel(256), SymbolModel(256), SymbolModel(256), SymbolModel(256)]
+        self.mChecksumFlagModel = SymbolModel(2)
+        self.mChecksumModel = SymbolModel(256)
+        self.mHexLengthModels = [SymbolModel(256), SymbolModel(256), SymbolModel(256)]
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the context model and all the header models
+
+        :return: None
+        """
+
+        self.mEncoder.reset()
+
+        for model in [self.mLineKindModel, self.mLineEndingModel, self.mLineTypeModel, self.mLineTagModel,
+                      self.mRecordCountModel, self.mCountFieldFlagModel, self.mRecordTypeModel, self.mByteCountModel,
+                      self.mAddressFlagModel, self.mChecksumFlagModel, self.mChecksumModel] + \
+                     self.mCountFieldModels + self.mAddressDeltaModels + self.mHexLengthModels:
+            model.reset()
+
+        self.mExpectedAddress = 0                                              # Address following the previous record
+
+    @staticmethod
+    def calculateChecksum(record_):
+        """
+        Calculate the S-record checksum: ones' complement of the sum of the byte count, address and payload bytes
+
+        :param record_: The record bytes starting with the byte count and excluding the checksum
+        :return: The checksum byte
+        """
+
+        return (~sum(record_)) & 0xFF
+
+    def parseRecords(self, lineData_):
+        """
+        Split the binary line into S-records. Returns None if the line does not follow the record structure
+
+        :param lineData_: The binary data of one line
+        :return: List of [recordType, byteCount, address, payload, checksum] or None
+        """
+
+        records = []
+        position = 4
+
+        if(len(lineData_) < position):
+            return None
+
+        while(position < len(lineData_)):
+            if((position + 3) > len(lineData_)):
+                return None
+
+            if((lineData_[position] != self.RECORD_START) or (lineData_[position + 1] >= len(self.RECORD_ADDRESS_SIZES))):
+                return None
+
+            recordType = lineData_[position + 1]
+            byteCount = lineData_[position + 2]
+            addressSize = self.RECORD_ADDRESS_SIZES[recordType]
+
+            # The byte count covers the address, the payload and the checksum
+            if((addressSize == 0) or (byteCount < (addressSize + 1)) or ((position + 3 + byteCount) > len(lineData_))):
+                return None
+
+            addressStart = position + 3
+            payloadStart = addressStart + addressSize
+            checksumPosition = position + 2 + byteCount
+
+            address = int.from_bytes(lineData_[addressStart:payloadStart], 'big')
+            records.append([recordType, byteCount, address, lineData_[payloadStart:checksumPosition], lineData_[checksumPosition]])
+
+            position = checksumPosition + 1
+
+        if(len(records) > self.MAX_RECORDS_PER_LINE):
+            return None
+
+        return records
+
+    def _encode_line_records(self, lineData_, records_):
+        """
+        Encode the line header and every S-record of a parsed line
+
+        :param lineData_: The binary data of the line
+        :param records_: The records returned by parseRecords
+        :return: None
+        """
+
+        self.mEncoder.encodeModelSymbol(lineData_[0], self.mLineTypeModel)
+        self.mEncoder.encodeModelSymbol(lineData_[1], self.mLineTagModel)
+        self.mEncoder.encodeModelSymbol(len(records_), self.mRecordCountModel)
+
+        # The count field normally holds the number of records in the line, only send it when it doesn't
+        countField = lineData_[2] | (lineData_[3] << 8)
+
+        if(countField == len(records_)):
+            self.mEncoder.encodeModelSymbol(1, self.mCountFieldFlagModel)
+        else:
+            self.mEncoder.encodeModelSymbol(0, self.mCountFieldFlagModel)
+            self.mEncoder.encodeModelSymbol(lineData_[2], self.mCountFieldModels[0])
+            self.mEncoder.encodeModelSymbol(lineData_[3], self.mCountFieldModels[1])
+
+        for [recordType, byteCount, address, payload, checksum] in records_:
+            addressSize = self.RECORD_ADDRESS_SIZES[recordType]
+
+            self.mEncoder.encodeModelSymbol(recordType, self.mRecordTypeModel)
+            self.mEncoder.encodeModelSymbol(byteCount, self.mByteCountModel)
+
+            # Records normally follow each other so only send the address when it is not where the last one ended
+            if(address == self.mExpectedAddress):
+                self.mEncoder.encodeModelSymbol(1, self.mAddressFlagModel)
+            else:
+                self.mEncoder.encodeModelSymbol(0, self.mAddressFlagModel)
+                addressDelta = (address - self.mExpectedAddress) & 0xFFFFFFFF
+
+                for i in range(0, len(self.mAddressDeltaModels)):
+                    self.mEncoder.encodeModelSymbol((addressDelta >> (8 * i)) & 0xFF, self.mAddressDeltaModels[i])
+
+            payloadToEncode = list(payload)
+
+            if(self.mThumbFilter):
+                BranchFilter.thumbBranchEncode(payloadToEncode, len(payloadToEncode), address)
+
+            for symbol in payloadToEncode:
+                self.mEncoder.encodeSymbol(symbol)
+
+            if(checksum == self.calculateChecksum(bytes([byteCount]) + address.to_bytes(addressSize, 'big') + payload)):
+                self.mEncoder.encodeModelSymbol(1, self.mChecksumFlagModel)
+            else:
+                self.mEncoder.encodeModelSymbol(0, self.mChecksumFlagModel)
+                self.mEncoder.encodeModelSymbol(checksum, self.mChecksumModel)
+
+            self.mExpectedAddress = (address + len(payload)) & 0xFFFFFFFF
+
+    def _encode_line_hex(self, lineData_):
+        """
+        Encode a hex line that does not hold S-records. The length is sent followed by the data
+
+        :param lineData_: The binary data of the line
+        :return: None
+        """
+
+        if(len(lineData_) >= (1 << (8 * len(self.mHexLengthModels)))):
+            raise Exception("Line too long")
+
+        for i in range(0, len(self.mHexLengthModels)):
+            self.mEncoder.encodeModelSymbol((len(lineData_) >> (8 * i)) & 0xFF, self.mHexLengthModels[i])
+
+        for symbol in lineData_:
+            self.mEncoder.encodeSymbol(symbol)
+
+    def _encode_line_raw(self, lineText_):
+        """
+        Encode a line that is not upper case hex. The length is sent followed by the text
+
+        :param lineText_: The text of the line without the line ending
+        :return: None
+        """
+
+        self._encode_line_hex(lineText_)
+
+    def encode(self, textData_, textLen_, encodedData_, maxEncodedDataLen_):
+        """
+        Encode the .dld text passed in. Lines are terminated by CRLF or LF (the last line may be unterminated), those
+        that are not upper case hex are coded as raw text. Statistics are not reset, it is up-to the caller to reset the encoder if required
+
+        :param textData_: The .dld file text (bytes)
+        :param textLen_: The number of bytes of text to encode
+        :param encodedData_: The compressed data should be stored in this byte array
+        :param maxEncodedDataLen_ : The max length of compressed data that can be stored in encodedData_
+        :return: The number of bytes stored in encodedData_
+        """
+
+        if(len(textData_) < textLen_):
+            raise Exception("Data byte array passed in smaller than expected")
+
+        self.mEncoder.startEncode(encodedData_, maxEncodedDataLen_)
+
+        for line in bytes(textData_[:textLen_]).splitlines(True):
+            lineEnding = self.LINE_ENDING_NONE
+
+            if(line.endswith(b'\r\n')):
+                lineEnding = self.LINE_ENDING_CRLF
+            elif(line.endswith(b'\n')):
+                lineEnding = self.LINE_ENDING_LF
+
+            lineText = line[:len(line) - len(self.LINE_ENDINGS[lineEnding])]
+
+            try:
+                lineData = bytes.fromhex(lineText.decode('ascii'))
+            except ValueError:
+                lineData = None
+
+            # The decoder recreates the text from the binary data so only canonical lines can be coded as hex
+            if((lineData is None) or (lineData.hex().upper().encode('ascii') != lineText)):
+                self.mEncoder.encodeModelSymbol(self.LINE_RAW, self.mLineKindModel)
+                self._encode_line_raw(lineText)
+                self.mEncoder.encodeModelSymbol(lineEnding, self.mLineEndingModel)
+                continue
+
+            records = self.parseRecords(lineData)
+
+            if(records is not None):
+                self.mEncoder.encodeModelSymbol(self.LINE_RECORDS, self.mLineKindModel)
+                self._encode_line_records(lineData, records)
+            else:
+                self.mEncoder.encodeModelSymbol(self.LINE_HEX, self.mLineKindModel)
+                self._encode_line_hex(lineData)
+
+            self.mEncoder.encodeModelSymbol(lineEnding, self.mLineEndingModel)
+
+        self.mEncoder.encodeModelSymbol(self.LINE_END, self.mLineKindModel)
+
+        return self.mEncoder.finishEncode(False)
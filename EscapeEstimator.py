@@ -0,0 +1,205 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class decides how the escape symbol of the zero and first order tables is counted. The escape is always the last
+entry of a table, the estimator sets its count and the counts given to symbols when they are seen. Both ContextEncoder
+and ContextDecoder hold one, so every table update must go through it on both sides. Tables are created by the estimator
+as well, the escape entry also holds the max total of the table and the epoch it was last aged in (see
+AdaptationPolicy).
+
+    METHOD_A: The escape keeps a count of 1. Cheap escapes only while a context holds few symbols
+    METHOD_C: The escape count is the number of distinct symbols in the table (plus the initial 1)
+    METHOD_D: As METHOD_C but symbols count 2 for every occurrence after the first, so a context that keeps producing new
+              symbols escapes cheaply while a settled one wastes little code space on the escape
+    METHOD_X: Secondary escape estimation. The escape probability is learnt from how often tables with a similar number
+              of distinct symbols and total count escaped before, symbols are counted as in METHOD_D
+"""
+
+from AdaptationPolicy import AdaptationPolicy
+
+class EscapeEstimator:
+    ESCAPE_SYMBOL = -1
+    METHOD_A = 0
+    METHOD_C = 1
+    METHOD_D = 2
+    METHOD_X = 3
+    METHOD_NAMES = ['A', 'C', 'D', 'X']
+
+    SEE_DISTINCT_BUCKETS = 8                                                   # Tables are grouped by distinct symbols (capped)
+    SEE_TOTAL_BUCKETS = 12                                                     # and by the bit length of their symbol count (capped)
+    SEE_LIMIT = 256                                                            # Escape statistics are halved once they reach this total
+
+    def __init__(self, method_, maxCount_, adaptation_=None):
+        """
+        Initialize the object
+
+        :param method_: One of the METHOD_ values
+        :param maxCount_: The largest total count the word size allows. Tables are normalized once their total count
+               reaches the max total of their level, which is at most this value
+        :param adaptation_: The AdaptationPolicy deciding the max totals and how tables are aged, None for the default
+        :return: None
+        """
+
+        if(method_ not in [self.METHOD_A, self.METHOD_C, self.METHOD_D, self.METHOD_X]):
+            raise Exception("Invalid escape method specified")
+
+        self.mMethod = method_
+        self.mMaxCount = maxCount_
+        self.mAdaptation = adaptation_ if (adaptation_ is not None) else AdaptationPolicy()
+        self.mMaxCounts = self.mAdaptation.getMaxCounts(maxCount_)
+        self.mSymbolIncrement = 2 if (method_ in [self.METHOD_D, self.METHOD_X]) else 1
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the learnt escape statistics
+
+        :return: None
+        """
+
+        bucketCount = 2 * self.SEE_DISTINCT_BUCKETS * self.SEE_TOTAL_BUCKETS
+
+        self.mEscapes = [1] * bucketCount
+        self.mMisses = [1] * bucketCount
+        self.mBucket = -1                                                          # Bucket of the last prepared table, -1 if none
+        self.mUpdateCount = 0                                                      # Table updates so far, the clock of the aging epochs
+
+    def createTable(self, order_):
+        """
+        Create an empty table holding only the escape
+
+        :param order_: The order of the table (0 or 1)
+        :return: The new table, its total count is 1
+        """
+
+        return [[self.ESCAPE_SYMBOL, 1, self.mMaxCounts[order_], self.mUpdateCount >> self.mAdaptation.mEpochBits]]
+
+    def _normalize_stats(self, symbolTable_):
+        """
+        Age a table that reached its max total, keeping each count at least 1
+
+        :param symbolTable_: The table to normalize
+        :return: The new total count of the table
+        """
+
+        return self.mAdaptation.normalizeTable(symbolTable_, symbolTable_[-1][2])
+
+    def _catch_up(self, symbolTable_, totalCount_):
+        """
+        Advance the epoch clock for a table update and age the table for the epochs that went by since it was last aged
+
+        :param symbolTable_: The table about to be updated
+        :param totalCount_: The total count of the table
+        :return: The new total count of the table
+        """
+
+        if(self.mAdaptation.mEpochBits == 0):
+            return totalCount_
+
+        self.mUpdateCount += 1
+        epoch = self.mUpdateCount >> self.mAdaptation.mEpochBits
+        escape = symbolTable_[-1]
+
+        if(escape[3] == epoch):
+            return totalCount_
+
+        epochs = epoch - escape[3]
+        escape[3] = epoch
+
+        return self.mAdaptation.ageTable(symbolTable_, epochs)
+
+    def countSymbol(self, symbolIndex_, symbolTable_, totalCount_):
+        """
+        Update the table for another occurrence of a symbol it already holds
+
+        :param symbolIndex_: The index of the symbol in the table
+        :param symbolTable_: The table to update
+        :param totalCount_: The total count of the table
+        :return: The new total count of the table
+        """
+
+        totalCount_ = self._catch_up(symbolTable_, totalCount_)
+        symbolTable_[symbolIndex_][1] += self.mSymbolIncrement
+        totalCount_ += self.mSymbolIncrement
+
+        if(totalCount_ >= symbolTable_[-1][2]):
+            totalCount_ = self._normalize_stats(symbolTable_)
+
+        return totalCount_
+
+    def addSymbol(self, symbol_, symbolTable_, totalCount_):
+        """
+        Add a symbol the table escaped for. It is inserted in front of the escape
+
+        :param symbol_: The new symbol
+        :param symbolTable_: The table to update
+        :param totalCount_: The total count of the table
+        :return: The new total count of the table
+        """
+
+        totalCount_ = self._catch_up(symbolTable_, totalCount_)
+        symbolTable_.insert(len(symbolTable_) - 1, [symbol_, 1])
+        totalCount_ += 1
+
+        if(self.mMethod != self.METHOD_A):
+            symbolTable_[-1][1] += 1
+            totalCount_ += 1
+
+        if(totalCount_ >= symbolTable_[-1][2]):
+            totalCount_ = self._normalize_stats(symbolTable_)
+
+        return totalCount_
+
+    def prepareEscape(self, symbolTable_, totalCount_, order_):
+        """
+        Set the escape count of a table before a symbol is coded with it. Only METHOD_X changes the table, every
+        prepared table must be followed by updateEscape once it is known whether the escape was coded
+
+        :param symbolTable_: The table about to be used
+        :param totalCount_: The total count of the table
+        :param order_: The order of the table (0 or 1)
+        :return: The new total count of the table
+        """
+
+        if(self.mMethod != self.METHOD_X):
+            return totalCount_
+
+        symbolsCount = totalCount_ - symbolTable_[-1][1]
+
+        # An empty table always escapes, nothing to learn
+        if(symbolsCount == 0):
+            self.mBucket = -1
+            return totalCount_
+
+        distinctBucket = min(len(symbolTable_) - 1, self.SEE_DISTINCT_BUCKETS - 1)
+        totalBucket = min(symbolsCount.bit_length(), self.SEE_TOTAL_BUCKETS - 1)
+        self.mBucket = (((order_ * self.SEE_DISTINCT_BUCKETS) + distinctBucket) * self.SEE_TOTAL_BUCKETS) + totalBucket
+
+        # Pick the escape count that gives the learnt escape probability escapes / (escapes + misses)
+        escapeCount = (symbolsCount * self.mEscapes[self.mBucket]) // self.mMisses[self.mBucket]
+        escapeCount = max(1, min(escapeCount, symbolTable_[-1][2] - 1 - symbolsCount))
+        symbolTable_[-1][1] = escapeCount
+
+        return symbolsCount + escapeCount
+
+    def updateEscape(self, escaped_):
+        """
+        Learn from the outcome of the last prepared table
+
+        :param escaped_: True if the escape was coded
+        :return: None
+        """
+
+        if((self.mMethod != self.METHOD_X) or (self.mBucket < 0)):
+            return
+
+        if(escaped_):
+            self.mEscapes[self.mBucket] += 1
+        else:
+            self.mMisses[self.mBucket] += 1
+
+        if((self.mEscapes[self.mBucket] + self.mMisses[self.mBucket]) >= self.SEE_LIMIT):
+            self.mEscapes[self.mBucket] = max(1, self.mEscapes[self.mBucket] // 2)
+            self.mMisses[self.mBucket] = max(1, self.mMisses[self.mBucket] // 2)
+
+        self.mBucket = -1
@@ -0,0 +1,216 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class holds the counts of a sparse set of symbols taken from a large alphabet (e.g. the 65536 halfwords coded by
+HalfwordEncoder) followed by an escape. Symbols are found through a dictionary and the cumulative counts are kept in a
+binary indexed (Fenwick) tree, so finding the range of a symbol, updating its count and finding the symbol a cumulative
+count falls on all take O(log n) for a table holding n symbols instead of a walk over the table.
+
+The escape takes the top of the range and counts the number of distinct symbols plus 1 (PPM method C). Once the total
+reaches the max count every count is halved, symbols whose count drops to 0 are removed so the table never holds more
+symbols than the coder can give a range to
+"""
+
+class FrequencyTable:
+    INITIAL_CAPACITY = 4                                                       # Slots of a new table, doubled whenever it fills up
+
+    def __init__(self, maxCount_):
+        """
+        Initialize the object
+
+        :param maxCount_: The table is normalized once its total count (including the escape) reaches this value
+        :return: None
+        """
+
+        if(maxCount_ < 4):
+            raise Exception("Invalid max count specified")
+
+        self.mMaxCount = maxCount_
+        self.reset()
+
+    def reset(self):
+        """
+        Remove every symbol from the table
+
+        :return: None
+        """
+
+        self.mSlots = {}                                                           # Symbol to slot
+        self.mSymbols = []                                                         # Slot to symbol
+        self.mCounts = []                                                          # Slot to count
+        self.mCapacity = self.INITIAL_CAPACITY                                     # Slots covered by the tree, a power of 2
+        self.mTree = [0] * (self.mCapacity + 1)                                    # Fenwick tree over mCounts, 1 based
+        self.mSymbolTotal = 0                                                      # Total count of the symbols, without the escape
+
+    def _build_tree(self):
+        """
+        Rebuild the tree from mCounts in O(n)
+
+        :return: None
+        """
+
+        tree = [0] * (self.mCapacity + 1)
+        tree[1:len(self.mCounts) + 1] = self.mCounts
+
+        # Every node passes its sum on to its parent, the empty slots above the last symbol included
+        for index in range(1, self.mCapacity + 1):
+            parent = index + (index & -index)
+
+            if(parent <= self.mCapacity):
+                tree[parent] += tree[index]
+
+        self.mTree = tree
+
+    def _add_to_slot(self, slot_, amount_):
+        """
+        Change the count of a slot
+
+        :param slot_: The slot
+        :param amount_: The amount added to its count
+        :return: None
+        """
+
+        self.mCounts[slot_] += amount_
+        self.mSymbolTotal += amount_
+        tree = self.mTree
+        capacity = self.mCapacity
+        index = slot_ + 1
+
+        while(index <= capacity):
+            tree[index] += amount_
+            index += index & -index
+
+    def _normalize_stats(self):
+        """
+        Halve every count and remove the symbols whose count drops to 0
+
+        :return: None
+        """
+
+        symbols = []
+        counts = []
+
+        for slot in range(0, len(self.mSymbols)):
+            count = self.mCounts[slot] // 2
+
+            if(count > 0):
+                symbols.append(self.mSymbols[slot])
+                counts.append(count)
+
+        self.mSymbols = symbols
+        self.mCounts = counts
+        self.mSlots = dict([[symbols[slot], slot] for slot in range(0, len(symbols))])
+        self.mSymbolTotal = sum(counts)
+        self._build_tree()
+
+    def getTotal(self):
+        """
+        Get the total count of the table, the escape included
+
+        :return: The total count
+        """
+
+        return self.mSymbolTotal + len(self.mSymbols) + 1
+
+    def getSymbolCount(self):
+        """
+        Get the number of distinct symbols in the table
+
+        :return: The number of symbols
+        """
+
+        return len(self.mSymbols)
+
+    def getSymbolRange(self, symbol_):
+        """
+        Get the cumulative count range of a symbol
+
+        :param symbol_: The symbol
+        :return: [low, high] or None if the symbol is not in the table
+        """
+
+        slot = self.mSlots.get(symbol_)
+
+        if(slot is None):
+            return None
+
+        low = 0
+        tree = self.mTree
+        index = slot
+
+        while(index > 0):
+            low += tree[index]
+            index &= index - 1
+
+        return [low, low + self.mCounts[slot]]
+
+    def getEscapeRange(self):
+        """
+        Get the cumulative count range of the escape
+
+        :return: [low, high]
+        """
+
+        return [self.mSymbolTotal, self.getTotal()]
+
+    def findSymbol(self, count_):
+        """
+        Find the symbol whose range holds a cumulative count
+
+        :param count_: The cumulative count (0 to getTotal() - 1)
+        :return: [symbol, low, high] symbol is None if the count falls on the escape
+        """
+
+        if(count_ >= self.mSymbolTotal):
+            return [None, self.mSymbolTotal, self.getTotal()]
+
+        tree = self.mTree
+        index = 0
+        remaining = count_
+        step = self.mCapacity
+
+        # Walk down the tree to the last slot whose cumulative count does not exceed count_
+        while(step > 0):
+            if(tree[index + step] <= remaining):
+                index += step
+                remaining -= tree[index]
+
+            step >>= 1
+
+        low = count_ - remaining
+
+        return [self.mSymbols[index], low, low + self.mCounts[index]]
+
+    def countSymbol(self, symbol_, increment_=1):
+        """
+        Update the table for another occurrence of a symbol it holds
+
+        :param symbol_: The symbol
+        :param increment_: The amount added to its count
+        :return: None
+        """
+
+        self._add_to_slot(self.mSlots[symbol_], increment_)
+
+        if(self.getTotal() >= self.mMaxCount):
+            self._normalize_stats()
+
+    def addSymbol(self, symbol_):
+        """
+        Add a symbol the table escaped for with a count of 1
+
+        :param symbol_: The new symbol
+        :return: None
+        """
+
+        if(len(self.mSymbols) == self.mCapacity):
+            self.mCapacity *= 2
+            self._build_tree()
+
+        self.mSlots[symbol_] = len(self.mSymbols)
+        self.mSymbols.append(symbol_)
+        self.mCounts.append(0)
+        self._add_to_slot(len(self.mSymbols) - 1, 1)
+
+        if(self.getTotal() >= self.mMaxCount):
+            self._normalize_stats()
@@ -0,0 +1,141 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement the decoder of HalfwordEncoder. The tables are updated exactly as the encoder updates them,
+the symbol a cumulative count falls on is found through the tree of each FrequencyTable
+"""
+
+from ContextDecoder import ContextDecoder
+from FrequencyTable import FrequencyTable
+from HalfwordEncoder import HalfwordEncoder
+from SymbolModel import SymbolModel
+
+class HalfwordDecoder:
+
+    def __init__(self, wordSize_):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that was used for encoding
+        :return: None
+        """
+
+        self.mDecoder = ContextDecoder(wordSize_)
+
+        if(self.mDecoder.mMaxDecodingBytes < HalfwordEncoder.MIN_MAX_COUNT):
+            raise Exception("Word size too small for halfword symbols")
+
+        self.mLowByteModel = SymbolModel(256)
+        self.mHighByteModel = SymbolModel(256)
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the decoder and every table
+
+        :return: None
+        """
+
+        self.mDecoder.reset()
+        self.mLowByteModel.reset()
+        self.mHighByteModel.reset()
+        self.mZeroOrderTable = FrequencyTable(self.mDecoder.mMaxDecodingBytes)
+        self.mFirstOrderTables = {}                                                # Previous halfword to its FrequencyTable
+
+    def _decode_from_table(self, table_):
+        """
+        Decode a halfword or the escape with a table. Must mirror HalfwordEncoder._encode_from_table
+
+        :param table_: The FrequencyTable
+        :return: The halfword, None if the escape was decoded
+        """
+
+        if(table_.getSymbolCount() == 0):
+            return None
+
+        totalCount = table_.getTotal()
+        [symbol, low, high] = table_.findSymbol(self.mDecoder.getCumulativeCount(totalCount))
+        self.mDecoder.decodeRange(low, high, totalCount)
+
+        if(symbol is not None):
+            table_.countSymbol(symbol)
+
+        return symbol
+
+    def _decode_halfword(self, context_):
+        """
+        Decode a halfword. Must mirror HalfwordEncoder._encode_halfword
+
+        :param context_: The previous halfword, None for the first one
+        :return: The halfword
+        """
+
+        firstOrderTable = None
+
+        if(context_ is not None):
+            firstOrderTable = self.mFirstOrderTables.get(context_)
+
+            if(firstOrderTable is None):
+                firstOrderTable = FrequencyTable(self.mDecoder.mMaxDecodingBytes)
+                self.mFirstOrderTables[context_] = firstOrderTable
+
+            symbol = self._decode_from_table(firstOrderTable)
+
+            if(symbol is not None):
+                return symbol
+
+        symbol = self._decode_from_table(self.mZeroOrderTable)
+
+        if(symbol is None):
+            symbol = self.mDecoder.decodeModelSymbol(self.mLowByteModel)
+            symbol |= self.mDecoder.decodeModelSymbol(self.mHighByteModel) << 8
+            self.mZeroOrderTable.addSymbol(symbol)
+
+        if(firstOrderTable is not None):
+            firstOrderTable.addSymbol(symbol)
+
+        return symbol
+
+    def decode(self, encodedData_, encodedDataLen_, decodedData_, maxDecodedDataLen_, originalLen_, streamOffset_=0,
+               phase_=0):
+        """
+        Decompress the data passed in. The decoder is reset before decoding
+
+        :param encodedData_: The data that needs to be decoded (bytearray)
+        :param encodedDataLen_: The length of data that needs to be decoded
+        :param decodedData_: The decoded data (integer array)
+        :param maxDecodedDataLen_ : The max number of bytes that can be stored in decodedData_ array
+        :param originalLen_: The number of bytes that were encoded
+        :param streamOffset_: The position of the data within the stream, must match the encoder
+        :param phase_: The parity of the stream offsets the halfwords start at, must match the encoder
+        :return: Returns the number of bytes stored in decodedData_
+        """
+
+        if(len(decodedData_) < maxDecodedDataLen_):
+            raise Exception("Decompressed data byte array passed in smaller than expected")
+
+        if(originalLen_ > maxDecodedDataLen_):
+            raise Exception('Not enough space to store decoded data')
+
+        self.reset()
+        self.mDecoder.startDecode(encodedData_, encodedDataLen_)
+
+        i = 0
+
+        if((((streamOffset_ ^ phase_) & 1) != 0) and (originalLen_ > 0)):
+            decodedData_[0] = self.mDecoder.decodeModelSymbol(self.mLowByteModel)
+            i = 1
+
+        context = None
+
+        while((i + 1) < originalLen_):
+            symbol = self._decode_halfword(context)
+            decodedData_[i] = symbol & 0xFF
+            decodedData_[i + 1] = symbol >> 8
+            context = symbol
+            i += 2
+
+        if(i < originalLen_):
+            decodedData_[i] = self.mDecoder.decodeModelSymbol(self.mLowByteModel)
+
+        return originalLen_
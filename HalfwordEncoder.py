@@ -0,0 +1,139 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement a context model over 16-bit symbols for halfword aligned instruction streams such as ARM Thumb
+code. Every little endian halfword is one symbol and the previous halfword is its order-1 context, so contexts line up
+with whole instructions instead of splitting each one in two. The order-1 tables are FrequencyTables kept in a dictionary
+by context and the order-0 table is one more, only the contexts and symbols that were seen take space out of the 65536
+possible. A halfword new to its order-1 table escapes to the order-0 table, one new to that as well is sent as its low
+and high byte with two adaptive byte models.
+
+Halfwords are aligned to the stream offsets of the given phase, the parity the instructions start at. A block whose
+first byte is out of phase sends it on its own with the low byte model, as is a byte left over at the end
+"""
+
+from ContextEncoder import ContextEncoder
+from FrequencyTable import FrequencyTable
+from SymbolModel import SymbolModel
+
+class HalfwordEncoder:
+    MIN_MAX_COUNT = 1024                                                       # Smallest table total that leaves room for the halfwords
+
+    def __init__(self, wordSize_):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that will be used for encoding
+        :return: None
+        """
+
+        self.mEncoder = ContextEncoder(wordSize_)
+
+        if(self.mEncoder.mMaxEncodeBytes < self.MIN_MAX_COUNT):
+            raise Exception("Word size too small for halfword symbols")
+
+        self.mLowByteModel = SymbolModel(256)
+        self.mHighByteModel = SymbolModel(256)
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the coder and every table
+
+        :return: None
+        """
+
+        self.mEncoder.reset()
+        self.mLowByteModel.reset()
+        self.mHighByteModel.reset()
+        self.mZeroOrderTable = FrequencyTable(self.mEncoder.mMaxEncodeBytes)
+        self.mFirstOrderTables = {}                                                # Previous halfword to its FrequencyTable
+
+    def _encode_from_table(self, symbol_, table_):
+        """
+        Encode a halfword with a table, or the escape if the table does not hold it. An empty table is skipped, its
+        escape is certain
+
+        :param symbol_: The halfword
+        :param table_: The FrequencyTable
+        :return: True if the halfword was coded, False if the escape was
+        """
+
+        symbolRange = table_.getSymbolRange(symbol_)
+
+        if(symbolRange is not None):
+            self.mEncoder.encodeRange(symbolRange[0], symbolRange[1], table_.getTotal())
+            table_.countSymbol(symbol_)
+            return True
+
+        if(table_.getSymbolCount() > 0):
+            [escapeLow, escapeHigh] = table_.getEscapeRange()
+            self.mEncoder.encodeRange(escapeLow, escapeHigh, table_.getTotal())
+
+        table_.addSymbol(symbol_)
+
+        return False
+
+    def _encode_halfword(self, symbol_, context_):
+        """
+        Encode a halfword with its order-1 table, escaping to the order-0 table and the byte models when required
+
+        :param symbol_: The halfword
+        :param context_: The previous halfword, None for the first one
+        :return: None
+        """
+
+        if(context_ is not None):
+            firstOrderTable = self.mFirstOrderTables.get(context_)
+
+            if(firstOrderTable is None):
+                firstOrderTable = FrequencyTable(self.mEncoder.mMaxEncodeBytes)
+                self.mFirstOrderTables[context_] = firstOrderTable
+
+            if(self._encode_from_table(symbol_, firstOrderTable)):
+                return
+
+        if(self._encode_from_table(symbol_, self.mZeroOrderTable)):
+            return
+
+        self.mEncoder.encodeModelSymbol(symbol_ & 0xFF, self.mLowByteModel)
+        self.mEncoder.encodeModelSymbol(symbol_ >> 8, self.mHighByteModel)
+
+    def encode(self, dataToEncode_, dataLen_, encodedData_, maxEncodedDataLen_, streamOffset_=0, phase_=0):
+        """
+        Encode the data passed in. The decoder must be told the number of bytes, no termination symbol is sent. The
+        encoder is reset before encoding
+
+        :param dataToEncode_: The data that needs to be compressed (integer array of bytes)
+        :param dataLen_: The number of bytes that need to be compressed
+        :param encodedData_: The compressed data should be stored in this byte array
+        :param maxEncodedDataLen_ : The max length of compressed data that can be stored in encodedData_
+        :param streamOffset_: The position of dataToEncode_[0] within the stream, used to align the halfwords
+        :param phase_: The parity of the stream offsets the halfwords start at (BranchFilter.detectThumbPhase)
+        :return: The number of bytes stored in encodedData_
+        """
+
+        if(len(dataToEncode_) < dataLen_):
+            raise Exception("Data byte array passed in smaller than expected")
+
+        self.reset()
+        self.mEncoder.startEncode(encodedData_, maxEncodedDataLen_)
+
+        i = 0
+
+        if((((streamOffset_ ^ phase_) & 1) != 0) and (dataLen_ > 0)):
+            self.mEncoder.encodeModelSymbol(dataToEncode_[0], self.mLowByteModel)
+            i = 1
+
+        context = None
+
+        while((i + 1) < dataLen_):
+            symbol = dataToEncode_[i] | (dataToEncode_[i + 1] << 8)
+            self._encode_halfword(symbol, context)
+            context = symbol
+            i += 2
+
+        if(i < dataLen_):
+            self.mEncoder.encodeModelSymbol(dataToEncode_[i], self.mLowByteModel)
+
+        return self.mEncoder.finishEncode(True)
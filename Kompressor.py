@@ -0,0 +1,634 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will split the input into blocks, run optional pre-filters and compress each block with the ContextEncoder.
+The result is written out in the format described in StreamFormat
+"""
+
+import array
+import collections
+import itertools
+import json
+import math
+import os
+import zlib
+import utils
+import StreamFormat
+import BranchFilter
+from ContextEncoder import ContextEncoder
+from DldRecordEncoder import DldRecordEncoder
+from LZContextEncoder import LZContextEncoder
+from DeltaEncoder import DeltaEncoder
+from SemiStaticEncoder import SemiStaticEncoder
+from MixingEncoder import MixingEncoder
+from HalfwordEncoder import HalfwordEncoder
+from EscapeEstimator import EscapeEstimator
+from Dekompressor import Dekompressor
+from BlockReader import BlockReader
+from BlockWriter import BlockWriter
+from BlockPlanner import BlockPlanner
+
+class Kompressor:
+    DEFAULT_WORD_SIZE = 16
+    DEFAULT_BLOCK_SIZE = 65536
+    DEFAULT_CHECKPOINT_BLOCKS = 16
+    PARTIAL_EXTENSION = '.partial'
+    CHECKPOINT_EXTENSION = '.checkpoint'
+    STORE_ENTROPY_BITS = 7.9                                                   # Blocks with a higher order-0 entropy (bits/byte) are stored
+    DEFAULT_PIPELINE_DEPTH = 2
+
+    def __init__(self, wordSize_=DEFAULT_WORD_SIZE, blockSize_=DEFAULT_BLOCK_SIZE, thumbFilter_=False, dldRecords_=False,
+                 matchWindow_=0, matchSearchDepth_=LZContextEncoder.DEFAULT_SEARCH_DEPTH, referenceData_=None,
+                 semiStatic_=False, subStreams_=1, checksum_=False, contextMixing_=False,
+                 escapeMethod_=EscapeEstimator.METHOD_C, pipelineDepth_=DEFAULT_PIPELINE_DEPTH, minBlockSize_=0,
+                 halfwordSymbols_=False, adaptation_=None):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that will be used by the encoder
+        :param blockSize_: The max number of bytes compressed in each block. Statistics are reset for every block
+        :param thumbFilter_: If True convert ARM Thumb branch targets before encoding
+        :param dldRecords_: If True the input is a .dld file which is coded line by line with the record aware front end.
+               Blocks then hold whole lines and may be slightly larger than the block size
+        :param matchWindow_: If not 0 long repeats within this many bytes are coded as matches by the LZ77 front end
+        :param matchSearchDepth_: The number of match candidates examined at each position. Trades speed for ratio
+        :param referenceData_: If provided the data is delta coded against this reference image (e.g. the previous
+               firmware version). The same reference must be given to the Dekompressor. The Thumb filter is usually
+               best left off in this mode, absolute branch targets change for every call into code that moved
+        :param semiStatic_: If True every block is coded in two passes with frozen tables sent at the start of the block.
+               Compresses somewhat worse than the adaptive model but decompresses several times faster
+        :param subStreams_: Number of contiguous sub-ranges each block is split into. Every sub-range is coded with its
+               own model so the Dekompressor can decode them on separate workers, at the cost of learning the
+               statistics once per sub-range
+        :param checksum_: If True the CRC32 of every block and of the whole stream is stored so decompression can verify
+               the data
+        :param contextMixing_: If True blocks are coded bit by bit by mixing the predictions of several context models.
+               Gives the best ratio but compresses and decompresses several times slower. Requires a word size of 14 or
+               more
+        :param escapeMethod_: How escapes of the context model are counted, one of the EscapeEstimator.METHOD_ values.
+               Stored in the stream header so the Dekompressor uses the same method
+        :param pipelineDepth_: Number of blocks compress reads ahead and queues for writing on background threads, so
+               file I/O overlaps with coding. 0 reads, codes and writes strictly in turn
+        :param minBlockSize_: If not 0 compress ends blocks where the statistics of the data change (see BlockPlanner)
+               rather than every blockSize_ bytes. Blocks are then between minBlockSize_ and blockSize_ bytes long
+        :param halfwordSymbols_: If True blocks are coded as 16-bit symbols with the previous halfword as context (see
+               HalfwordEncoder). Suits Thumb code, where byte contexts split every instruction in two. The escape
+               method does not apply to this model
+        :param adaptation_: AdaptationPolicy setting how fast the context model adapts at each of its levels, None for
+               the default. Stored in the stream header when it is not the default
+        :return: None
+        """
+
+        if(blockSize_ <= 0):
+            raise Exception("Invalid block size specified")
+
+        if(pipelineDepth_ < 0):
+            raise Exception("Invalid pipeline depth specified")
+
+        self.mWordSize = wordSize_
+        self.mBlockSize = blockSize_
+        self.mReferenceData = referenceData_
+        self.mEscapeMethod = escapeMethod_
+        self.mPipelineDepth = pipelineDepth_
+        self.mBlockPlanner = None
+        self.mFlags = 0
+        self.mModelFlags = 0
+
+        if(checksum_):
+            self.mFlags |= StreamFormat.FLAG_CHECKSUM
+
+        if(thumbFilter_):
+            self.mFlags |= StreamFormat.FLAG_THUMB_FILTER
+
+        if(dldRecords_):
+            self.mFlags |= StreamFormat.FLAG_DLD_RECORDS
+            self.mRecordEncoder = DldRecordEncoder(wordSize_, thumbFilter_, escapeMethod_, adaptation_)
+
+        if(matchWindow_ > 0):
+            if(dldRecords_):
+                raise Exception("Match finder can't be combined with the record front end")
+
+            self.mFlags |= StreamFormat.FLAG_LZ_MATCHES
+            self.mLZEncoder = LZContextEncoder(wordSize_, matchWindow_, matchSearchDepth_, escapeMethod_, adaptation_)
+
+        if(referenceData_ is not None):
+            if(dldRecords_ or (matchWindow_ > 0)):
+                raise Exception("Reference delta can't be combined with the record or match front ends")
+
+            self.mFlags |= StreamFormat.FLAG_REFERENCE_DELTA
+            self.mReferenceHeader = StreamFormat.packReferenceHeader(referenceData_)
+
+            # The reference goes through the same filters as the data so copies still line up. Every block is filtered
+            # with the phase of the reference, the Dekompressor detects it from the reference as well
+            referenceData = list(referenceData_)
+
+            if(thumbFilter_):
+                self.mReferencePhase = BranchFilter.detectThumbPhase(referenceData, len(referenceData))
+                BranchFilter.thumbBranchEncode(referenceData, len(referenceData), 0, self.mReferencePhase)
+
+            self.mDeltaEncoder = DeltaEncoder(wordSize_, referenceData, escapeMethod_, adaptation_)
+
+        if(semiStatic_):
+            if(dldRecords_ or (matchWindow_ > 0) or (referenceData_ is not None)):
+                raise Exception("Semi-static tables can't be combined with the record, match or reference front ends")
+
+            self.mFlags |= StreamFormat.FLAG_SEMI_STATIC
+            self.mSemiStaticEncoder = SemiStaticEncoder(wordSize_)
+
+        if(contextMixing_):
+            if(dldRecords_ or (matchWindow_ > 0) or (referenceData_ is not None) or semiStatic_):
+                raise Exception("Context mixing can't be combined with the record, match, reference or semi-static modes")
+
+            self.mFlags |= StreamFormat.FLAG_CONTEXT_MIXING
+            self.mMixingEncoder = MixingEncoder(wordSize_)
+
+        if(halfwordSymbols_):
+            if(dldRecords_ or (matchWindow_ > 0) or (referenceData_ is not None) or semiStatic_ or contextMixing_):
+                raise Exception("Halfword symbols can't be combined with the record, match, reference, semi-static or "
+                                "context mixing modes")
+
+            self.mModelFlags |= StreamFormat.MODEL_FLAG_HALFWORD_SYMBOLS
+            self.mHalfwordEncoder = HalfwordEncoder(wordSize_)
+
+        if((adaptation_ is not None) and (not adaptation_.isDefault())):
+            if(semiStatic_ or contextMixing_ or halfwordSymbols_):
+                raise Exception("Adaptation policy can't be combined with the semi-static, context mixing or halfword "
+                                "modes")
+
+            self.mModelFlags |= StreamFormat.MODEL_FLAG_ADAPTATION
+            self.mAdaptationHeader = StreamFormat.packAdaptationHeader(adaptation_.getFields())
+
+        if((subStreams_ < 1) or (subStreams_ > StreamFormat.MAX_SUB_STREAMS)):
+            raise Exception("Invalid number of sub-streams specified")
+
+        self.mSubStreams = subStreams_
+
+        if(subStreams_ > 1):
+            if(dldRecords_):
+                raise Exception("Sub-streams can't be combined with the record front end")
+
+            self.mFlags |= StreamFormat.FLAG_SUB_STREAMS
+
+        if(minBlockSize_ > 0):
+            if(dldRecords_):
+                raise Exception("Planned blocks can't be combined with the record front end")
+
+            self.mBlockPlanner = BlockPlanner(minBlockSize_, blockSize_)
+
+        self.mEncoder = ContextEncoder(wordSize_, escapeMethod_, adaptation_)
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the position within the stream. Must be called before starting a new stream
+
+        :return: None
+        """
+
+        self.mStreamOffset = 0                                                     # Number of input bytes compressed so far
+        self.mStreamChecksum = 0                                                   # CRC32 of the input compressed so far
+
+    def setStreamOffset(self, streamOffset_):
+        """
+        Set the position within the stream of the next block. Blocks are independent so they can be compressed out of order
+        (e.g. by parallel workers) as long as each one is given its offset
+
+        :param streamOffset_: The number of bytes in the stream before the next block
+        :return: None
+        """
+
+        self.mStreamOffset = streamOffset_
+
+    def getHeader(self):
+        """
+        Get the stream header that must precede the compressed blocks
+
+        :return: The stream header bytes
+        """
+
+        header = StreamFormat.packStreamHeader(self.mWordSize, self.mFlags, self.mBlockSize, self.mEscapeMethod,
+                                               self.mModelFlags)
+
+        if(self.mModelFlags & StreamFormat.MODEL_FLAG_ADAPTATION):
+            header += self.mAdaptationHeader
+
+        if(self.mFlags & StreamFormat.FLAG_REFERENCE_DELTA):
+            header += self.mReferenceHeader
+
+        return header
+
+    def getTrailer(self):
+        """
+        Get the end of stream marker that must follow the last block. Only streams with checksums have one
+
+        :return: The end of stream marker bytes, empty if the stream has no checksums
+        """
+
+        if(not (self.mFlags & StreamFormat.FLAG_CHECKSUM)):
+            return b''
+
+        return StreamFormat.packBlockHeader(0, 0) + StreamFormat.packChecksum(self.mStreamChecksum)
+
+    def compressBlock(self, data_, dataLen_):
+        """
+        Compress a single block of data. The returned bytes include the block header
+
+        :param data_: The data to compress (bytes, bytearray or integer array). Must not be longer than the block size,
+                      except in record mode where the last line of a block may run past it
+        :param dataLen_: The number of bytes in data_ to compress
+        :return: The block header followed by the encoded data
+        """
+
+        # Checked ahead of the entropy pre-check so a block that would be stored is held to the block size as well
+        if((dataLen_ > self.mBlockSize) and (not (self.mFlags & StreamFormat.FLAG_DLD_RECORDS))):
+            raise Exception("Block larger than block size")
+
+        if(self._is_incompressible(data_, dataLen_)):
+            encodedData = None
+        elif(self.mFlags & StreamFormat.FLAG_DLD_RECORDS):
+            encodedData = self._compress_record_block(data_, dataLen_)
+        elif(not (self.mFlags & StreamFormat.FLAG_SUB_STREAMS)):
+            encodedData = self._encode_sub_stream(data_[:dataLen_], dataLen_, self.mStreamOffset)
+        else:
+            # Split into contiguous sub-ranges, they keep the order-1 context intact better than interleaving bytes
+            subStreamLen = max(1, (dataLen_ + self.mSubStreams - 1) // self.mSubStreams)
+            subStreams = []
+            subStreamData = []
+
+            for start in range(0, dataLen_, subStreamLen):
+                end = min(dataLen_, start + subStreamLen)
+                encodedSubStream = self._encode_sub_stream(data_[start:end], end - start, self.mStreamOffset + start)
+                subStreams.append([end - start, len(encodedSubStream)])
+                subStreamData.append(encodedSubStream)
+
+            encodedData = StreamFormat.packSubStreamTable(subStreams) + b''.join(subStreamData)
+
+        # Blocks that were skipped or did not shrink are stored so the output never grows by more than the mode byte
+        if((encodedData is None) or (len(encodedData) >= dataLen_)):
+            encodedData = StreamFormat.packBlockMode(StreamFormat.BLOCK_MODE_STORED) + bytes(data_[:dataLen_])
+        else:
+            encodedData = StreamFormat.packBlockMode(StreamFormat.BLOCK_MODE_CODED) + encodedData
+
+        block = StreamFormat.packBlockHeader(dataLen_, len(encodedData))
+
+        if(self.mFlags & StreamFormat.FLAG_CHECKSUM):
+            blockChecksum = zlib.crc32(data_[:dataLen_]) & 0xFFFFFFFF
+            self.mStreamChecksum = zlib.crc32(data_[:dataLen_], self.mStreamChecksum) & 0xFFFFFFFF
+            block += StreamFormat.packChecksum(blockChecksum)
+
+        self.mStreamOffset += dataLen_
+
+        return block + encodedData
+
+    def _is_incompressible(self, data_, dataLen_):
+        """
+        Check the order-0 entropy of a block to find data that is already compressed (or random) without running the
+        coder over it. The LZ and reference delta front ends are never skipped, they find repeats a histogram can't see
+
+        :param data_: The data of the block
+        :param dataLen_: The number of bytes in data_
+        :return: True if the block should be stored without coding it
+        """
+
+        if((dataLen_ == 0) or (self.mFlags & (StreamFormat.FLAG_LZ_MATCHES | StreamFormat.FLAG_REFERENCE_DELTA))):
+            return False
+
+        entropyBits = 0.0
+
+        for count in collections.Counter(data_[:dataLen_]).values():
+            entropyBits += count * math.log2(dataLen_ / count)
+
+        return entropyBits >= (self.STORE_ENTROPY_BITS * dataLen_)
+
+    def _encode_sub_stream(self, data_, dataLen_, streamOffset_):
+        """
+        Filter and encode a run of data with a freshly reset model
+
+        :param data_: The data to compress
+        :param dataLen_: The number of bytes in data_ to compress
+        :param streamOffset_: The position of data_[0] within the stream
+        :return: The encoded data
+        """
+
+        blockData = list(data_[:dataLen_])
+        phaseData = b''
+
+        phase = 0
+
+        if(StreamFormat.hasThumbPhase(self.mFlags, self.mModelFlags)):
+            if(self.mFlags & StreamFormat.FLAG_REFERENCE_DELTA):
+                phase = self.mReferencePhase
+            else:
+                phase = BranchFilter.detectThumbPhase(blockData, dataLen_, streamOffset_)
+
+            phaseData = StreamFormat.packThumbPhase(phase)
+
+        if(self.mFlags & StreamFormat.FLAG_THUMB_FILTER):
+            BranchFilter.thumbBranchEncode(blockData, dataLen_, streamOffset_, phase)
+
+        maxEncodedLen = utils.calculateMaxEncodedLen(dataLen_ + 1)
+
+        if(self.mFlags & StreamFormat.FLAG_SEMI_STATIC):
+            maxEncodedLen += SemiStaticEncoder.calculateMaxTableLen(dataLen_)
+
+        encodedData = array.array("B", itertools.repeat(0, maxEncodedLen))
+
+        if(self.mFlags & StreamFormat.FLAG_LZ_MATCHES):
+            self.mLZEncoder.reset()
+            encodedLen = self.mLZEncoder.encode(blockData, dataLen_, encodedData, maxEncodedLen)
+        elif(self.mFlags & StreamFormat.FLAG_REFERENCE_DELTA):
+            self.mDeltaEncoder.reset()
+            encodedLen = self.mDeltaEncoder.encode(blockData, dataLen_, encodedData, maxEncodedLen, streamOffset_)
+        elif(self.mFlags & StreamFormat.FLAG_SEMI_STATIC):
+            encodedLen = self.mSemiStaticEncoder.encode(blockData, dataLen_, encodedData, maxEncodedLen)
+        elif(self.mFlags & StreamFormat.FLAG_CONTEXT_MIXING):
+            encodedLen = self.mMixingEncoder.encode(blockData, dataLen_, encodedData, maxEncodedLen)
+        elif(self.mModelFlags & StreamFormat.MODEL_FLAG_HALFWORD_SYMBOLS):
+            encodedLen = self.mHalfwordEncoder.encode(blockData, dataLen_, encodedData, maxEncodedLen, streamOffset_,
+                                                      phase)
+        else:
+            # The decoder stops once it decodes the termination symbol
+            blockData.append(ContextEncoder.TERMINATION_SYMBOL)
+
+            self.mEncoder.reset()
+            encodedLen = self.mEncoder.encode(blockData, len(blockData), encodedData, maxEncodedLen, False)
+
+        return phaseData + encodedData[:encodedLen].tobytes()
+
+    def _compress_record_block(self, data_, dataLen_):
+        """
+        Compress a block of .dld lines with the record aware front end
+
+        :param data_: The .dld text of the block. Must hold whole lines
+        :param dataLen_: The number of bytes in data_ to compress
+        :return: The encoded data
+        """
+
+        maxEncodedLen = utils.calculateMaxEncodedLen(dataLen_)
+        encodedData = array.array("B", itertools.repeat(0, maxEncodedLen))
+
+        self.mRecordEncoder.reset()
+        encodedLen = self.mRecordEncoder.encode(data_, dataLen_, encodedData, maxEncodedLen)
+
+        return encodedData[:encodedLen].tobytes()
+
+    def _read_block(self, inputFile_, buffer_):
+        """
+        Read the data for the next block. In record mode whole lines are read until the block size is reached, otherwise
+        the data is read into buffer_. Runs on the reader thread of _compress_blocks
+
+        :param inputFile_: Binary file object to read the data from
+        :param buffer_: Reusable buffer of the block size, not used in record mode or with planned blocks
+        :return: [data, dataLen] or None once the end of the file is reached
+        """
+
+        if(self.mBlockPlanner is not None):
+            return self._read_planned_block(inputFile_)
+
+        if(self.mFlags & StreamFormat.FLAG_DLD_RECORDS):
+            data = bytearray()
+            line = inputFile_.readline()
+
+            while(len(line) > 0):
+                data.extend(line)
+
+                if(len(data) >= self.mBlockSize):
+                    break
+
+                line = inputFile_.readline()
+
+            if(len(data) == 0):
+                return None
+
+            return [data, len(data)]
+
+        dataLen = 0
+
+        # A single read may return less than asked for (pipes, network filesystems), keep going until the buffer is full
+        # or the file ends
+        with memoryview(buffer_) as bufferView:
+            while(dataLen < len(buffer_)):
+                readLen = inputFile_.readinto(bufferView[dataLen:])
+
+                if(not readLen):
+                    break
+
+                dataLen += readLen
+
+        if(dataLen == 0):
+            return None
+
+        return [buffer_, dataLen]
+
+    def _read_planned_block(self, inputFile_):
+        """
+        Read up to the block size ahead and let the planner choose where the next block ends. The rest is kept for the
+        following blocks. Boundaries only depend on the data from the start of the block so a resumed compression places
+        them exactly where the interrupted one did
+
+        :param inputFile_: Binary file object to read the data from
+        :return: [data, dataLen] or None once the end of the file is reached
+        """
+
+        while((len(self.mPlannedData) < self.mBlockSize) and (not self.mPlannedDataEnded)):
+            readData = inputFile_.read(self.mBlockSize - len(self.mPlannedData))
+
+            if(len(readData) == 0):
+                self.mPlannedDataEnded = True
+            else:
+                self.mPlannedData.extend(readData)
+
+        if(len(self.mPlannedData) == 0):
+            return None
+
+        dataLen = self.mBlockPlanner.planBlock(self.mPlannedData, len(self.mPlannedData), self.mPlannedDataEnded)
+        data = bytes(self.mPlannedData[:dataLen])
+        del self.mPlannedData[:dataLen]
+
+        return [data, dataLen]
+
+    def compress(self, inputFile_, outputFile_, verify_=False):
+        """
+        Compress everything read from inputFile_ and write the stream to outputFile_
+
+        :param inputFile_: Binary file object to read the data from
+        :param outputFile_: Binary file object the compressed stream is written to
+        :param verify_: If True every block is decompressed right after it is compressed and compared with the input.
+               Only one block is held at a time so memory use does not grow with the file size
+        :return: [inputSize, outputSize]
+        """
+
+        self.reset()
+
+        header = self.getHeader()
+        outputFile_.write(header)
+
+        return self._compress_blocks(inputFile_, outputFile_, verify_, len(header))
+
+    def compressResumable(self, inputPath_, outputPath_, verify_=False, checkpointBlocks_=DEFAULT_CHECKPOINT_BLOCKS):
+        """
+        Compress a file so that an interrupted run can be resumed. The stream is written to outputPath_.partial and a
+        checkpoint is written next to it every checkpointBlocks_ blocks. If a checkpoint matching the input file and the
+        settings is found the run continues from it, producing the same output as an uninterrupted run. Once complete
+        the partial file is renamed to outputPath_ and the checkpoint removed
+
+        :param inputPath_: The file to compress
+        :param outputPath_: The compressed file to create
+        :param verify_: If True every block is decompressed right after it is compressed and compared with the input
+        :param checkpointBlocks_: Number of blocks between checkpoints
+        :return: [inputSize, outputSize, resumeOffset] resumeOffset is the input offset the run resumed from, 0 if it
+                 started from the beginning
+        """
+
+        partialPath = outputPath_ + self.PARTIAL_EXTENSION
+        checkpointPath = outputPath_ + self.CHECKPOINT_EXTENSION
+        inputStat = os.stat(inputPath_)
+        inputIdentity = {'header': self.getHeader().hex(), 'inputSize': inputStat.st_size,
+                         'inputModified': inputStat.st_mtime_ns}
+        checkpoint = self._read_checkpoint(checkpointPath, inputIdentity)
+
+        self.reset()
+
+        with open(inputPath_, 'rb') as inputFile:
+            if((checkpoint is not None) and os.path.exists(partialPath)):
+                # Drop anything written after the checkpoint and continue from the block boundary it describes
+                outputFile = open(partialPath, 'r+b')
+                outputFile.truncate(checkpoint['outputSize'])
+                outputFile.seek(checkpoint['outputSize'])
+                inputFile.seek(checkpoint['streamOffset'])
+
+                self.mStreamOffset = checkpoint['streamOffset']
+                self.mStreamChecksum = checkpoint['streamChecksum']
+                outputSize = checkpoint['outputSize']
+            else:
+                outputFile = open(partialPath, 'wb')
+                header = self.getHeader()
+                outputFile.write(header)
+                outputSize = len(header)
+
+            resumeOffset = self.mStreamOffset
+
+            with outputFile:
+                [inputSize, outputSize] = self._compress_blocks(inputFile, outputFile, verify_, outputSize,
+                                                                 checkpointPath, checkpointBlocks_, inputIdentity)
+                outputFile.flush()
+                os.fsync(outputFile.fileno())
+
+        os.replace(partialPath, outputPath_)
+
+        if(os.path.exists(checkpointPath)):
+            os.remove(checkpointPath)
+
+        return [inputSize, outputSize, resumeOffset]
+
+    def _read_checkpoint(self, checkpointPath_, inputIdentity_):
+        """
+        Load a checkpoint if there is one for the same input file and settings
+
+        :param checkpointPath_: The checkpoint file
+        :param inputIdentity_: The stream header and input file size and modification time of this run
+        :return: The checkpoint dictionary or None
+        """
+
+        if(not os.path.exists(checkpointPath_)):
+            return None
+
+        with open(checkpointPath_, 'r') as checkpointFile:
+            checkpoint = json.load(checkpointFile)
+
+        for key in inputIdentity_:
+            if(checkpoint.get(key) != inputIdentity_[key]):
+                return None
+
+        return checkpoint
+
+    def _write_checkpoint(self, outputFile_, checkpointPath_, inputIdentity_, outputSize_):
+        """
+        Write a checkpoint for the current block boundary. The output is flushed to disk first so the checkpoint never
+        describes data that could be lost, and the checkpoint is replaced atomically. Blocks are coded with a freshly
+        reset model so the position and running checksum are all the state required to resume
+
+        :param outputFile_: The partial output file
+        :param checkpointPath_: The checkpoint file
+        :param inputIdentity_: The stream header and input file size and modification time of this run
+        :param outputSize_: Number of bytes written to the output so far
+        :return: None
+        """
+
+        outputFile_.flush()
+        os.fsync(outputFile_.fileno())
+
+        checkpoint = dict(inputIdentity_)
+        checkpoint['streamOffset'] = self.mStreamOffset
+        checkpoint['streamChecksum'] = self.mStreamChecksum
+        checkpoint['outputSize'] = outputSize_
+
+        temporaryPath = checkpointPath_ + '.tmp'
+
+        with open(temporaryPath, 'w') as checkpointFile:
+            json.dump(checkpoint, checkpointFile)
+            checkpointFile.flush()
+            os.fsync(checkpointFile.fileno())
+
+        os.replace(temporaryPath, checkpointPath_)
+
+    def _compress_blocks(self, inputFile_, outputFile_, verify_, outputSize_, checkpointPath_=None, checkpointBlocks_=0,
+                         inputIdentity_=None):
+        """
+        Compress blocks from the current position of the input file until its end, then write the end of the stream
+
+        :param inputFile_: Binary file object to read the data from, positioned at mStreamOffset
+        :param outputFile_: Binary file object the blocks are written to
+        :param verify_: If True every block is decompressed right after it is compressed and compared with the input
+        :param outputSize_: Number of bytes already written to the output
+        :param checkpointPath_: If provided a checkpoint is written every checkpointBlocks_ blocks
+        :return: [inputSize, outputSize]
+        """
+
+        if(verify_):
+            dekompressor = Dekompressor(self.mReferenceData)
+            dekompressor.setHeader(self.getHeader())
+            dekompressor.setStreamOffset(self.mStreamOffset)
+
+        # The next block is read and the previous one written on background threads while this one is coded
+        bufferSize = self.mBlockSize
+
+        if((self.mFlags & StreamFormat.FLAG_DLD_RECORDS) or (self.mBlockPlanner is not None)):
+            bufferSize = 0
+
+        self.mPlannedData = bytearray()                                            # Data read ahead of the planned blocks
+        self.mPlannedDataEnded = False
+        reader = BlockReader(lambda buffer_: self._read_block(inputFile_, buffer_), self.mPipelineDepth, bufferSize)
+        writer = BlockWriter(outputFile_, self.mPipelineDepth)
+        blockCount = 0
+
+        try:
+            blockData = reader.next()
+
+            while(blockData is not None):
+                [data, dataLen] = blockData
+                block = self.compressBlock(data, dataLen)
+
+                if(verify_ and (dekompressor.decompressBlockData(block) != data[:dataLen])):
+                    raise Exception("Verification failed for the block at offset " + str(self.mStreamOffset - dataLen))
+
+                reader.release(data)
+                writer.write(block)
+                outputSize_ += len(block)
+                blockCount += 1
+
+                if((checkpointPath_ is not None) and ((blockCount % checkpointBlocks_) == 0)):
+                    writer.flush()
+                    self._write_checkpoint(outputFile_, checkpointPath_, inputIdentity_, outputSize_)
+
+                blockData = reader.next()
+
+            trailer = self.getTrailer()
+            writer.write(trailer)
+            outputSize_ += len(trailer)
+        finally:
+            reader.close()
+            writer.close()
+
+        return [self.mStreamOffset, outputSize_]
@@ -0,0 +1,150 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Client for KompressorServer. The data is sent from a separate task while the response is read, so large requests can't
+deadlock against the server's backpressure
+"""
+
+import asyncio
+import json
+import KompressorServer
+
+class KompressorClient:
+    SEND_CHUNK_SIZE = 65536
+
+    def __init__(self, socketPath_):
+        """
+        Initialize the object. The connection is opened by connect()
+
+        :param socketPath_: Path of the Unix domain socket the server listens on
+        :return: None
+        """
+
+        self.mSocketPath = socketPath_
+        self.mReader = None
+        self.mWriter = None
+
+    async def connect(self):
+        """
+        Open the connection to the server. Requests on one client are processed one at a time
+
+        :return: None
+        """
+
+        [self.mReader, self.mWriter] = await asyncio.open_unix_connection(self.mSocketPath)
+
+    async def close(self):
+        """
+        Close the connection to the server
+
+        :return: None
+        """
+
+        if(self.mWriter is not None):
+            writer = self.mWriter
+            self.mWriter = None
+            writer.close()
+
+            # The server may have dropped the connection already, there is nothing left to flush then
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, excType_, excValue_, traceback_):
+        await self.close()
+
+    async def _send(self, operation_, data_):
+        """
+        Send a request
+
+        :param operation_: One of the KompressorServer.OP_ values
+        :param data_: The request data
+        :return: None
+        """
+
+        self.mWriter.write(bytes([operation_]))
+
+        for i in range(0, len(data_), self.SEND_CHUNK_SIZE):
+            await KompressorServer.KompressorServer.writeChunk(self.mWriter, data_[i:i + self.SEND_CHUNK_SIZE])
+
+        await KompressorServer.KompressorServer.writeChunk(self.mWriter, b'')
+
+    @staticmethod
+    async def _end_send(sendTask_):
+        """
+        Wait for the task sending a request to end once the response is in, or stop it if reading the response failed.
+        Send errors are dropped: the server only replies once it has read the whole request, so they come from a
+        connection the server closed after replying and the response (or the read error) is what the caller needs
+
+        :param sendTask_: The task running _send
+        :return: None
+        """
+
+        if(not sendTask_.done()):
+            sendTask_.cancel()
+
+        try:
+            await sendTask_
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+
+    async def _request(self, operation_, data_):
+        """
+        Send a request and read the response
+
+        :param operation_: One of the KompressorServer.OP_ values
+        :param data_: The request data
+        :return: The response data
+        """
+
+        sendTask = asyncio.create_task(self._send(operation_, data_))
+
+        try:
+            status = await self.mReader.readexactly(1)
+            response = bytearray()
+            chunk = await KompressorServer.KompressorServer.readChunk(self.mReader)
+
+            while(len(chunk) > 0):
+                response.extend(chunk)
+                chunk = await KompressorServer.KompressorServer.readChunk(self.mReader)
+        finally:
+            await self._end_send(sendTask)
+
+        if(status[0] != KompressorServer.STATUS_OK):
+            raise Exception(response.decode('utf-8', 'replace'))
+
+        return bytes(response)
+
+    async def compress(self, data_):
+        """
+        Compress the data
+
+        :param data_: The data to compress (bytes or bytearray)
+        :return: The compressed stream, identical to the output of Kompressor.compress with the server's settings
+        """
+
+        return await self._request(KompressorServer.OP_COMPRESS, data_)
+
+    async def decompress(self, data_):
+        """
+        Decompress a compressed stream
+
+        :param data_: The compressed stream
+        :return: The decompressed data
+        """
+
+        return await self._request(KompressorServer.OP_DECOMPRESS, data_)
+
+    async def stats(self):
+        """
+        Get the server metrics
+
+        :return: Dictionary of request counters and latency percentiles
+        """
+
+        return json.loads((await self._request(KompressorServer.OP_STATS, b'')).decode('utf-8'))
@@ -0,0 +1,579 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Local compression service. An asyncio server listens on a Unix domain socket and accepts compress and decompress
+requests. The data is streamed in and out in chunks and every block is handed to a warm process pool whose workers keep
+a preconstructed Kompressor/Dekompressor, so requests don't pay interpreter startup or model construction.
+
+Request:  operation (1 byte) followed by chunks of length (4 bytes) + data, terminated by a zero length chunk
+Response: status (1 byte) followed by chunks of length (4 bytes) + data, terminated by a zero length chunk. When the
+          status is STATUS_ERROR the single chunk holds the error message. An error is only sent once the whole request
+          was read, the connection then stays open for the next request
+
+Usage: python KompressorServer.py socketPath [--workers N] [--max-requests N] [--word-size N] [--block-size N]
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import struct
+import time
+import zlib
+import StreamFormat
+from Kompressor import Kompressor
+from Dekompressor import Dekompressor
+
+OP_COMPRESS = 1
+OP_DECOMPRESS = 2
+OP_STATS = 3
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+CHUNK_HEADER_FORMAT = '<I'
+CHUNK_HEADER_SIZE = struct.calcsize(CHUNK_HEADER_FORMAT)
+MAX_CHUNK_SIZE = 1 << 20
+MAX_WORKER_DEKOMPRESSORS = 8                                               # Stream headers each worker keeps a Dekompressor for
+
+# Worker process state, created once by _init_worker
+gKompressor = None
+gDekompressors = collections.OrderedDict()                                 # Stream header to Dekompressor, least recently used first
+
+def _init_worker(wordSize_, blockSize_, thumbFilter_, matchWindow_):
+    """
+    Construct the Kompressor used by this worker process
+
+    :return: None
+    """
+
+    global gKompressor
+    gKompressor = Kompressor(wordSize_, blockSize_, thumbFilter_, matchWindow_=matchWindow_)
+
+def _warm_up():
+    """
+    Used to force the pool to start its workers before the first request
+
+    :return: The process id of the worker
+    """
+
+    return os.getpid()
+
+def _compress_block(blockData_, streamOffset_):
+    """
+    Compress one block in the worker
+
+    :param blockData_: The block data
+    :param streamOffset_: The position of the block within the stream
+    :return: The block header followed by the encoded data
+    """
+
+    gKompressor.setStreamOffset(streamOffset_)
+
+    return gKompressor.compressBlock(blockData_, len(blockData_))
+
+def _decompress_block(headerData_, encodedData_, originalLen_, streamOffset_, checksum_):
+    """
+    Decompress one block in the worker. A Dekompressor is kept for the stream headers seen most recently
+
+    :param headerData_: The stream header of the stream the block belongs to
+    :param encodedData_: The encoded data of the block (without the block header)
+    :param originalLen_: The number of bytes the block held before compression
+    :param streamOffset_: The position of the block within the stream
+    :param checksum_: The CRC32 stored with the block, None if the stream has no checksums
+    :return: The decompressed data
+    """
+
+    dekompressor = gDekompressors.get(headerData_)
+
+    if(dekompressor is None):
+        dekompressor = Dekompressor()
+        dekompressor.setHeader(headerData_)
+        gDekompressors[headerData_] = dekompressor
+
+        if(len(gDekompressors) > MAX_WORKER_DEKOMPRESSORS):
+            gDekompressors.popitem(last=False)
+    else:
+        gDekompressors.move_to_end(headerData_)
+
+    dekompressor.setStreamOffset(streamOffset_)
+
+    return bytes(dekompressor.decompressBlock(encodedData_, len(encodedData_), originalLen_, checksum_))
+
+class ServiceMetrics:
+    LATENCY_SAMPLES = 4096                                                     # Number of recent request latencies kept
+
+    def __init__(self):
+        """
+        Initialize the object
+
+        :return: None
+        """
+
+        self.mRequests = 0
+        self.mErrors = 0
+        self.mActiveRequests = 0
+        self.mBytesIn = 0
+        self.mBytesOut = 0
+        self.mLatencies = collections.deque(maxlen=self.LATENCY_SAMPLES)
+
+    def record(self, latency_, bytesIn_, bytesOut_, failed_):
+        """
+        Record a completed request
+
+        :param latency_: Seconds from receiving the operation to sending the last chunk
+        :param bytesIn_: Number of payload bytes received
+        :param bytesOut_: Number of payload bytes sent
+        :param failed_: True if the request failed
+        :return: None
+        """
+
+        self.mRequests += 1
+        self.mErrors += 1 if failed_ else 0
+        self.mBytesIn += bytesIn_
+        self.mBytesOut += bytesOut_
+        self.mLatencies.append(latency_)
+
+    def getStats(self):
+        """
+        Get a summary of the metrics
+
+        :return: Dictionary of counters and latency percentiles (milliseconds)
+        """
+
+        latencies = sorted(self.mLatencies)
+        stats = {'requests': self.mRequests, 'errors': self.mErrors, 'active': self.mActiveRequests,
+                 'bytesIn': self.mBytesIn, 'bytesOut': self.mBytesOut}
+
+        for percentile in [50, 95, 99]:
+            value = 0.0
+
+            if(len(latencies) > 0):
+                value = latencies[min(len(latencies) - 1, (len(latencies) * percentile) // 100)] * 1000.0
+
+            stats['p' + str(percentile) + 'Ms'] = round(value, 3)
+
+        return stats
+
+class ServiceRequest:
+
+    def __init__(self, reader_):
+        """
+        Initialize the object, tracks how far a request has been read and answered
+
+        :param reader_: The asyncio stream reader of the connection
+        :return: None
+        """
+
+        self.mReader = reader_
+        self.mResponseStarted = False                                          # The OK status has been sent
+        self.mRequestEnded = False                                             # The terminating chunk has been read
+        self.mReadFailed = False                                               # A chunk could not be read, the connection is out of step
+
+    async def readChunk(self):
+        """
+        Read the next chunk of the request
+
+        :return: The chunk data, empty for the terminating chunk
+        """
+
+        self.mReadFailed = True
+        chunk = await KompressorServer.readChunk(self.mReader)
+        self.mReadFailed = False
+
+        if(len(chunk) == 0):
+            self.mRequestEnded = True
+
+        return chunk
+
+    async def drain(self):
+        """
+        Read and drop the rest of the request
+
+        :return: True if the request was read up to its terminating chunk, False if the connection is out of step
+        """
+
+        if(self.mReadFailed):
+            return False
+
+        try:
+            while(not self.mRequestEnded):
+                await self.readChunk()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            raise
+        except Exception:
+            return False
+
+        return True
+
+class KompressorServer:
+    DEFAULT_MAX_REQUESTS = 16
+    DEFAULT_MAX_PENDING_BLOCKS = 4
+
+    def __init__(self, socketPath_, workers_=None, maxRequests_=DEFAULT_MAX_REQUESTS,
+                 maxPendingBlocks_=DEFAULT_MAX_PENDING_BLOCKS, wordSize_=Kompressor.DEFAULT_WORD_SIZE,
+                 blockSize_=Kompressor.DEFAULT_BLOCK_SIZE, thumbFilter_=False, matchWindow_=0):
+        """
+        Initialize the object
+
+        :param socketPath_: Path of the Unix domain socket to listen on
+        :param workers_: Number of worker processes. Defaults to the number of CPUs
+        :param maxRequests_: Max number of requests processed at the same time, others wait for a free slot
+        :param maxPendingBlocks_: Max number of blocks of one request queued in the pool. Reading from the client stops
+               until a block completes, which pushes back on clients sending faster than the pool codes
+        :param wordSize_: The word size used for compression
+        :param blockSize_: The block size used for compression
+        :param thumbFilter_: If True compress with the ARM Thumb branch filter
+        :param matchWindow_: If not 0 compress with the LZ77 front end using this window
+        :return: None
+        """
+
+        self.mSocketPath = socketPath_
+        self.mWorkers = workers_ if workers_ else os.cpu_count()
+        self.mMaxPendingBlocks = maxPendingBlocks_
+        self.mBlockSize = blockSize_
+        self.mHeader = Kompressor(wordSize_, blockSize_, thumbFilter_, matchWindow_=matchWindow_).getHeader()
+        self.mRequestSlots = asyncio.Semaphore(maxRequests_)
+        self.mMetrics = ServiceMetrics()
+        self.mPool = concurrent.futures.ProcessPoolExecutor(self.mWorkers, initializer=_init_worker,
+                                                            initargs=(wordSize_, blockSize_, thumbFilter_, matchWindow_))
+        self.mServer = None
+
+    async def start(self):
+        """
+        Start the workers and begin listening on the socket
+
+        :return: None
+        """
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.mPool, _warm_up) for i in range(0, self.mWorkers)])
+
+        if(os.path.exists(self.mSocketPath)):
+            os.unlink(self.mSocketPath)
+
+        self.mServer = await asyncio.start_unix_server(self._handle_client, path=self.mSocketPath)
+
+    async def stop(self):
+        """
+        Stop listening and shut down the workers
+
+        :return: None
+        """
+
+        if(self.mServer is not None):
+            self.mServer.close()
+            await self.mServer.wait_closed()
+
+        self.mPool.shutdown()
+
+        if(os.path.exists(self.mSocketPath)):
+            os.unlink(self.mSocketPath)
+
+    async def serveForever(self):
+        """
+        Start the server and process requests until cancelled
+
+        :return: None
+        """
+
+        await self.start()
+
+        try:
+            await self.mServer.serve_forever()
+        finally:
+            await self.stop()
+
+    @staticmethod
+    async def readChunk(reader_):
+        """
+        Read one chunk from the stream
+
+        :param reader_: The asyncio stream reader
+        :return: The chunk data, empty for the terminating chunk
+        """
+
+        [chunkLen] = struct.unpack(CHUNK_HEADER_FORMAT, await reader_.readexactly(CHUNK_HEADER_SIZE))
+
+        if(chunkLen > MAX_CHUNK_SIZE):
+            raise Exception("Chunk too large")
+
+        return await reader_.readexactly(chunkLen)
+
+    @staticmethod
+    async def writeChunk(writer_, data_):
+        """
+        Write one chunk to the stream and wait until the transport buffer drains
+
+        :param writer_: The asyncio stream writer
+        :param data_: The chunk data, empty for the terminating chunk
+        :return: None
+        """
+
+        for i in range(0, max(1, len(data_)), MAX_CHUNK_SIZE):
+            chunk = data_[i:i + MAX_CHUNK_SIZE]
+            writer_.write(struct.pack(CHUNK_HEADER_FORMAT, len(chunk)) + chunk)
+            await writer_.drain()
+
+    async def _write_pending(self, writer_, pendingBlocks_, maxPending_, streamChecksum_=0):
+        """
+        Send completed blocks to the client, in order, until at most maxPending_ blocks are outstanding
+
+        :param streamChecksum_: CRC32 of the data sent before, it is updated with the blocks written
+        :return: [bytesWritten, streamChecksum]
+        """
+
+        bytesOut = 0
+
+        while(len(pendingBlocks_) > maxPending_):
+            blockData = await pendingBlocks_.popleft()
+
+            if(len(blockData) > 0):
+                await self.writeChunk(writer_, blockData)
+                bytesOut += len(blockData)
+                streamChecksum_ = zlib.crc32(blockData, streamChecksum_) & 0xFFFFFFFF
+
+        return [bytesOut, streamChecksum_]
+
+    async def _compress(self, request_, writer_):
+        """
+        Compress the data streamed by the client. Blocks are sent to the pool as soon as they are complete
+
+        :param request_: The ServiceRequest being processed
+        :param writer_: The asyncio stream writer
+        :return: [bytesIn, bytesOut]
+        """
+
+        loop = asyncio.get_running_loop()
+        pendingBlocks = collections.deque()
+        blockData = bytearray()
+        streamOffset = 0
+        bytesIn = 0
+
+        writer_.write(bytes([STATUS_OK]))
+        request_.mResponseStarted = True
+        await self.writeChunk(writer_, self.mHeader)
+        bytesOut = len(self.mHeader)
+
+        chunk = await request_.readChunk()
+
+        while(True):
+            blockData.extend(chunk)
+            bytesIn += len(chunk)
+
+            # Queue every full block (and the final partial one) then wait if too many are outstanding
+            while((len(blockData) >= self.mBlockSize) or ((len(chunk) == 0) and (len(blockData) > 0))):
+                block = bytes(blockData[:self.mBlockSize])
+                del blockData[:self.mBlockSize]
+                pendingBlocks.append(loop.run_in_executor(self.mPool, _compress_block, block, streamOffset))
+                streamOffset += len(block)
+                bytesOut += (await self._write_pending(writer_, pendingBlocks, self.mMaxPendingBlocks))[0]
+
+            if(len(chunk) == 0):
+                break
+
+            chunk = await request_.readChunk()
+
+        bytesOut += (await self._write_pending(writer_, pendingBlocks, 0))[0]
+        await self.writeChunk(writer_, b'')
+
+        return [bytesIn, bytesOut]
+
+    async def _decompress(self, request_, writer_):
+        """
+        Decompress the stream sent by the client. Blocks are sent to the pool as soon as they are complete
+
+        :param request_: The ServiceRequest being processed
+        :param writer_: The asyncio stream writer
+        :return: [bytesIn, bytesOut]
+        """
+
+        loop = asyncio.get_running_loop()
+        pendingBlocks = collections.deque()
+        streamData = bytearray()
+        headerData = None
+        headerSize = 0
+        blockHeaderSize = 0
+        streamEnded = False
+        streamChecksum = 0
+        streamOffset = 0
+        bytesIn = 0
+        bytesOut = 0
+
+        chunk = await request_.readChunk()
+
+        while(True):
+            streamData.extend(chunk)
+            bytesIn += len(chunk)
+
+            if((headerData is None) and (len(streamData) >= StreamFormat.STREAM_HEADER_SIZE)):
+                [wordSize, flags, blockSize, escapeMethod, modelFlags] = StreamFormat.unpackStreamHeader(streamData)
+
+                if(flags & StreamFormat.FLAG_REFERENCE_DELTA):
+                    raise Exception("Reference delta streams are not supported by the service")
+
+                headerSize = StreamFormat.getStreamHeaderSize(flags, modelFlags)
+
+            # The adaptation header may arrive in a later chunk than the stream header
+            if((headerData is None) and (headerSize > 0) and (len(streamData) >= headerSize)):
+                headerData = bytes(streamData[:headerSize])
+                blockHeaderSize = StreamFormat.getBlockHeaderSize(flags)
+                del streamData[:headerSize]
+
+                writer_.write(bytes([STATUS_OK]))
+                request_.mResponseStarted = True
+
+            # Queue every complete block then wait if too many are outstanding
+            while((headerData is not None) and (not streamEnded) and (len(streamData) >= blockHeaderSize)):
+                [originalLen, compressedLen] = StreamFormat.unpackBlockHeader(streamData)
+                blockEnd = blockHeaderSize + compressedLen
+                checksum = None
+
+                if(len(streamData) < blockEnd):
+                    break
+
+                if(flags & StreamFormat.FLAG_CHECKSUM):
+                    checksum = StreamFormat.unpackChecksum(streamData[StreamFormat.BLOCK_HEADER_SIZE:blockHeaderSize])
+
+                    # End marker, every block must be written before the stream checksum can be checked
+                    if((originalLen == 0) and (compressedLen == 0)):
+                        del streamData[:blockEnd]
+                        [written, streamChecksum] = await self._write_pending(writer_, pendingBlocks, 0, streamChecksum)
+                        bytesOut += written
+
+                        if(streamChecksum != checksum):
+                            raise Exception("Stream checksum does not match")
+
+                        streamEnded = True
+                        break
+
+                encodedData = bytes(streamData[blockHeaderSize:blockEnd])
+                del streamData[:blockEnd]
+                pendingBlocks.append(loop.run_in_executor(self.mPool, _decompress_block, headerData, encodedData,
+                                                          originalLen, streamOffset, checksum))
+                streamOffset += originalLen
+                [written, streamChecksum] = await self._write_pending(writer_, pendingBlocks, self.mMaxPendingBlocks,
+                                                                      streamChecksum)
+                bytesOut += written
+
+            if(len(chunk) == 0):
+                break
+
+            chunk = await request_.readChunk()
+
+        if((headerData is None) or (len(streamData) != 0)):
+            raise Exception("Compressed stream truncated")
+
+        if((flags & StreamFormat.FLAG_CHECKSUM) and (not streamEnded)):
+            raise Exception("Compressed stream truncated, end marker missing")
+
+        bytesOut += (await self._write_pending(writer_, pendingBlocks, 0))[0]
+        await self.writeChunk(writer_, b'')
+
+        return [bytesIn, bytesOut]
+
+    async def _handle_client(self, reader_, writer_):
+        """
+        Process requests from one connection until the client disconnects
+
+        :param reader_: The asyncio stream reader
+        :param writer_: The asyncio stream writer
+        :return: None
+        """
+
+        try:
+            while(True):
+                operation = await reader_.read(1)
+
+                if(len(operation) == 0):
+                    break
+
+                async with self.mRequestSlots:
+                    await self._handle_request(operation[0], reader_, writer_)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer_.close()
+
+    async def _handle_request(self, operation_, reader_, writer_):
+        """
+        Process a single request and record its metrics
+
+        :param operation_: One of the OP_ values
+        :return: None
+        """
+
+        startTime = time.perf_counter()
+        self.mMetrics.mActiveRequests += 1
+        bytesIn = 0
+        bytesOut = 0
+        failed = False
+        request = ServiceRequest(reader_)
+
+        try:
+            if(operation_ == OP_COMPRESS):
+                [bytesIn, bytesOut] = await self._compress(request, writer_)
+            elif(operation_ == OP_DECOMPRESS):
+                [bytesIn, bytesOut] = await self._decompress(request, writer_)
+            elif(operation_ == OP_STATS):
+                if(len(await request.readChunk()) != 0):
+                    raise Exception("Stats request takes no data")
+
+                writer_.write(bytes([STATUS_OK]))
+                await self.writeChunk(writer_, json.dumps(self.mMetrics.getStats()).encode('utf-8'))
+                await self.writeChunk(writer_, b'')
+                return
+            else:
+                raise Exception("Unknown operation")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            failed = True
+            raise
+        except Exception as e:
+            # Errors after the response started can't be reported in band, drop the connection instead
+            failed = True
+
+            if(request.mResponseStarted):
+                raise ConnectionError(str(e))
+
+            # The client may still be sending. Read the rest of the request before replying so the connection stays in
+            # step for the next request, unless the request can't be read any further
+            inStep = await request.drain()
+
+            writer_.write(bytes([STATUS_ERROR]))
+            await self.writeChunk(writer_, str(e).encode('utf-8'))
+            await self.writeChunk(writer_, b'')
+
+            if(not inStep):
+                raise ConnectionError(str(e))
+        finally:
+            self.mMetrics.mActiveRequests -= 1
+
+            if(operation_ != OP_STATS):
+                self.mMetrics.record(time.perf_counter() - startTime, bytesIn, bytesOut, failed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Local compression service')
+    parser.add_argument('socketPath')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-requests', type=int, default=KompressorServer.DEFAULT_MAX_REQUESTS)
+    parser.add_argument('--max-pending-blocks', type=int, default=KompressorServer.DEFAULT_MAX_PENDING_BLOCKS)
+    parser.add_argument('--word-size', type=int, default=Kompressor.DEFAULT_WORD_SIZE)
+    parser.add_argument('--block-size', type=int, default=Kompressor.DEFAULT_BLOCK_SIZE)
+    parser.add_argument('--thumb-filter', action='store_true')
+    parser.add_argument('--match-window', type=int, default=0)
+    args = parser.parse_args()
+
+    async def run():
+        server = KompressorServer(args.socketPath, args.workers, args.max_requests, args.max_pending_blocks,
+                                  args.word_size, args.block_size, args.thumb_filter, args.match_window)
+        await server.serveForever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
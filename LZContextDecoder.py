@@ -0,0 +1,134 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement the decoder for data produced by LZContextEncoder. Literals are decoded through the adaptive
+context model and matches are copied from the data already decoded
+"""
+
+from ContextDecoder import ContextDecoder
+from EscapeEstimator import EscapeEstimator
+from LZContextEncoder import LZContextEncoder
+from SymbolModel import SymbolModel
+
+class LZContextDecoder:
+
+    def __init__(self, wordSize_, escapeMethod_=EscapeEstimator.METHOD_C, adaptation_=None):
+        """
+        Initialize the object. The window size and search depth only affect the encoder so they are not required
+
+        :param wordSize_: The word size (bits) that was used for encoding
+        :param escapeMethod_: How escapes of the literal context model are counted. Must match the encoder
+        :param adaptation_: The AdaptationPolicy of the literal context model. Must match the encoder
+        :return: None
+        """
+
+        self.mDecoder = ContextDecoder(wordSize_, escapeMethod_, adaptation_)
+
+        self.mTokenModels = [SymbolModel(LZContextEncoder.NUM_TOKENS), SymbolModel(LZContextEncoder.NUM_TOKENS)]
+        self.mMatchLenModel = SymbolModel(LZContextEncoder.MAX_MATCH_LEN - LZContextEncoder.MIN_MATCH_LEN + 1)
+        self.mRepMatchLenModel = SymbolModel(LZContextEncoder.MAX_MATCH_LEN - LZContextEncoder.MIN_MATCH_LEN + 1)
+        self.mDistanceSlotModel = SymbolModel(LZContextEncoder.DISTANCE_SLOTS)
+        self.mDistanceExtraModels = []
+        for i in range(0, LZContextEncoder.DISTANCE_EXTRA_BYTES):
+            self.mDistanceExtraModels.append(SymbolModel(256))
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the context model and the token models
+
+        :return: None
+        """
+
+        self.mDecoder.reset()
+
+        for model in self.mTokenModels + self.mDistanceExtraModels + [self.mMatchLenModel, self.mRepMatchLenModel, self.mDistanceSlotModel]:
+            model.reset()
+
+        self.mLastDistance = 0                                                 # Distance of the previous match, used by rep matches
+        self.mLastTokenWasMatch = 0                                            # Selects the token model
+
+    def _decode_token(self):
+        """
+        Decode the token type using the model selected by the previous token
+
+        :return: One of the TOKEN_ values
+        """
+
+        token = self.mDecoder.decodeModelSymbol(self.mTokenModels[self.mLastTokenWasMatch])
+        self.mLastTokenWasMatch = 0 if (token == LZContextEncoder.TOKEN_LITERAL) else 1
+
+        return token
+
+    def _decode_distance(self):
+        """
+        Decode the distance sent as its bit length followed by the bits below the top bit
+
+        :return: The match distance
+        """
+
+        slot = self.mDecoder.decodeModelSymbol(self.mDistanceSlotModel)
+
+        if(slot == 0):
+            raise Exception("Invalid match distance")
+
+        extraBits = 0
+
+        for i in range(0, ((slot - 1) + 7) // 8):
+            extraBits |= self.mDecoder.decodeModelSymbol(self.mDistanceExtraModels[i]) << (8 * i)
+
+        return (1 << (slot - 1)) + extraBits
+
+    def decode(self, encodedData_, encodedDataLen_, decodedData_, maxDecodedDataLen_):
+        """
+        Decompress the data passed in. It is the responsibility of the caller to reset the decoder if required before
+        calling this function
+
+        :param encodedData_: The data that needs to be decoded (bytearray)
+        :param encodedDataLen_: The length of data that needs to be decoded
+        :param decodedData_: The decoded data (integer array)
+        :param maxDecodedDataLen_ : The max number of symbols that can be stored in decodedData_ array
+        :return: Returns the number of symbols stored in decodedData_
+        """
+
+        if(len(decodedData_) < maxDecodedDataLen_):
+            raise Exception("Decompressed data byte array passed in smaller than expected")
+
+        self.mDecoder.startDecode(encodedData_, encodedDataLen_)
+
+        decodedLen = 0
+        token = self._decode_token()
+
+        while(token != LZContextEncoder.TOKEN_END):
+            if(token == LZContextEncoder.TOKEN_LITERAL):
+                [currentSymbol, finished] = self.mDecoder.decodeSymbol()
+
+                if(finished or (decodedLen >= maxDecodedDataLen_)):
+                    raise Exception('Not enough space to store decoded data')
+
+                decodedData_[decodedLen] = currentSymbol
+                decodedLen += 1
+            else:
+                if(token == LZContextEncoder.TOKEN_MATCH):
+                    matchLen = self.mDecoder.decodeModelSymbol(self.mMatchLenModel) + LZContextEncoder.MIN_MATCH_LEN
+                    self.mLastDistance = self._decode_distance()
+                else:
+                    matchLen = self.mDecoder.decodeModelSymbol(self.mRepMatchLenModel) + LZContextEncoder.MIN_MATCH_LEN
+
+                if((self.mLastDistance == 0) or (self.mLastDistance > decodedLen)):
+                    raise Exception("Invalid match distance")
+
+                if((decodedLen + matchLen) > maxDecodedDataLen_):
+                    raise Exception('Not enough space to store decoded data')
+
+                # Copy one byte at a time as the match can overlap the data being produced
+                for i in range(0, matchLen):
+                    decodedData_[decodedLen] = decodedData_[decodedLen - self.mLastDistance]
+                    decodedLen += 1
+
+                self.mDecoder.setContext(decodedData_[decodedLen - 1])
+
+            token = self._decode_token()
+
+        return decodedLen
@@ -0,0 +1,173 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement an LZ77 front end for the context encoder. A hash chain MatchFinder looks for repeats in the
+data. Long repeats are sent as (length, distance) tokens, everything else as literals through the adaptive context
+model. Token types, lengths and distances are coded with their own small models in the same arithmetic coded stream,
+similar to the literal/match coding used by LZMA. A match at the same distance as the previous one (rep match) does not
+need to send the distance again
+"""
+
+from ContextEncoder import ContextEncoder
+from EscapeEstimator import EscapeEstimator
+from MatchFinder import MatchFinder
+from SymbolModel import SymbolModel
+
+class LZContextEncoder:
+    TOKEN_LITERAL = 0
+    TOKEN_MATCH = 1
+    TOKEN_REP_MATCH = 2
+    TOKEN_END = 3
+    NUM_TOKENS = 4
+
+    MIN_MATCH_LEN = 4                                                          # Shorter matches are cheaper to send as literals
+    MAX_MATCH_LEN = MIN_MATCH_LEN + 255
+    MAX_WINDOW_SIZE = (1 << 24)
+    DISTANCE_SLOTS = 26                                                        # Bit length of the distance, 1 to 25
+    DISTANCE_EXTRA_BYTES = 3                                                   # Bytes used for the bits below the top distance bit
+
+    DEFAULT_WINDOW_SIZE = 65536
+    DEFAULT_SEARCH_DEPTH = 16
+
+    def __init__(self, wordSize_, windowSize_=DEFAULT_WINDOW_SIZE, searchDepth_=DEFAULT_SEARCH_DEPTH,
+                 escapeMethod_=EscapeEstimator.METHOD_C, adaptation_=None):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that will be used for encoding
+        :param windowSize_: The max distance back a match can start at. Larger windows find more matches
+        :param searchDepth_: The max number of match candidates examined at each position. Trades speed for ratio
+        :param escapeMethod_: How escapes of the literal context model are counted, one of the EscapeEstimator.METHOD_ values
+        :param adaptation_: The AdaptationPolicy of the literal context model, None for the default
+        :return: None
+        """
+
+        if((windowSize_ < 1) or (windowSize_ > self.MAX_WINDOW_SIZE)):
+            raise Exception("Invalid window size specified")
+
+        self.mEncoder = ContextEncoder(wordSize_, escapeMethod_, adaptation_)
+        self.mMatchFinder = MatchFinder(windowSize_, searchDepth_, self.MAX_MATCH_LEN)
+
+        # Token models are selected by the previous token so runs of literals and of matches are both cheap
+        self.mTokenModels = [SymbolModel(self.NUM_TOKENS), SymbolModel(self.NUM_TOKENS)]
+        self.mMatchLenModel = SymbolModel(self.MAX_MATCH_LEN - self.MIN_MATCH_LEN + 1)
+        self.mRepMatchLenModel = SymbolModel(self.MAX_MATCH_LEN - self.MIN_MATCH_LEN + 1)
+        self.mDistanceSlotModel = SymbolModel(self.DISTANCE_SLOTS)
+        self.mDistanceExtraModels = []
+        for i in range(0, self.DISTANCE_EXTRA_BYTES):
+            self.mDistanceExtraModels.append(SymbolModel(256))
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the context model and the token models
+
+        :return: None
+        """
+
+        self.mEncoder.reset()
+
+        for model in self.mTokenModels + self.mDistanceExtraModels + [self.mMatchLenModel, self.mRepMatchLenModel, self.mDistanceSlotModel]:
+            model.reset()
+
+        self.mLastDistance = 0                                                 # Distance of the previous match, used by rep matches
+        self.mLastTokenWasMatch = 0                                            # Selects the token model
+
+    def _encode_token(self, token_):
+        """
+        Encode the token type using the model selected by the previous token
+
+        :param token_: One of the TOKEN_ values
+        :return: None
+        """
+
+        self.mEncoder.encodeModelSymbol(token_, self.mTokenModels[self.mLastTokenWasMatch])
+        self.mLastTokenWasMatch = 0 if (token_ == self.TOKEN_LITERAL) else 1
+
+    def _encode_distance(self, distance_):
+        """
+        Encode the distance as its bit length followed by the bits below the top bit
+
+        :param distance_: The match distance (greater than 0)
+        :return: None
+        """
+
+        slot = distance_.bit_length()
+        self.mEncoder.encodeModelSymbol(slot, self.mDistanceSlotModel)
+
+        extraBits = distance_ - (1 << (slot - 1))
+
+        for i in range(0, ((slot - 1) + 7) // 8):
+            self.mEncoder.encodeModelSymbol((extraBits >> (8 * i)) & 0xFF, self.mDistanceExtraModels[i])
+
+    def _match_len(self, data_, dataLen_, position_, distance_):
+        """
+        Get the number of bytes at position_ that match the data distance_ bytes back
+
+        :return: The match length, at most MAX_MATCH_LEN
+        """
+
+        maxLen = min(self.MAX_MATCH_LEN, dataLen_ - position_)
+        matchLen = 0
+
+        while((matchLen < maxLen) and (data_[position_ + matchLen - distance_] == data_[position_ + matchLen])):
+            matchLen += 1
+
+        return matchLen
+
+    def encode(self, dataToEncode_, dataLen_, encodedData_, maxEncodedDataLen_):
+        """
+        Encode the data passed in. Statistics are not reset, it is up-to the caller to reset the encoder if required
+
+        :param dataToEncode_: The data that needs to be compressed (integer array)
+        :param dataLen_: The length of data that needs to be compressed
+        :param encodedData_: The compressed data should be stored in this byte array
+        :param maxEncodedDataLen_ : The max length of compressed data that can be stored in encodedData_
+        :return: The number of bytes stored in encodedData_
+        """
+
+        if(len(dataToEncode_) < dataLen_):
+            raise Exception("Data byte array passed in smaller than expected")
+
+        self.mEncoder.startEncode(encodedData_, maxEncodedDataLen_)
+        self.mMatchFinder.reset(dataToEncode_, dataLen_)
+
+        position = 0
+
+        while(position < dataLen_):
+            repMatchLen = 0
+
+            if((self.mLastDistance > 0) and (position >= self.mLastDistance)):
+                repMatchLen = self._match_len(dataToEncode_, dataLen_, position, self.mLastDistance)
+
+            [matchLen, matchDistance] = self.mMatchFinder.findMatch(position)
+
+            # A rep match does not send the distance so prefer it unless the new match is clearly longer
+            if((repMatchLen >= self.MIN_MATCH_LEN) and ((repMatchLen + 1) >= matchLen)):
+                self._encode_token(self.TOKEN_REP_MATCH)
+                self.mEncoder.encodeModelSymbol(repMatchLen - self.MIN_MATCH_LEN, self.mRepMatchLenModel)
+                tokenLen = repMatchLen
+            elif(matchLen >= self.MIN_MATCH_LEN):
+                self._encode_token(self.TOKEN_MATCH)
+                self.mEncoder.encodeModelSymbol(matchLen - self.MIN_MATCH_LEN, self.mMatchLenModel)
+                self._encode_distance(matchDistance)
+                self.mLastDistance = matchDistance
+                tokenLen = matchLen
+            else:
+                self._encode_token(self.TOKEN_LITERAL)
+                self.mEncoder.encodeSymbol(dataToEncode_[position])
+                tokenLen = 1
+
+            for i in range(position, position + tokenLen):
+                self.mMatchFinder.insert(i)
+
+            position += tokenLen
+
+            # Literals following a match use the last byte of the match as their context
+            if(tokenLen > 1):
+                self.mEncoder.setContext(dataToEncode_[position - 1])
+
+        self._encode_token(self.TOKEN_END)
+
+        return self.mEncoder.finishEncode(False)
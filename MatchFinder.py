@@ -0,0 +1,116 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement a hash chain match finder for LZ77 style coding. Every position is hashed on its first
+MIN_MATCH_LEN bytes and linked to the previous position with the same hash. Searching walks the chain from the most
+recent position until the window or the search depth is exhausted
+"""
+
+class MatchFinder:
+    MIN_MATCH_LEN = 3                                                          # Number of bytes hashed to find match candidates
+    NO_POSITION = -1
+
+    def __init__(self, windowSize_, searchDepth_, maxMatchLen_, niceMatchLen_=None):
+        """
+        Initialize the object
+
+        :param windowSize_: The max distance back a match can start at
+        :param searchDepth_: The max number of chain entries examined for each position. Higher is slower but finds
+               longer matches
+        :param maxMatchLen_: The longest match that will be returned
+        :param niceMatchLen_: Stop searching once a match at least this long is found. Defaults to maxMatchLen_
+        :return: None
+        """
+
+        if((windowSize_ < 1) or (searchDepth_ < 1) or (maxMatchLen_ < self.MIN_MATCH_LEN)):
+            raise Exception("Invalid match finder parameters")
+
+        self.mWindowSize = windowSize_
+        self.mSearchDepth = searchDepth_
+        self.mMaxMatchLen = maxMatchLen_
+        self.mNiceMatchLen = maxMatchLen_ if niceMatchLen_ is None else min(niceMatchLen_, maxMatchLen_)
+
+        self.reset(None, 0)
+
+    def reset(self, data_, dataLen_):
+        """
+        Clear the hash chains and start matching against new data
+
+        :param data_: The data that will be searched (bytes, bytearray or integer array)
+        :param dataLen_: The number of bytes in data_
+        :return: None
+        """
+
+        self.mData = data_
+        self.mDataLen = dataLen_
+        self.mHashHead = {}                                                    # Hash of the bytes at a position -> most recent position
+        self.mHashPrevious = [self.NO_POSITION] * dataLen_                     # Position -> previous position with the same hash
+
+    def _hash(self, position_):
+        """
+        Calculate the hash of the MIN_MATCH_LEN bytes starting at position_
+
+        :param position_: Position of the first byte
+        :return: The hash key
+        """
+
+        return (self.mData[position_] << 16) | (self.mData[position_ + 1] << 8) | self.mData[position_ + 2]
+
+    def insert(self, position_):
+        """
+        Add the position to the hash chains. Positions must be inserted in increasing order
+
+        :param position_: The position to insert
+        :return: None
+        """
+
+        if((position_ + self.MIN_MATCH_LEN) > self.mDataLen):
+            return
+
+        key = self._hash(position_)
+        self.mHashPrevious[position_] = self.mHashHead.get(key, self.NO_POSITION)
+        self.mHashHead[key] = position_
+
+    def findMatch(self, position_):
+        """
+        Find the longest match for the data starting at position_ among the positions inserted so far. The position itself
+        must not have been inserted yet
+
+        :param position_: The position to find the match for
+        :return: [matchLen, matchDistance] matchLen is 0 if no match was found
+        """
+
+        maxLen = min(self.mMaxMatchLen, self.mDataLen - position_)
+
+        if(maxLen < self.MIN_MATCH_LEN):
+            return [0, 0]
+
+        data = self.mData
+        bestLen = 0
+        bestDistance = 0
+        candidate = self.mHashHead.get(self._hash(position_), self.NO_POSITION)
+        depth = self.mSearchDepth
+
+        while((candidate != self.NO_POSITION) and (depth > 0) and ((position_ - candidate) <= self.mWindowSize)):
+
+            # Only compare candidates which could beat the best match found so far
+            if(data[candidate + bestLen] == data[position_ + bestLen]):
+                matchLen = 0
+
+                while((matchLen < maxLen) and (data[candidate + matchLen] == data[position_ + matchLen])):
+                    matchLen += 1
+
+                if(matchLen > bestLen):
+                    bestLen = matchLen
+                    bestDistance = position_ - candidate
+
+                    if((bestLen >= self.mNiceMatchLen) or (bestLen >= maxLen)):
+                        break
+
+            candidate = self.mHashPrevious[candidate]
+            depth -= 1
+
+        if(bestLen < self.MIN_MATCH_LEN):
+            return [0, 0]
+
+        return [bestLen, bestDistance]
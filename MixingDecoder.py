@@ -0,0 +1,77 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement the decoder for data produced by MixingEncoder. It runs the same BitPredictor as the encoder
+so every bit is decoded with exactly the probability it was coded with
+"""
+
+from ContextDecoder import ContextDecoder
+from BitPredictor import BitPredictor
+
+class MixingDecoder:
+
+    def __init__(self, wordSize_):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that was used for encoding
+        :return: None
+        """
+
+        self.mDecoder = ContextDecoder(wordSize_)
+        self.mPredictor = BitPredictor()
+
+    def reset(self):
+        """
+        Reset the coder and the predictor
+
+        :return: None
+        """
+
+        self.mDecoder.reset()
+        self.mPredictor.reset()
+
+    def decode(self, encodedData_, encodedDataLen_, decodedData_, maxDecodedDataLen_, originalLen_):
+        """
+        Decompress the data passed in. The decoder is reset before decoding
+
+        :param encodedData_: The data that needs to be decoded (bytearray)
+        :param encodedDataLen_: The length of data that needs to be decoded
+        :param decodedData_: The decoded data (integer array)
+        :param maxDecodedDataLen_ : The max number of symbols that can be stored in decodedData_ array
+        :param originalLen_: The number of symbols that were encoded
+        :return: Returns the number of symbols stored in decodedData_
+        """
+
+        if(len(decodedData_) < maxDecodedDataLen_):
+            raise Exception("Decompressed data byte array passed in smaller than expected")
+
+        if(originalLen_ > maxDecodedDataLen_):
+            raise Exception('Not enough space to store decoded data')
+
+        self.reset()
+        self.mDecoder.startDecode(encodedData_, encodedDataLen_)
+
+        decoder = self.mDecoder
+        predictor = self.mPredictor
+        scale = BitPredictor.PROBABILITY_SCALE
+
+        for i in range(0, originalLen_):
+            symbol = 0
+
+            for shift in range(0, 8):
+                prediction = predictor.predict()
+
+                if(decoder.getCumulativeCount(scale) < prediction):
+                    decoder.decodeRange(0, prediction, scale)
+                    bit = 1
+                else:
+                    decoder.decodeRange(prediction, scale, scale)
+                    bit = 0
+
+                predictor.update(bit)
+                symbol = (symbol << 1) | bit
+
+            decodedData_[i] = symbol
+
+        return originalLen_
@@ -0,0 +1,76 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement the context mixing coder. Every byte is coded as 8 binary decisions predicted by BitPredictor,
+and each decision is sent through the arithmetic coder of ContextEncoder as a two symbol range. Compresses considerably
+better than the byte-wise order-1 model, in particular for instruction streams, but is several times slower
+"""
+
+from ContextEncoder import ContextEncoder
+from BitPredictor import BitPredictor
+
+class MixingEncoder:
+
+    def __init__(self, wordSize_):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that will be used for encoding
+        :return: None
+        """
+
+        self.mEncoder = ContextEncoder(wordSize_)
+
+        if(self.mEncoder.mMaxEncodeBytes < BitPredictor.PROBABILITY_SCALE):
+            raise Exception("Word size too small for the context mixing coder")
+
+        self.mPredictor = BitPredictor()
+
+    def reset(self):
+        """
+        Reset the coder and the predictor
+
+        :return: None
+        """
+
+        self.mEncoder.reset()
+        self.mPredictor.reset()
+
+    def encode(self, dataToEncode_, dataLen_, encodedData_, maxEncodedDataLen_):
+        """
+        Encode the data passed in. The decoder must be told the number of symbols, no termination symbol is sent. The
+        encoder is reset before encoding
+
+        :param dataToEncode_: The data that needs to be compressed (integer array)
+        :param dataLen_: The length of data that needs to be compressed
+        :param encodedData_: The compressed data should be stored in this byte array
+        :param maxEncodedDataLen_ : The max length of compressed data that can be stored in encodedData_
+        :return: The number of bytes stored in encodedData_
+        """
+
+        if(len(dataToEncode_) < dataLen_):
+            raise Exception("Data byte array passed in smaller than expected")
+
+        self.reset()
+        self.mEncoder.startEncode(encodedData_, maxEncodedDataLen_)
+
+        encoder = self.mEncoder
+        predictor = self.mPredictor
+        scale = BitPredictor.PROBABILITY_SCALE
+
+        for i in range(0, dataLen_):
+            symbol = dataToEncode_[i]
+
+            for shift in range(7, -1, -1):
+                bit = (symbol >> shift) & 1
+                prediction = predictor.predict()
+
+                # The 1 takes the bottom of the range, the 0 the rest
+                if(bit):
+                    encoder.encodeRange(0, prediction, scale)
+                else:
+                    encoder.encodeRange(prediction, scale, scale)
+
+                predictor.update(bit)
+
+        return self.mEncoder.finishEncode(True)
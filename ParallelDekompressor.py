@@ -0,0 +1,177 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class decompresses a whole stream with the blocks spread over a process pool. The block headers are read first,
+which gives the position of every block in the output, then one shared memory region is allocated for the full output
+and every worker decodes its blocks straight into their slices of it. The compressed stream is shared the same way, so
+only block positions go to the workers and nothing but a length comes back.
+
+Streams delta coded against a reference image are decoded in this process, still straight into the shared output
+"""
+
+import io
+import zlib
+from multiprocessing import shared_memory
+import StreamFormat
+from Dekompressor import Dekompressor
+
+# Dekompressor per stream header, kept by worker processes decoding blocks
+gBlockDekompressors = {}
+
+def decompressBlocksInto(headerData_, inputName_, outputName_, blocks_):
+    """
+    Decode blocks of a stream into their slices of the shared output buffer. Runs on the workers of the process pool
+
+    :param headerData_: The stream header of the stream (without a reference header)
+    :param inputName_: Name of the shared memory holding the compressed stream
+    :param outputName_: Name of the shared memory the output is decoded into
+    :param blocks_: [encodedOffset, encodedLen, originalLen, streamOffset, checksum] for every block to decode
+    :return: The number of bytes decoded
+    """
+
+    dekompressor = gBlockDekompressors.get(headerData_)
+
+    if(dekompressor is None):
+        dekompressor = Dekompressor()
+        dekompressor.setHeader(headerData_)
+        gBlockDekompressors[headerData_] = dekompressor
+
+    inputMemory = shared_memory.SharedMemory(inputName_)
+    outputMemory = shared_memory.SharedMemory(outputName_)
+
+    try:
+        return _decode_blocks(dekompressor, inputMemory.buf, outputMemory.buf, blocks_)
+    finally:
+        inputMemory.close()
+        outputMemory.close()
+
+def _decode_blocks(dekompressor_, inputBuffer_, outputBuffer_, blocks_):
+    """
+    Decode blocks into their slices of the output buffer and check their checksums
+
+    :param dekompressor_: Dekompressor with the stream header set
+    :param inputBuffer_: The compressed stream (memoryview)
+    :param outputBuffer_: The output of the whole stream (memoryview)
+    :param blocks_: [encodedOffset, encodedLen, originalLen, streamOffset, checksum] for every block to decode
+    :return: The number of bytes decoded
+    """
+
+    decodedLen = 0
+
+    for [encodedOffset, encodedLen, originalLen, streamOffset, checksum] in blocks_:
+        encodedData = inputBuffer_[encodedOffset:encodedOffset + encodedLen]
+        outputData = outputBuffer_[streamOffset:streamOffset + originalLen]
+
+        # The views must be released even if decoding fails, the shared memory can't be closed while they exist
+        try:
+            dekompressor_.decodeBlockInto(encodedData, encodedLen, outputData, streamOffset)
+
+            if((checksum is not None) and ((zlib.crc32(outputData) & 0xFFFFFFFF) != checksum)):
+                raise Exception("Block checksum does not match at offset " + str(streamOffset))
+        finally:
+            encodedData.release()
+            outputData.release()
+
+        decodedLen += originalLen
+
+    return decodedLen
+
+class ParallelDekompressor:
+    DEFAULT_BLOCKS_PER_TASK = 1
+
+    def __init__(self, executor_=None, referenceData_=None, blocksPerTask_=DEFAULT_BLOCKS_PER_TASK):
+        """
+        Initialize the object
+
+        :param executor_: concurrent.futures process pool the blocks are decoded on. If None they are decoded in this
+               process, still without the per block copies of Dekompressor
+        :param referenceData_: The reference image, required to decompress streams delta coded against a reference
+        :param blocksPerTask_: Number of consecutive blocks handed to a worker at a time
+        :return: None
+        """
+
+        if(blocksPerTask_ < 1):
+            raise Exception("Invalid number of blocks per task specified")
+
+        self.mExecutor = executor_
+        self.mBlocksPerTask = blocksPerTask_
+        self.mDekompressor = Dekompressor(referenceData_, pipelineDepth_=0)
+
+    def _read_block_index(self, streamData_):
+        """
+        Walk the block headers of a stream held in memory
+
+        :param streamData_: The compressed stream
+        :return: [blocks, outputLen, streamChecksum] where blocks holds [encodedOffset, encodedLen, originalLen,
+                 streamOffset, checksum] for every block and streamChecksum is None if the stream has no checksums
+        """
+
+        streamFile = io.BytesIO(streamData_)
+        self.mDekompressor.readHeader(streamFile)
+
+        blocks = []
+        outputLen = 0
+        streamChecksum = None
+        blockData = self.mDekompressor.readBlockData(streamFile)
+
+        while(blockData is not None):
+            [originalLen, encodedData, checksum] = blockData
+
+            if(encodedData is None):
+                streamChecksum = checksum
+            else:
+                blocks.append([streamFile.tell() - len(encodedData), len(encodedData), originalLen, outputLen, checksum])
+                outputLen += originalLen
+
+            blockData = self.mDekompressor.readBlockData(streamFile)
+
+        return [blocks, outputLen, streamChecksum]
+
+    def decompress(self, inputFile_, outputFile_):
+        """
+        Decompress the stream read from inputFile_ and write the original data to outputFile_
+
+        :param inputFile_: Binary file object holding the compressed stream
+        :param outputFile_: Binary file object the decompressed data is written to
+        :return: The number of bytes decompressed
+        """
+
+        streamData = inputFile_.read()
+        [blocks, outputLen, streamChecksum] = self._read_block_index(streamData)
+        headerData = self.mDekompressor.mHeaderData
+        flags = self.mDekompressor.mFlags
+
+        # Shared memory can't be empty
+        inputMemory = shared_memory.SharedMemory(create=True, size=max(1, len(streamData)))
+        outputMemory = shared_memory.SharedMemory(create=True, size=max(1, outputLen))
+
+        try:
+            inputMemory.buf[:len(streamData)] = streamData
+            outputBuffer = outputMemory.buf[:outputLen]
+
+            try:
+                if((self.mExecutor is None) or (flags & StreamFormat.FLAG_REFERENCE_DELTA)):
+                    _decode_blocks(self.mDekompressor, inputMemory.buf, outputMemory.buf, blocks)
+                else:
+                    futures = []
+
+                    for start in range(0, len(blocks), self.mBlocksPerTask):
+                        futures.append(self.mExecutor.submit(decompressBlocksInto, headerData, inputMemory.name,
+                                                             outputMemory.name, blocks[start:start + self.mBlocksPerTask]))
+
+                    for future in futures:
+                        future.result()
+
+                if((streamChecksum is not None) and ((zlib.crc32(outputBuffer) & 0xFFFFFFFF) != streamChecksum)):
+                    raise Exception("Stream checksum does not match")
+
+                outputFile_.write(outputBuffer)
+            finally:
+                outputBuffer.release()
+        finally:
+            inputMemory.close()
+            inputMemory.unlink()
+            outputMemory.close()
+            outputMemory.unlink()
+
+        return outputLen
@@ -0,0 +1,183 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class measures the wall clock time spent in each phase of compression or decompression. The methods that make up
+a phase are wrapped at class level while the timer is installed, so every instance (including the ones created inside
+Kompressor and Dekompressor) is measured and nothing is left in the hot paths once it is removed. Time is exclusive: a
+phase that calls into another phase is paused while the inner one runs, so the phases add up to the measured run.
+
+    parse:        reading blocks and splitting .dld records (or waiting for the reader thread)
+    model lookup: finding symbols in the context tables and updating counts, escapes, match and bit models
+    range update: narrowing the coder range for a symbol
+    rescale:      E1/E2/E3 scaling of the coder range
+    bit I/O:      shifting single bits in and out of the coded data
+    output:       writing blocks (or waiting for the writer thread)
+
+Only calls made on the thread that installed the timer are counted
+"""
+
+import importlib
+import threading
+import time
+
+class PhaseTimer:
+    PHASE_OTHER = 'other'
+    PHASES = ['parse', 'model lookup', 'range update', 'rescale', 'bit I/O', 'output']
+
+    # Class name to [method name, phase] of every method that is timed
+    METHOD_PHASES = {
+        'Kompressor': [['_read_block', 'parse']],
+        'Dekompressor': [['readBlockData', 'parse']],
+        'DldRecordEncoder': [['parseRecords', 'parse']],
+        'BlockReader': [['next', 'parse']],
+        'BlockWriter': [['write', 'output'], ['flush', 'output'], ['close', 'output']],
+        'ContextEncoder': [['findSymbolIndex', 'model lookup'], ['_update_range_tags', 'range update'],
+                           ['encodeRange', 'range update'], ['_rescale', 'rescale'], ['_append_bit', 'bit I/O']],
+        'ContextDecoder': [['findSymbolIndex', 'model lookup'], ['decodeFromTable', 'model lookup'],
+                           ['_update_range_tags', 'range update'], ['getCumulativeCount', 'range update'],
+                           ['decodeRange', 'range update'], ['_rescale', 'rescale'], ['_get_next_bit', 'bit I/O']],
+        'EscapeEstimator': [['countSymbol', 'model lookup'], ['addSymbol', 'model lookup'],
+                            ['prepareEscape', 'model lookup'], ['updateEscape', 'model lookup']],
+        'MatchFinder': [['findMatch', 'model lookup'], ['insert', 'model lookup']],
+        'BitPredictor': [['predict', 'model lookup'], ['update', 'model lookup']],
+        'FrequencyTable': [['getSymbolRange', 'model lookup'], ['findSymbol', 'model lookup'],
+                           ['countSymbol', 'model lookup'], ['addSymbol', 'model lookup']],
+    }
+
+    def __init__(self):
+        """
+        Initialize the object
+
+        :return: None
+        """
+
+        self.mPatched = []                                                         # [class, method name, original method]
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the measured times
+
+        :return: None
+        """
+
+        if(len(self.mPatched) > 0):
+            raise Exception("Phase timer can't be reset while installed")
+
+        # Shared with the wrappers, which is why these are only ever changed in place
+        self.mTimes = dict([[phase, 0.0] for phase in self.PHASES + [self.PHASE_OTHER]])
+        self.mCalls = dict([[phase, 0] for phase in self.PHASES + [self.PHASE_OTHER]])
+        self.mStack = [self.PHASE_OTHER]                                           # Running phases, innermost last
+        self.mMark = [0.0]                                                         # Time the running phase was last charged
+        self.mStartTime = None
+        self.mTotalTime = 0.0
+
+    def _wrap(self, method_, phase_, threadId_):
+        """
+        Create the timed replacement of a method. The time since the last mark is charged to the phase that was running
+        when the method is entered and to phase_ when it returns. Kept as lean as possible, it runs for every call
+
+        :param method_: The original function
+        :param phase_: The phase it belongs to
+        :param threadId_: Only calls from this thread are timed
+        :return: The replacement function
+        """
+
+        times = self.mTimes
+        calls = self.mCalls
+        stack = self.mStack
+        mark = self.mMark
+        perfCounter = time.perf_counter
+        getIdent = threading.get_ident
+
+        def timedMethod(*args, **kwargs):
+            if(getIdent() != threadId_):
+                return method_(*args, **kwargs)
+
+            now = perfCounter()
+            times[stack[-1]] += now - mark[0]
+            calls[phase_] += 1
+            stack.append(phase_)
+            mark[0] = now
+
+            try:
+                return method_(*args, **kwargs)
+            finally:
+                now = perfCounter()
+                times[stack.pop()] += now - mark[0]
+                mark[0] = now
+
+        timedMethod.__name__ = method_.__name__
+        timedMethod.__doc__ = method_.__doc__
+
+        return timedMethod
+
+    def install(self, classes_=None):
+        """
+        Start timing. The methods listed in METHOD_PHASES are replaced on the classes given
+
+        :param classes_: The classes to instrument. If None every class in METHOD_PHASES is imported from the module of
+               the same name
+        :return: None
+        """
+
+        if(len(self.mPatched) > 0):
+            raise Exception("Phase timer already installed")
+
+        if(classes_ is None):
+            classes_ = [getattr(importlib.import_module(className), className) for className in self.METHOD_PHASES]
+
+        threadId = threading.get_ident()
+
+        for classType in classes_:
+            for [methodName, phase] in self.METHOD_PHASES.get(classType.__name__, []):
+                method = classType.__dict__[methodName]
+                self.mPatched.append([classType, methodName, method])
+                setattr(classType, methodName, self._wrap(method, phase, threadId))
+
+        self.mStartTime = time.perf_counter()
+        self.mMark[0] = self.mStartTime
+
+    def remove(self):
+        """
+        Stop timing and restore the original methods
+
+        :return: None
+        """
+
+        if(self.mStartTime is not None):
+            now = time.perf_counter()
+            self.mTimes[self.PHASE_OTHER] += now - self.mMark[0]
+            self.mTotalTime += now - self.mStartTime
+            self.mStartTime = None
+
+        for [classType, methodName, method] in self.mPatched:
+            setattr(classType, methodName, method)
+
+        self.mPatched = []
+
+    def getTimes(self):
+        """
+        Get the measured time of every phase
+
+        :return: Dictionary of phase name to [seconds, calls]. Time outside every phase is reported as PHASE_OTHER
+        """
+
+        return dict([[phase, [self.mTimes[phase], self.mCalls[phase]]] for phase in self.PHASES + [self.PHASE_OTHER]])
+
+    def formatReport(self):
+        """
+        Format the measured times as a table, one line per phase
+
+        :return: The report (string)
+        """
+
+        totalTime = max(self.mTotalTime, 1e-9)
+        lines = ['%-14s %10s %7s %12s' % ('phase', 'seconds', '%', 'calls')]
+
+        for [phase, [seconds, calls]] in self.getTimes().items():
+            lines.append('%-14s %10.3f %6.1f%% %12d' % (phase, seconds, (100.0 * seconds) / totalTime, calls))
+
+        lines.append('%-14s %10.3f' % ('total', self.mTotalTime))
+
+        return '\n'.join(lines)
@@ -0,0 +1,189 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class reads any range of the original data of compressed files (.kmp streams) without decompressing the whole
+file. The block headers of a file are walked once to find where each block lies, a read then decodes only the blocks
+the range overlaps. Decoded blocks go through a BlockCache keyed by the file identity (device and inode), the block index
+and the modification time, so repeated reads of the same regions are served from memory and a file that changed on
+disk is never read from stale blocks
+"""
+
+import bisect
+import os
+import threading
+import StreamFormat
+from BlockCache import BlockCache
+from Dekompressor import Dekompressor
+
+class RandomAccessReader:
+
+    def __init__(self, cache_=None, referenceData_=None):
+        """
+        Initialize the object
+
+        :param cache_: The BlockCache decoded blocks are kept in, None for a cache of the default size. A cache can be
+               shared by several readers
+        :param referenceData_: The reference image, required for files delta coded against a reference
+        :return: None
+        """
+
+        self.mCache = cache_ if (cache_ is not None) else BlockCache()
+        self.mReferenceData = referenceData_
+        self.mLock = threading.Lock()
+        self.mFiles = {}                                                           # File identity to [mtime, dekompressor, blocks, streamOffsets, streamLen]
+
+    def _get_identity(self, path_):
+        """
+        Get the identity and modification time of a file
+
+        :param path_: The compressed file
+        :return: [identity, mtime]
+        """
+
+        fileStat = os.stat(path_)
+
+        return [(fileStat.st_dev, fileStat.st_ino), fileStat.st_mtime_ns]
+
+    def _read_index(self, path_):
+        """
+        Walk the block headers of a file, the encoded data is skipped
+
+        :param path_: The compressed file
+        :return: [dekompressor, blocks, streamOffsets, streamLen] where blocks holds [fileOffset, originalLen] of every
+                 block and streamOffsets the position of every block within the original data
+        """
+
+        dekompressor = Dekompressor(self.mReferenceData, pipelineDepth_=0)
+        blocks = []
+        streamOffsets = []
+        streamLen = 0
+
+        with open(path_, 'rb') as inputFile:
+            dekompressor.readHeader(inputFile)
+            blockHeaderSize = StreamFormat.getBlockHeaderSize(dekompressor.mFlags)
+            fileOffset = inputFile.tell()
+            headerData = inputFile.read(blockHeaderSize)
+
+            while(len(headerData) == blockHeaderSize):
+                [originalLen, compressedLen] = StreamFormat.unpackBlockHeader(headerData)
+
+                # The end marker of a stream with checksums
+                if((originalLen == 0) and (compressedLen == 0)):
+                    break
+
+                blocks.append([fileOffset, originalLen])
+                streamOffsets.append(streamLen)
+                streamLen += originalLen
+                fileOffset = inputFile.seek(compressedLen, os.SEEK_CUR)
+                headerData = inputFile.read(blockHeaderSize)
+
+        return [dekompressor, blocks, streamOffsets, streamLen]
+
+    def _get_file(self, path_):
+        """
+        Get the block index of a file, walking its block headers again if the file was modified since
+
+        :param path_: The compressed file
+        :return: [identity, mtime, dekompressor, blocks, streamOffsets, streamLen]
+        """
+
+        [identity, mtime] = self._get_identity(path_)
+
+        with self.mLock:
+            fileEntry = self.mFiles.get(identity)
+
+        if((fileEntry is None) or (fileEntry[0] != mtime)):
+            fileEntry = [mtime] + self._read_index(path_)
+
+            with self.mLock:
+                self.mFiles[identity] = fileEntry
+
+        return [identity] + fileEntry
+
+    def _read_block(self, path_, fileEntry_, blockIndex_):
+        """
+        Get the decompressed data of a block, from the cache if it holds the block
+
+        :param path_: The compressed file
+        :param fileEntry_: The file as returned by _get_file
+        :param blockIndex_: The index of the block within the file
+        :return: The decompressed data of the block (bytes)
+        """
+
+        [identity, mtime, dekompressor, blocks, streamOffsets, streamLen] = fileEntry_
+        key = (identity, blockIndex_, mtime)
+        blockData = self.mCache.get(key)
+
+        if(blockData is not None):
+            return blockData
+
+        [fileOffset, originalLen] = blocks[blockIndex_]
+
+        # The Dekompressor of a file is shared by every thread reading it
+        with self.mLock:
+            with open(path_, 'rb') as inputFile:
+                inputFile.seek(fileOffset)
+                dekompressor.setStreamOffset(streamOffsets[blockIndex_])
+                blockData = dekompressor.readBlock(inputFile)
+
+        if((blockData is None) or (len(blockData) != originalLen)):
+            raise Exception("Block data truncated")
+
+        blockData = bytes(blockData)
+        self.mCache.put(key, blockData)
+
+        return blockData
+
+    def getLength(self, path_):
+        """
+        Get the length of the original data of a file
+
+        :param path_: The compressed file
+        :return: The number of bytes the file decompresses to
+        """
+
+        return self._get_file(path_)[5]
+
+    def readAt(self, path_, offset_, length_):
+        """
+        Read a range of the original data of a file. Only the blocks the range overlaps are decoded, blocks decoded
+        before are copied out of the cache
+
+        :param path_: The compressed file
+        :param offset_: The position of the range within the original data
+        :param length_: The number of bytes to read
+        :return: The data (bytes), shorter than length_ if the range runs past the end of the original data
+        """
+
+        if((offset_ < 0) or (length_ < 0)):
+            raise Exception("Invalid read range specified")
+
+        fileEntry = self._get_file(path_)
+        [identity, mtime, dekompressor, blocks, streamOffsets, streamLen] = fileEntry
+        endOffset = min(offset_ + length_, streamLen)
+
+        if(offset_ >= endOffset):
+            return b''
+
+        blockIndex = bisect.bisect_right(streamOffsets, offset_) - 1
+        parts = []
+        position = offset_
+
+        while(position < endOffset):
+            blockData = self._read_block(path_, fileEntry, blockIndex)
+            blockStart = position - streamOffsets[blockIndex]
+            blockEnd = min(len(blockData), endOffset - streamOffsets[blockIndex])
+            parts.append(blockData[blockStart:blockEnd])
+            position += blockEnd - blockStart
+            blockIndex += 1
+
+        return parts[0] if (len(parts) == 1) else b''.join(parts)
+
+    def getStats(self):
+        """
+        Get the statistics of the cache
+
+        :return: Dictionary of the number of hits, misses, evictions, cached blocks and cached bytes
+        """
+
+        return self.mCache.getStats()
@@ -0,0 +1,100 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement a rolling hash index of a reference image. The reference is split into BLOCK_LEN byte blocks
+and the hash of every block is stored. The data being compressed is scanned one byte at a time with a rolling hash, so
+any run of at least 2 * BLOCK_LEN bytes shared with the reference is found no matter how far it moved
+"""
+
+class ReferenceIndex:
+    BLOCK_LEN = 16
+    HASH_BASE = 257
+    HASH_MASK = 0xFFFFFFFF
+
+    def __init__(self, referenceData_):
+        """
+        Initialize the object and index the reference
+
+        :param referenceData_: The reference image (bytes, bytearray or integer array)
+        :return: None
+        """
+
+        self.mReferenceData = referenceData_
+        self.mReferenceLen = len(referenceData_)
+        self.mBlockHashes = {}                                                 # Block hash -> offset of the first block with the hash
+
+        # Multiplier that removes the oldest byte from the rolling hash
+        self.mRemoveFactor = pow(self.HASH_BASE, self.BLOCK_LEN - 1, self.HASH_MASK + 1)
+
+        for offset in range(0, self.mReferenceLen - self.BLOCK_LEN + 1, self.BLOCK_LEN):
+            blockHash = self.hash(referenceData_, offset)
+
+            if(blockHash not in self.mBlockHashes):
+                self.mBlockHashes[blockHash] = offset
+
+    def hash(self, data_, position_):
+        """
+        Calculate the hash of the BLOCK_LEN bytes starting at position_
+
+        :param data_: The data to hash
+        :param position_: Position of the first byte
+        :return: The hash value
+        """
+
+        hashValue = 0
+
+        for i in range(position_, position_ + self.BLOCK_LEN):
+            hashValue = ((hashValue * self.HASH_BASE) + data_[i]) & self.HASH_MASK
+
+        return hashValue
+
+    def roll(self, hashValue_, oldByte_, newByte_):
+        """
+        Move the hash one byte forward
+
+        :param hashValue_: The hash of the current BLOCK_LEN bytes
+        :param oldByte_: The first byte of the current bytes, which is removed
+        :param newByte_: The byte following the current bytes, which is added
+        :return: The hash of the next BLOCK_LEN bytes
+        """
+
+        hashValue_ = (hashValue_ - (oldByte_ * self.mRemoveFactor)) & self.HASH_MASK
+
+        return ((hashValue_ * self.HASH_BASE) + newByte_) & self.HASH_MASK
+
+    def findCopy(self, data_, dataLen_, position_, hashValue_, minPosition_):
+        """
+        Look up the hash in the index and extend a verified hit as far as possible in both directions
+
+        :param data_: The data being compressed
+        :param dataLen_: The number of bytes in data_
+        :param position_: Position of the hashed bytes in data_
+        :param hashValue_: The hash of the BLOCK_LEN bytes at position_
+        :param minPosition_: The copy will not be extended backwards past this position
+        :return: [copyStart, referenceOffset, copyLen] copyLen is 0 if there is no copy
+        """
+
+        referenceOffset = self.mBlockHashes.get(hashValue_)
+
+        if(referenceOffset is None):
+            return [0, 0, 0]
+
+        reference = self.mReferenceData
+
+        for i in range(0, self.BLOCK_LEN):
+            if(data_[position_ + i] != reference[referenceOffset + i]):
+                return [0, 0, 0]
+
+        copyStart = position_
+        copyEnd = position_ + self.BLOCK_LEN
+        referenceEnd = referenceOffset + self.BLOCK_LEN
+
+        while((copyStart > minPosition_) and (referenceOffset > 0) and (data_[copyStart - 1] == reference[referenceOffset - 1])):
+            copyStart -= 1
+            referenceOffset -= 1
+
+        while((copyEnd < dataLen_) and (referenceEnd < self.mReferenceLen) and (data_[copyEnd] == reference[referenceEnd])):
+            copyEnd += 1
+            referenceEnd += 1
+
+        return [copyStart, referenceOffset, copyEnd - copyStart]
@@ -0,0 +1,114 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class is a low overhead statistical profiler. A background thread wakes up at a fixed interval and records the
+call stack of the thread being profiled, nothing is added to the code being measured. The samples are written as
+collapsed stacks (one line per distinct stack, frames separated by ';' outermost first, followed by the sample count)
+which flamegraph.pl, speedscope and similar tools read directly. The sampling thread needs the interpreter lock to look
+at the stack so samples are taken at most about once per sys.getswitchinterval() (5 ms by default) while the profiled
+thread is busy
+"""
+
+import os
+import sys
+import threading
+import time
+
+class SamplingProfiler:
+    DEFAULT_INTERVAL = 0.001                                                   # Seconds between samples
+
+    def __init__(self, interval_=DEFAULT_INTERVAL):
+        """
+        Initialize the object
+
+        :param interval_: Seconds between samples
+        :return: None
+        """
+
+        if(interval_ <= 0):
+            raise Exception("Invalid sampling interval specified")
+
+        self.mInterval = interval_
+        self.mStacks = {}
+        self.mSampleCount = 0
+        self.mThread = None
+        self.mStopEvent = threading.Event()
+
+    @staticmethod
+    def _frame_name(frame_):
+        """
+        Name of a frame in the collapsed output
+
+        :param frame_: The frame
+        :return: module:function
+        """
+
+        code = frame_.f_code
+
+        return os.path.splitext(os.path.basename(code.co_filename))[0] + ':' + code.co_name
+
+    def _run(self, threadId_):
+        """
+        Take samples of the profiled thread until stop is called
+
+        :param threadId_: Identifier of the thread being profiled
+        :return: None
+        """
+
+        while(not self.mStopEvent.wait(self.mInterval)):
+            frame = sys._current_frames().get(threadId_)
+
+            if(frame is None):
+                continue
+
+            names = []
+
+            while(frame is not None):
+                names.append(self._frame_name(frame))
+                frame = frame.f_back
+
+            names.reverse()
+            stack = ';'.join(names)
+            self.mStacks[stack] = self.mStacks.get(stack, 0) + 1
+            self.mSampleCount += 1
+
+    def start(self):
+        """
+        Start sampling the calling thread
+
+        :return: None
+        """
+
+        if(self.mThread is not None):
+            raise Exception("Profiler already running")
+
+        self.mStopEvent.clear()
+        self.mThread = threading.Thread(target=self._run, args=(threading.get_ident(),), daemon=True)
+        self.mThread.start()
+
+    def stop(self):
+        """
+        Stop sampling
+
+        :return: None
+        """
+
+        if(self.mThread is None):
+            return
+
+        self.mStopEvent.set()
+        self.mThread.join()
+        self.mThread = None
+
+    def writeCollapsed(self, outputFile_):
+        """
+        Write the samples as collapsed stacks, most frequent first
+
+        :param outputFile_: Text file object to write to
+        :return: The number of samples written
+        """
+
+        for [stack, count] in sorted(self.mStacks.items(), key=lambda item_: item_[1], reverse=True):
+            outputFile_.write(stack + ' ' + str(count) + '\n')
+
+        return self.mSampleCount
@@ -0,0 +1,112 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement the decoder for data produced by SemiStaticEncoder. The frozen tables are read from the start
+of the block and a cumulative count to symbol lookup array is built for each one, so every symbol is found with a single
+index instead of a walk through the table
+"""
+
+from ContextDecoder import ContextDecoder
+from SemiStaticEncoder import SemiStaticEncoder
+from SymbolModel import SymbolModel
+
+class SemiStaticDecoder:
+
+    def __init__(self, wordSize_):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that was used for encoding
+        :return: None
+        """
+
+        self.mDecoder = ContextDecoder(wordSize_)
+
+        self.mTableFlagModel = SymbolModel(2)
+        self.mTableSizeModel = SymbolModel(256)
+        self.mSymbolGapModel = SymbolModel(256)
+        self.mLevelModel = SymbolModel(SemiStaticEncoder.NUM_LEVELS)
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the coder and the models used to read the tables
+
+        :return: None
+        """
+
+        self.mDecoder.reset()
+
+        for model in [self.mTableFlagModel, self.mTableSizeModel, self.mSymbolGapModel, self.mLevelModel]:
+            model.reset()
+
+    def _decode_table(self):
+        """
+        Read a table sent by SemiStaticEncoder._encode_table and build its lookup array
+
+        :return: [cumulativeCounts, totalCount, lookup] lookup holds the symbol for every cumulative count
+        """
+
+        levels = [0] * 256
+        tableSize = self.mDecoder.decodeModelSymbol(self.mTableSizeModel) + 1
+        nextSymbol = 0
+
+        for i in range(0, tableSize):
+            symbol = nextSymbol + self.mDecoder.decodeModelSymbol(self.mSymbolGapModel)
+
+            if(symbol > 255):
+                raise Exception("Invalid table symbol")
+
+            levels[symbol] = self.mDecoder.decodeModelSymbol(self.mLevelModel) + 1
+            nextSymbol = symbol + 1
+
+        [counts, cumulativeCounts, totalCount] = SemiStaticEncoder.getLevelCounts(levels)
+        lookup = bytearray(totalCount)
+
+        for symbol in range(0, 256):
+            lookup[cumulativeCounts[symbol]:cumulativeCounts[symbol + 1]] = bytes([symbol]) * counts[symbol]
+
+        return [cumulativeCounts, totalCount, lookup]
+
+    def decode(self, encodedData_, encodedDataLen_, decodedData_, maxDecodedDataLen_, originalLen_):
+        """
+        Decompress the data passed in. The decoder is reset before decoding
+
+        :param encodedData_: The data that needs to be decoded (bytearray)
+        :param encodedDataLen_: The length of data that needs to be decoded
+        :param decodedData_: The decoded data (integer array)
+        :param maxDecodedDataLen_ : The max number of symbols that can be stored in decodedData_ array
+        :param originalLen_: The number of symbols that were encoded
+        :return: Returns the number of symbols stored in decodedData_
+        """
+
+        if(len(decodedData_) < maxDecodedDataLen_):
+            raise Exception("Decompressed data byte array passed in smaller than expected")
+
+        if(originalLen_ > maxDecodedDataLen_):
+            raise Exception('Not enough space to store decoded data')
+
+        self.reset()
+        self.mDecoder.startDecode(encodedData_, encodedDataLen_)
+
+        if(originalLen_ == 0):
+            return 0
+
+        zeroOrderTable = self._decode_table()
+        tables = [zeroOrderTable] * 256
+
+        for context in range(0, 256):
+            if(self.mDecoder.decodeModelSymbol(self.mTableFlagModel)):
+                tables[context] = self._decode_table()
+
+        decoder = self.mDecoder
+        [cumulativeCounts, totalCount, lookup] = zeroOrderTable
+
+        for i in range(0, originalLen_):
+            symbol = lookup[decoder.getCumulativeCount(totalCount)]
+            decoder.decodeRange(cumulativeCounts[symbol], cumulativeCounts[symbol + 1], totalCount)
+            decodedData_[i] = symbol
+            [cumulativeCounts, totalCount, lookup] = tables[symbol]
+
+        return originalLen_
@@ -0,0 +1,245 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement two pass (semi-static) compression of a block. The first pass counts the order-0 and order-1
+symbol frequencies of the block and quantizes them into frozen tables, which are sent at the start of the block. The
+second pass codes the block with the frozen tables. As the tables never change the decoder can find each symbol through
+a cumulative count to symbol lookup instead of walking the table, and no statistics are updated while coding.
+
+Only contexts where a table of their own saves more than it costs to send get one, all other contexts share the order-0
+table. Table counts are sent as logarithmic levels (LEVEL_COUNTS) coded with adaptive models
+"""
+
+import math
+from ContextEncoder import ContextEncoder
+from SymbolModel import SymbolModel
+
+class SemiStaticEncoder:
+    # Count represented by each quantization level. Level 0 (not stored) means the symbol is not in the table
+    LEVEL_COUNTS = [1, 2, 3, 4, 6, 8, 11, 16, 23, 32, 45, 64, 91, 128, 181, 256, 362, 512, 724, 1024, 1448, 2048, 2896]
+    NUM_LEVELS = len(LEVEL_COUNTS)
+
+    MAX_TABLE_TOTAL = 4096                                                     # Limits the size of the decoder lookup arrays
+    TABLE_SYMBOL_BITS = 8                                                      # Estimated cost of sending one table entry
+    TABLE_HEADER_BITS = 8                                                      # Estimated cost of sending the size of a table
+
+    def __init__(self, wordSize_):
+        """
+        Initialize the object
+
+        :param wordSize_: The word size (bits) that will be used for encoding
+        :return: None
+        """
+
+        self.mEncoder = ContextEncoder(wordSize_)
+        self.mMaxTableTotal = min(self.MAX_TABLE_TOTAL, self.mEncoder.mMaxEncodeBytes)
+
+        if(self.mMaxTableTotal < 256):
+            raise Exception("Word size too small for semi-static tables")
+
+        # Models used to send the tables
+        self.mTableFlagModel = SymbolModel(2)
+        self.mTableSizeModel = SymbolModel(256)
+        self.mSymbolGapModel = SymbolModel(256)
+        self.mLevelModel = SymbolModel(self.NUM_LEVELS)
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the coder and the models used to send the tables
+
+        :return: None
+        """
+
+        self.mEncoder.reset()
+
+        for model in [self.mTableFlagModel, self.mTableSizeModel, self.mSymbolGapModel, self.mLevelModel]:
+            model.reset()
+
+    @staticmethod
+    def calculateMaxTableLen(dataLen_):
+        """
+        Calculate the extra room the tables may need on top of utils.calculateMaxEncodedLen. Every table entry (each
+        order-0 symbol and each distinct order-1 pair) takes at most 4 bytes, plus a flag for every context
+
+        :param dataLen_: The number of symbols that will be encoded
+        :return: The number of bytes to add to the encoded data buffer
+        """
+
+        return (4 * (min(dataLen_, 256) + dataLen_)) + 512
+
+    @staticmethod
+    def getLevelCounts(levels_):
+        """
+        Get the frozen table for a list of levels
+
+        :param levels_: The level of each of the 256 symbols, 0 if the symbol is not in the table
+        :return: [counts, cumulativeCounts, totalCount] cumulativeCounts has 257 entries, the range of symbol s is
+                 cumulativeCounts[s] to cumulativeCounts[s + 1]
+        """
+
+        counts = [0] * 256
+        cumulativeCounts = [0] * 257
+
+        for symbol in range(0, 256):
+            if(levels_[symbol] > 0):
+                counts[symbol] = SemiStaticEncoder.LEVEL_COUNTS[levels_[symbol] - 1]
+
+            cumulativeCounts[symbol + 1] = cumulativeCounts[symbol] + counts[symbol]
+
+        return [counts, cumulativeCounts, cumulativeCounts[256]]
+
+    def _quantize(self, symbolCounts_):
+        """
+        Quantize symbol counts to levels. The largest count is mapped to the top level and the others keep their
+        ratio to it. All levels are lowered until the table total fits
+
+        :param symbolCounts_: The number of occurrences of each of the 256 symbols
+        :return: The level of each symbol, 0 for symbols that did not occur
+        """
+
+        maxCount = max(symbolCounts_)
+        levels = [0] * 256
+
+        for symbol in range(0, 256):
+            if(symbolCounts_[symbol] > 0):
+                scaledCount = (symbolCounts_[symbol] * self.LEVEL_COUNTS[-1]) / maxCount
+
+                # Levels are spaced half a power of two apart
+                level = int(round(2 * math.log2(max(1.0, scaledCount))))
+                levels[symbol] = min(self.NUM_LEVELS, max(1, level))
+
+        while(self.getLevelCounts(levels)[2] > self.mMaxTableTotal):
+            for symbol in range(0, 256):
+                if(levels[symbol] > 1):
+                    levels[symbol] -= 1
+
+        return levels
+
+    @staticmethod
+    def _estimate_bits(symbolCounts_, levels_):
+        """
+        Estimate the number of bits needed to code the symbols with a frozen table
+
+        :param symbolCounts_: The number of occurrences of each of the 256 symbols
+        :param levels_: The levels of the table. Must include every symbol that occurs
+        :return: The estimated number of bits
+        """
+
+        [counts, cumulativeCounts, totalCount] = SemiStaticEncoder.getLevelCounts(levels_)
+        bits = 0.0
+
+        for symbol in range(0, 256):
+            if(symbolCounts_[symbol] > 0):
+                bits += symbolCounts_[symbol] * math.log2(totalCount / counts[symbol])
+
+        return bits
+
+    def _encode_table(self, levels_):
+        """
+        Send a table as the number of symbols it holds followed by the gap to each symbol and its level
+
+        :param levels_: The level of each of the 256 symbols, 0 if the symbol is not in the table
+        :return: None
+        """
+
+        symbols = [symbol for symbol in range(0, 256) if levels_[symbol] > 0]
+        self.mEncoder.encodeModelSymbol(len(symbols) - 1, self.mTableSizeModel)
+
+        nextSymbol = 0
+
+        for symbol in symbols:
+            self.mEncoder.encodeModelSymbol(symbol - nextSymbol, self.mSymbolGapModel)
+            self.mEncoder.encodeModelSymbol(levels_[symbol] - 1, self.mLevelModel)
+            nextSymbol = symbol + 1
+
+    def buildTables(self, dataToEncode_, dataLen_):
+        """
+        First pass. Count the symbol frequencies and pick the tables
+
+        :param dataToEncode_: The data that will be compressed (integer array)
+        :param dataLen_: The length of data that will be compressed
+        :return: [zeroOrderLevels, firstOrderLevels] firstOrderLevels holds the levels for each context, None for
+                 contexts that use the order-0 table
+        """
+
+        zeroOrderCounts = [0] * 256
+        firstOrderCounts = [None] * 256
+        previousSymbol = None
+
+        for i in range(0, dataLen_):
+            symbol = dataToEncode_[i]
+            zeroOrderCounts[symbol] += 1
+
+            if(previousSymbol is not None):
+                if(firstOrderCounts[previousSymbol] is None):
+                    firstOrderCounts[previousSymbol] = [0] * 256
+
+                firstOrderCounts[previousSymbol][symbol] += 1
+
+            previousSymbol = symbol
+
+        zeroOrderLevels = self._quantize(zeroOrderCounts)
+        firstOrderLevels = [None] * 256
+
+        # Give a context its own table only if the bits it saves outweigh the cost of sending it
+        for context in range(0, 256):
+            symbolCounts = firstOrderCounts[context]
+
+            if(symbolCounts is None):
+                continue
+
+            levels = self._quantize(symbolCounts)
+            tableBits = self.TABLE_HEADER_BITS + (self.TABLE_SYMBOL_BITS * (256 - levels.count(0)))
+
+            if((self._estimate_bits(symbolCounts, levels) + tableBits) < self._estimate_bits(symbolCounts, zeroOrderLevels)):
+                firstOrderLevels[context] = levels
+
+        return [zeroOrderLevels, firstOrderLevels]
+
+    def encode(self, dataToEncode_, dataLen_, encodedData_, maxEncodedDataLen_):
+        """
+        Encode the data passed in. The tables are sent first followed by the data. The decoder must be told the number
+        of symbols, no termination symbol is sent. The encoder is reset before encoding
+
+        :param dataToEncode_: The data that needs to be compressed (integer array)
+        :param dataLen_: The length of data that needs to be compressed
+        :param encodedData_: The compressed data should be stored in this byte array
+        :param maxEncodedDataLen_ : The max length of compressed data that can be stored in encodedData_
+        :return: The number of bytes stored in encodedData_
+        """
+
+        if(len(dataToEncode_) < dataLen_):
+            raise Exception("Data byte array passed in smaller than expected")
+
+        self.reset()
+        self.mEncoder.startEncode(encodedData_, maxEncodedDataLen_)
+
+        if(dataLen_ == 0):
+            return self.mEncoder.finishEncode(True)
+
+        [zeroOrderLevels, firstOrderLevels] = self.buildTables(dataToEncode_, dataLen_)
+
+        self._encode_table(zeroOrderLevels)
+        zeroOrderTable = self.getLevelCounts(zeroOrderLevels)
+        tables = [zeroOrderTable] * 256
+
+        for context in range(0, 256):
+            hasTable = 1 if (firstOrderLevels[context] is not None) else 0
+            self.mEncoder.encodeModelSymbol(hasTable, self.mTableFlagModel)
+
+            if(hasTable):
+                self._encode_table(firstOrderLevels[context])
+                tables[context] = self.getLevelCounts(firstOrderLevels[context])
+
+        # Second pass, the first symbol has no context and uses the order-0 table
+        table = zeroOrderTable
+
+        for i in range(0, dataLen_):
+            symbol = dataToEncode_[i]
+            cumulativeCounts = table[1]
+            self.mEncoder.encodeRange(cumulativeCounts[symbol], cumulativeCounts[symbol + 1], table[2])
+            table = tables[symbol]
+
+        return self.mEncoder.finishEncode(True)
@@ -0,0 +1,206 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class packs several files into one solid archive (see ArchiveFormat). The files are joined into a single stream so
+the context model carries what it learnt from one file into the next instead of starting from empty tables for each.
+Files are grouped by extension and within a group ordered so every file follows the one with the most similar byte
+histogram, which keeps the carried statistics useful. The model is reset at the start of every block of the stream, the
+blocks are the restart points extraction decodes from, so the block size bounds how much has to be decoded to get at a
+single file. A new block is also started where the type changes or the next file is not similar to the previous one,
+statistics carried over from unrelated data cost more than learning from empty tables
+"""
+
+import collections
+import os
+import zlib
+import ArchiveFormat
+import StreamFormat
+
+class SolidArchiver:
+    DEFAULT_RESTART_INTERVAL = 262144                                          # Block size of archives, bytes between model restarts
+    READ_SIZE = 65536                                                          # Bytes read at a time to build the histograms
+    RESTART_DISTANCE = 0.75                                                    # Histogram distance (0-2) above which the model is reset between files
+
+    def __init__(self, kompressor_):
+        """
+        Initialize the object
+
+        :param kompressor_: Kompressor that codes the stream. Its block size is the restart interval of the archive. The
+               record front end and planned blocks are not supported, blocks must hold exactly the block size
+        :return: None
+        """
+
+        if(kompressor_.mFlags & StreamFormat.FLAG_DLD_RECORDS):
+            raise Exception("Record front end can't be used in an archive")
+
+        if(kompressor_.mBlockPlanner is not None):
+            raise Exception("Planned blocks can't be used in an archive")
+
+        self.mKompressor = kompressor_
+        self.mArchiveOffset = 0
+        self.mRestartPoints = []
+        self.mHistograms = {}                                                      # Path to histogram of the files seen so far
+
+    def _group(self, path_):
+        """
+        Get the group of a file, files of the same type are stored together
+
+        :param path_: The file
+        :return: The group name (the lower case extension)
+        """
+
+        return os.path.splitext(path_)[1].lower()
+
+    def _histogram(self, path_):
+        """
+        Get the byte histogram of a file, normalized so files of different sizes can be compared. Each file is only read
+        once
+
+        :param path_: The file
+        :return: List of the frequency of each byte value (0-255)
+        """
+
+        if(path_ in self.mHistograms):
+            return self.mHistograms[path_]
+
+        counts = collections.Counter()
+
+        with open(path_, 'rb') as inputFile:
+            data = inputFile.read(self.READ_SIZE)
+
+            while(len(data) > 0):
+                counts.update(data)
+                data = inputFile.read(self.READ_SIZE)
+
+        totalCount = max(1, sum(counts.values()))
+        self.mHistograms[path_] = [counts[value] / totalCount for value in range(0, 256)]
+
+        return self.mHistograms[path_]
+
+    def _distance(self, pathA_, pathB_):
+        """
+        Measure how different the byte histograms of two files are
+
+        :param pathA_: The first file
+        :param pathB_: The second file
+        :return: The L1 distance of the histograms, 0 for identical histograms up to 2 for disjoint ones
+        """
+
+        return sum([abs(a - b) for [a, b] in zip(self._histogram(pathA_), self._histogram(pathB_))])
+
+    def orderFiles(self, paths_):
+        """
+        Choose the order the files are stored in. Files are grouped by extension, each group starts with its largest
+        file and continues with the file whose histogram is closest to the previous one
+
+        :param paths_: The files
+        :return: The files in archive order
+        """
+
+        groups = {}
+
+        for path in paths_:
+            groups.setdefault(self._group(path), []).append(path)
+
+        orderedPaths = []
+
+        for extension in sorted(groups):
+            remaining = sorted(groups[extension], key=os.path.getsize, reverse=True)
+            path = remaining.pop(0)
+            orderedPaths.append(path)
+
+            while(len(remaining) > 0):
+                previous = path
+                path = min(remaining, key=lambda path_: self._distance(previous, path_))
+                remaining.remove(path)
+                orderedPaths.append(path)
+
+        return orderedPaths
+
+    def _write_block(self, data_, outputFile_):
+        """
+        Compress the next block of the stream and record it as a restart point
+
+        :param data_: The data of the block
+        :param outputFile_: Binary file object the archive is written to
+        :return: None
+        """
+
+        self.mRestartPoints.append([self.mKompressor.mStreamOffset, self.mArchiveOffset])
+        block = self.mKompressor.compressBlock(data_, len(data_))
+        outputFile_.write(block)
+        self.mArchiveOffset += len(block)
+
+    def archive(self, paths_, outputFile_, order_=True, names_=None):
+        """
+        Write the files to a solid archive. Every file is stored under a name, which must be unique
+
+        :param paths_: The files to archive
+        :param outputFile_: Binary file object the archive is written to
+        :param order_: If True the files are reordered by orderFiles, otherwise they are stored in the order given
+        :param names_: The name of each file of paths_ in the archive, a relative path with '/' separators. None to store
+               the files under their base name
+        :return: [inputSize, outputSize]
+        """
+
+        if(names_ is None):
+            names_ = [os.path.basename(path) for path in paths_]
+
+        if(len(names_) != len(paths_)):
+            raise Exception("Every archived file must have a name")
+
+        if(len(set(names_)) != len(names_)):
+            raise Exception("Archived files must have unique names")
+
+        names = dict(zip(paths_, names_))
+
+        paths = self.orderFiles(paths_) if order_ else list(paths_)
+        blockSize = self.mKompressor.mBlockSize
+        files = []
+        blockData = bytearray()
+        previousPath = None
+        self.mRestartPoints = []
+        self.mKompressor.reset()
+
+        header = ArchiveFormat.packArchiveHeader() + self.mKompressor.getHeader()
+        outputFile_.write(header)
+        self.mArchiveOffset = len(header)
+
+        # Blocks run across the boundaries of similar files of a group, the model is reset before anything else
+        for path in paths:
+            if((len(blockData) > 0) and ((self._group(previousPath) != self._group(path)) or
+                                         (self._distance(previousPath, path) > self.RESTART_DISTANCE))):
+                self._write_block(blockData, outputFile_)
+                blockData = bytearray()
+
+            previousPath = path
+            fileOffset = self.mKompressor.mStreamOffset + len(blockData)
+            fileChecksum = 0
+
+            with open(path, 'rb') as inputFile:
+                data = inputFile.read(blockSize - len(blockData))
+
+                while(len(data) > 0):
+                    fileChecksum = zlib.crc32(data, fileChecksum) & 0xFFFFFFFF
+                    blockData.extend(data)
+
+                    if(len(blockData) == blockSize):
+                        self._write_block(blockData, outputFile_)
+                        blockData = bytearray()
+
+                    data = inputFile.read(blockSize - len(blockData))
+
+            files.append([names[path], fileOffset, self.mKompressor.mStreamOffset + len(blockData) - fileOffset,
+                          fileChecksum])
+
+        if(len(blockData) > 0):
+            self._write_block(blockData, outputFile_)
+
+        trailer = self.mKompressor.getTrailer()
+        outputFile_.write(trailer)
+        indexOffset = self.mArchiveOffset + len(trailer)
+
+        index = ArchiveFormat.packIndex(files, self.mRestartPoints) + ArchiveFormat.packTrailer(indexOffset)
+        outputFile_.write(index)
+
+        return [self.mKompressor.mStreamOffset, indexOffset + len(index)]
@@ -0,0 +1,210 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class reads solid archives written by SolidArchiver (see ArchiveFormat). The index at the end of the archive gives
+where every file lies in the stream and where every block (restart point) starts, so a single file is extracted by
+decoding only the blocks it overlaps
+"""
+
+import bisect
+import os
+import zlib
+import ArchiveFormat
+from Dekompressor import Dekompressor
+
+class SolidExtractor:
+
+    def __init__(self, referenceData_=None):
+        """
+        Initialize the object
+
+        :param referenceData_: The reference image, required for archives delta coded against a reference
+        :return: None
+        """
+
+        self.mDekompressor = Dekompressor(referenceData_, pipelineDepth_=0)
+        self.mInputFile = None
+        self.mFiles = []
+        self.mRestartPoints = []
+        self.mRestartOffsets = []
+
+    def open(self, inputFile_):
+        """
+        Read the header and index of an archive
+
+        :param inputFile_: Seekable binary file object holding the archive
+        :return: None
+        """
+
+        inputFile_.seek(0)
+        ArchiveFormat.checkArchiveHeader(inputFile_.read(ArchiveFormat.ARCHIVE_HEADER_SIZE))
+        self.mDekompressor.readHeader(inputFile_)
+
+        archiveSize = inputFile_.seek(0, os.SEEK_END)
+
+        if(archiveSize < ArchiveFormat.TRAILER_SIZE):
+            raise Exception("Archive trailer truncated")
+
+        inputFile_.seek(archiveSize - ArchiveFormat.TRAILER_SIZE)
+        indexOffset = ArchiveFormat.unpackTrailer(inputFile_.read(ArchiveFormat.TRAILER_SIZE))
+
+        if(indexOffset > archiveSize - ArchiveFormat.TRAILER_SIZE):
+            raise Exception("Archive index offset out of range")
+
+        inputFile_.seek(indexOffset)
+        [self.mFiles, self.mRestartPoints] = ArchiveFormat.unpackIndex(
+            inputFile_.read(archiveSize - ArchiveFormat.TRAILER_SIZE - indexOffset))
+
+        self.mRestartOffsets = [streamOffset for [streamOffset, archiveOffset] in self.mRestartPoints]
+        self.mInputFile = inputFile_
+
+    def getFiles(self):
+        """
+        Get the files held by the open archive
+
+        :return: List of [name, length] in archive order
+        """
+
+        return [[name, length] for [name, streamOffset, length, checksum] in self.mFiles]
+
+    def _read_restart_block(self, restartIndex_):
+        """
+        Decode the block starting at a restart point
+
+        :param restartIndex_: Index of the restart point
+        :return: The decompressed data of the block
+        """
+
+        if(restartIndex_ >= len(self.mRestartPoints)):
+            raise Exception("Archive stream truncated")
+
+        [streamOffset, archiveOffset] = self.mRestartPoints[restartIndex_]
+
+        self.mInputFile.seek(archiveOffset)
+        self.mDekompressor.setStreamOffset(streamOffset)
+        blockData = self.mDekompressor.readBlock(self.mInputFile)
+
+        if(blockData is None):
+            raise Exception("Archive stream truncated")
+
+        return blockData
+
+    def _extract_entries(self, entries_, writeFile_):
+        """
+        Decode the blocks holding the given files and write each file out. Consecutive files share the decoded blocks
+
+        :param entries_: [name, streamOffset, length, checksum] of the files to extract, in archive order
+        :param writeFile_: Called with the name and data of each file once its checksum was checked
+        :return: The number of bytes extracted
+        """
+
+        pendingData = bytearray()                                                  # Decoded data not yet written
+        pendingOffset = 0                                                          # Stream offset of pendingData
+        restartIndex = 0
+        extractedLen = 0
+
+        for [name, streamOffset, length, checksum] in entries_:
+            # Start from the restart point holding the file unless the decoded data already reaches it
+            if(streamOffset >= pendingOffset + len(pendingData)):
+                restartIndex = max(0, bisect.bisect_right(self.mRestartOffsets, streamOffset) - 1)
+                pendingData = bytearray()
+                pendingOffset = self.mRestartOffsets[restartIndex] if (len(self.mRestartOffsets) > 0) else 0
+
+            while(pendingOffset + len(pendingData) < streamOffset + length):
+                pendingData.extend(self._read_restart_block(restartIndex))
+                restartIndex += 1
+
+            del pendingData[:streamOffset - pendingOffset]
+            pendingOffset = streamOffset
+            fileData = pendingData[:length]
+
+            if((zlib.crc32(fileData) & 0xFFFFFFFF) != checksum):
+                raise Exception("File checksum does not match: " + name)
+
+            writeFile_(name, fileData)
+            extractedLen += length
+
+        return extractedLen
+
+    def _find_entry(self, name_):
+        """
+        Find a file in the index
+
+        :param name_: The name the file was archived under
+        :return: [name, streamOffset, length, checksum]
+        """
+
+        for entry in self.mFiles:
+            if(entry[0] == name_):
+                return entry
+
+        raise Exception("No such file in archive: " + name_)
+
+    def extract(self, name_, outputFile_):
+        """
+        Extract a single file, decoding only the blocks it overlaps
+
+        :param name_: The name the file was archived under
+        :param outputFile_: Binary file object the file is written to. It is left open
+        :return: The number of bytes extracted
+        """
+
+        return self._extract_entries([self._find_entry(name_)], lambda entryName_, data_: outputFile_.write(data_))
+
+    def extractAll(self, outputDirectory_, names_=None):
+        """
+        Extract files into a directory. The blocks of the archive are decoded at most once
+
+        :param outputDirectory_: The directory the files are written to
+        :param names_: The names of the files to extract, None for every file
+        :return: The number of bytes extracted
+        """
+
+        if(names_ is None):
+            entries = self.mFiles
+        else:
+            entries = sorted([self._find_entry(name) for name in names_], key=lambda entry_: entry_[1])
+
+        # Names are relative paths when archived, anything else could write outside the output directory
+        for [name, streamOffset, length, checksum] in entries:
+            if(not self._is_relative_name(name)):
+                raise Exception("Invalid file name in archive: " + name)
+
+        return self._extract_entries(entries, lambda name_, data_: self._write_file(outputDirectory_, name_, data_))
+
+    @staticmethod
+    def _is_relative_name(name_):
+        """
+        Check that a name stays within the directory it is extracted to
+
+        :param name_: The name the file was archived under
+        :return: True for a relative path of '/' separated parts, none of them empty, '.' or '..'
+        """
+
+        if(os.path.isabs(name_) or (os.path.splitdrive(name_)[0] != '') or ('\\' in name_)):
+            return False
+
+        for part in name_.split('/'):
+            if(part in ['', '.', '..']):
+                return False
+
+        return True
+
+    def _write_file(self, outputDirectory_, name_, data_):
+        """
+        Write an extracted file, creating the directories of its name
+
+        :param outputDirectory_: The directory the file is written to
+        :param name_: The name of the file
+        :param data_: The data of the file
+        :return: None
+        """
+
+        outputPath = os.path.join(outputDirectory_, *name_.split('/'))
+        directory = os.path.dirname(outputPath)
+
+        if((directory != '') and (not os.path.isdir(directory))):
+            os.makedirs(directory)
+
+        with open(outputPath, 'wb') as outputFile:
+            outputFile.write(data_)
@@ -0,0 +1,348 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Layout of the compressed stream produced by Kompressor and consumed by Dekompressor.
+
+    Stream header: magic (4 bytes), version (1 byte), word size (1 byte), flags (1 byte), escape method (1 byte),
+                   model flags (1 byte), block size (4 bytes)
+    Adaptation:    max total bits of the order-0 tables, the order-1 tables and the symbol models, aging shift, epoch
+                   bits (1 byte each, see AdaptationPolicy). Only present with MODEL_FLAG_ADAPTATION
+    Reference:     reference length (4 bytes), reference CRC32 (4 bytes). Only present with FLAG_REFERENCE_DELTA
+    Block header:  original length (4 bytes), compressed length (4 bytes)
+    Checksum:      CRC32 of the original data of the block (4 bytes). Only present with FLAG_CHECKSUM
+    Block mode:    BLOCK_MODE_CODED or BLOCK_MODE_STORED (1 byte). Starts the encoded data of every block and is counted
+                   in the compressed length. A stored block holds the original data, the remaining fields are absent
+    Sub-streams:   sub-stream count (1 byte), then original length (4 bytes), compressed length (4 bytes) for each
+                   sub-stream. Only present with FLAG_SUB_STREAMS, it is counted in the compressed length of the block
+    Thumb phase:   parity of the stream offsets the Thumb instructions start at (1 byte, see BranchFilter). Starts the
+                   encoded data of every sub-stream (of the block without sub-streams) and is counted in its compressed
+                   length. Only present in coded blocks with FLAG_THUMB_FILTER or MODEL_FLAG_HALFWORD_SYMBOLS, the
+                   halfword model pairs bytes from it. .dld records are filtered at the addresses of their lines instead
+
+The block header is followed by compressed length bytes of encoded data. Blocks follow each other until the end of the
+stream. With FLAG_CHECKSUM the last block is followed by an end marker, a block header with both lengths 0 whose checksum
+is the CRC32 of all the original data. All multi-byte values are little endian
+"""
+
+import struct
+import zlib
+
+STREAM_MAGIC = b'KMP2'
+STREAM_VERSION = 9
+
+FLAG_THUMB_FILTER = 0x01                                                   # Data was passed through the ARM Thumb branch filter
+FLAG_DLD_RECORDS = 0x02                                                    # Blocks hold .dld lines coded by the record aware front end
+FLAG_LZ_MATCHES = 0x04                                                     # Blocks were coded by the LZ77 match finder front end
+FLAG_REFERENCE_DELTA = 0x08                                                # Blocks were delta coded against a reference image
+FLAG_SEMI_STATIC = 0x10                                                    # Blocks start with frozen tables used to code the data
+FLAG_SUB_STREAMS = 0x20                                                    # Blocks are split into independently coded sub-streams
+FLAG_CHECKSUM = 0x40                                                       # Blocks carry a CRC32 and the stream ends with an end marker
+FLAG_CONTEXT_MIXING = 0x80                                                 # Blocks were coded bit by bit by the context mixing coder
+
+MODEL_FLAG_HALFWORD_SYMBOLS = 0x01                                         # Blocks were coded as 16-bit symbols by the halfword model
+MODEL_FLAG_ADAPTATION = 0x02                                               # The context model adapts as set by the adaptation header
+MODEL_FLAGS = MODEL_FLAG_HALFWORD_SYMBOLS | MODEL_FLAG_ADAPTATION          # Every model flag this version understands
+
+STREAM_HEADER_FORMAT = '<4sBBBBBI'
+STREAM_HEADER_SIZE = struct.calcsize(STREAM_HEADER_FORMAT)
+ADAPTATION_HEADER_FORMAT = '<BBBBB'
+ADAPTATION_HEADER_SIZE = struct.calcsize(ADAPTATION_HEADER_FORMAT)
+REFERENCE_HEADER_FORMAT = '<II'
+REFERENCE_HEADER_SIZE = struct.calcsize(REFERENCE_HEADER_FORMAT)
+BLOCK_HEADER_FORMAT = '<II'
+BLOCK_HEADER_SIZE = struct.calcsize(BLOCK_HEADER_FORMAT)
+CHECKSUM_FORMAT = '<I'
+CHECKSUM_SIZE = struct.calcsize(CHECKSUM_FORMAT)
+SUB_STREAM_COUNT_FORMAT = '<B'
+SUB_STREAM_COUNT_SIZE = struct.calcsize(SUB_STREAM_COUNT_FORMAT)
+SUB_STREAM_ENTRY_FORMAT = '<II'
+SUB_STREAM_ENTRY_SIZE = struct.calcsize(SUB_STREAM_ENTRY_FORMAT)
+MAX_SUB_STREAMS = 255
+BLOCK_MODE_FORMAT = '<B'
+BLOCK_MODE_SIZE = struct.calcsize(BLOCK_MODE_FORMAT)
+THUMB_PHASE_FORMAT = '<B'
+THUMB_PHASE_SIZE = struct.calcsize(THUMB_PHASE_FORMAT)
+
+BLOCK_MODE_CODED = 0                                                       # The block data was coded by the selected model
+BLOCK_MODE_STORED = 1                                                      # The block data did not compress and is stored as is
+
+def packStreamHeader(wordSize_, flags_, blockSize_, escapeMethod_, modelFlags_=0):
+    """
+    Create the stream header
+
+    :param wordSize_: The word size used by the encoder
+    :param flags_: Combination of the FLAG_ values describing how the data was processed
+    :param blockSize_: The max number of bytes in each block
+    :param escapeMethod_: The EscapeEstimator.METHOD_ value used by the context model
+    :param modelFlags_: Combination of the MODEL_FLAG_ values describing the model the blocks were coded with
+    :return: The stream header bytes
+    """
+
+    return struct.pack(STREAM_HEADER_FORMAT, STREAM_MAGIC, STREAM_VERSION, wordSize_, flags_, escapeMethod_, modelFlags_,
+                       blockSize_)
+
+def unpackStreamHeader(headerData_):
+    """
+    Parse and validate the stream header
+
+    :param headerData_: The first STREAM_HEADER_SIZE bytes of the stream
+    :return: [wordSize, flags, blockSize, escapeMethod, modelFlags]
+    """
+
+    if(len(headerData_) < STREAM_HEADER_SIZE):
+        raise Exception("Stream header truncated")
+
+    [magic, version, wordSize, flags, escapeMethod, modelFlags, blockSize] = \
+        struct.unpack(STREAM_HEADER_FORMAT, headerData_[:STREAM_HEADER_SIZE])
+
+    if(magic != STREAM_MAGIC):
+        raise Exception("Not a compressed stream")
+
+    if(version != STREAM_VERSION):
+        raise Exception("Unsupported stream version")
+
+    if(modelFlags & ~MODEL_FLAGS):
+        raise Exception("Unsupported model flags")
+
+    return [wordSize, flags, blockSize, escapeMethod, modelFlags]
+
+def packAdaptationHeader(fields_):
+    """
+    Create the header describing the adaptation policy of the context model
+
+    :param fields_: The values returned by AdaptationPolicy.getFields
+    :return: The adaptation header bytes
+    """
+
+    return struct.pack(ADAPTATION_HEADER_FORMAT, *fields_)
+
+def unpackAdaptationHeader(headerData_):
+    """
+    Parse the adaptation header
+
+    :param headerData_: ADAPTATION_HEADER_SIZE bytes of adaptation header
+    :return: [zeroOrderBits, firstOrderBits, modelBits, agingShift, epochBits]
+    """
+
+    if(len(headerData_) < ADAPTATION_HEADER_SIZE):
+        raise Exception("Adaptation header truncated")
+
+    return list(struct.unpack(ADAPTATION_HEADER_FORMAT, headerData_[:ADAPTATION_HEADER_SIZE]))
+
+def getStreamHeaderSize(flags_, modelFlags_):
+    """
+    Get the size of everything that precedes the first block
+
+    :param flags_: The flags from the stream header
+    :param modelFlags_: The model flags from the stream header
+    :return: The size of the stream header and of the adaptation and reference headers that follow it
+    """
+
+    headerSize = STREAM_HEADER_SIZE
+
+    if(modelFlags_ & MODEL_FLAG_ADAPTATION):
+        headerSize += ADAPTATION_HEADER_SIZE
+
+    if(flags_ & FLAG_REFERENCE_DELTA):
+        headerSize += REFERENCE_HEADER_SIZE
+
+    return headerSize
+
+def packReferenceHeader(referenceData_):
+    """
+    Create the header identifying the reference image a delta stream was coded against
+
+    :param referenceData_: The reference image
+    :return: The reference header bytes
+    """
+
+    return struct.pack(REFERENCE_HEADER_FORMAT, len(referenceData_), zlib.crc32(referenceData_) & 0xFFFFFFFF)
+
+def checkReferenceHeader(headerData_, referenceData_):
+    """
+    Check that the reference image is the one the stream was coded against
+
+    :param headerData_: REFERENCE_HEADER_SIZE bytes of reference header
+    :param referenceData_: The reference image provided for decoding
+    :return: None
+    """
+
+    if(len(headerData_) < REFERENCE_HEADER_SIZE):
+        raise Exception("Reference header truncated")
+
+    if(headerData_[:REFERENCE_HEADER_SIZE] != packReferenceHeader(referenceData_)):
+        raise Exception("Reference image does not match the one used for compression")
+
+def packBlockHeader(originalLen_, compressedLen_):
+    """
+    Create the block header
+
+    :param originalLen_: The number of bytes in the block before compression
+    :param compressedLen_: The number of encoded bytes following the header
+    :return: The block header bytes
+    """
+
+    return struct.pack(BLOCK_HEADER_FORMAT, originalLen_, compressedLen_)
+
+def unpackBlockHeader(headerData_):
+    """
+    Parse the block header
+
+    :param headerData_: BLOCK_HEADER_SIZE bytes of block header
+    :return: [originalLen, compressedLen]
+    """
+
+    if(len(headerData_) < BLOCK_HEADER_SIZE):
+        raise Exception("Block header truncated")
+
+    return list(struct.unpack(BLOCK_HEADER_FORMAT, headerData_[:BLOCK_HEADER_SIZE]))
+
+def getBlockHeaderSize(flags_):
+    """
+    Get the number of bytes before the encoded data of a block
+
+    :param flags_: The flags of the stream
+    :return: The block header size, including the checksum if the stream has one
+    """
+
+    if(flags_ & FLAG_CHECKSUM):
+        return BLOCK_HEADER_SIZE + CHECKSUM_SIZE
+
+    return BLOCK_HEADER_SIZE
+
+def packBlockMode(blockMode_):
+    """
+    Create the mode byte that starts the encoded data of a block
+
+    :param blockMode_: BLOCK_MODE_CODED or BLOCK_MODE_STORED
+    :return: The block mode bytes
+    """
+
+    return struct.pack(BLOCK_MODE_FORMAT, blockMode_)
+
+def unpackBlockMode(blockData_):
+    """
+    Parse the mode byte at the start of the encoded data of a block
+
+    :param blockData_: The encoded data of the block (without the block header)
+    :return: BLOCK_MODE_CODED or BLOCK_MODE_STORED
+    """
+
+    if(len(blockData_) < BLOCK_MODE_SIZE):
+        raise Exception("Block mode truncated")
+
+    [blockMode] = struct.unpack(BLOCK_MODE_FORMAT, blockData_[:BLOCK_MODE_SIZE])
+
+    if(blockMode not in [BLOCK_MODE_CODED, BLOCK_MODE_STORED]):
+        raise Exception("Unknown block mode")
+
+    return blockMode
+
+def hasThumbPhase(flags_, modelFlags_=0):
+    """
+    Check if the encoded data of every sub-stream starts with the Thumb phase. The branch filter and the halfword model
+    both need it, the halfword model pairs bytes from the phase
+
+    :param flags_: The flags of the stream
+    :param modelFlags_: The model flags of the stream
+    :return: True if the Thumb phase is present
+    """
+
+    if(modelFlags_ & MODEL_FLAG_HALFWORD_SYMBOLS):
+        return True
+
+    return ((flags_ & FLAG_THUMB_FILTER) != 0) and ((flags_ & FLAG_DLD_RECORDS) == 0)
+
+def packThumbPhase(phase_):
+    """
+    Create the Thumb phase that starts the encoded data of a sub-stream
+
+    :param phase_: 0 or 1, the parity of the stream offsets the instructions start at
+    :return: The Thumb phase bytes
+    """
+
+    return struct.pack(THUMB_PHASE_FORMAT, phase_)
+
+def unpackThumbPhase(encodedData_):
+    """
+    Parse the Thumb phase at the start of the encoded data of a sub-stream
+
+    :param encodedData_: The encoded data of the sub-stream
+    :return: 0 or 1, the parity of the stream offsets the instructions start at
+    """
+
+    if(len(encodedData_) < THUMB_PHASE_SIZE):
+        raise Exception("Thumb phase truncated")
+
+    [phase] = struct.unpack(THUMB_PHASE_FORMAT, encodedData_[:THUMB_PHASE_SIZE])
+
+    if(phase > 1):
+        raise Exception("Invalid Thumb phase")
+
+    return phase
+
+def packChecksum(checksum_):
+    """
+    Create the checksum that follows the block header
+
+    :param checksum_: The CRC32 value
+    :return: The checksum bytes
+    """
+
+    return struct.pack(CHECKSUM_FORMAT, checksum_)
+
+def unpackChecksum(checksumData_):
+    """
+    Parse the checksum that follows the block header
+
+    :param checksumData_: CHECKSUM_SIZE bytes of checksum
+    :return: The CRC32 value
+    """
+
+    if(len(checksumData_) < CHECKSUM_SIZE):
+        raise Exception("Checksum truncated")
+
+    return struct.unpack(CHECKSUM_FORMAT, checksumData_[:CHECKSUM_SIZE])[0]
+
+def packSubStreamTable(subStreams_):
+    """
+    Create the table describing the sub-streams of a block
+
+    :param subStreams_: List of [originalLen, compressedLen] for each sub-stream, in order
+    :return: The sub-stream table bytes
+    """
+
+    if(len(subStreams_) > MAX_SUB_STREAMS):
+        raise Exception("Too many sub-streams")
+
+    table = struct.pack(SUB_STREAM_COUNT_FORMAT, len(subStreams_))
+
+    for [originalLen, compressedLen] in subStreams_:
+        table += struct.pack(SUB_STREAM_ENTRY_FORMAT, originalLen, compressedLen)
+
+    return table
+
+def unpackSubStreamTable(blockData_):
+    """
+    Parse the sub-stream table at the start of the encoded data of a block
+
+    :param blockData_: The encoded data of the block (without the block header)
+    :return: [subStreams, tableSize] subStreams is a list of [originalLen, compressedLen], the data of the first
+             sub-stream starts tableSize bytes into the block
+    """
+
+    if(len(blockData_) < SUB_STREAM_COUNT_SIZE):
+        raise Exception("Sub-stream table truncated")
+
+    [subStreamCount] = struct.unpack(SUB_STREAM_COUNT_FORMAT, blockData_[:SUB_STREAM_COUNT_SIZE])
+    tableSize = SUB_STREAM_COUNT_SIZE + (subStreamCount * SUB_STREAM_ENTRY_SIZE)
+
+    if(len(blockData_) < tableSize):
+        raise Exception("Sub-stream table truncated")
+
+    subStreams = []
+
+    for offset in range(SUB_STREAM_COUNT_SIZE, tableSize, SUB_STREAM_ENTRY_SIZE):
+        subStreams.append(list(struct.unpack(SUB_STREAM_ENTRY_FORMAT, blockData_[offset:offset + SUB_STREAM_ENTRY_SIZE])))
+
+    return [subStreams, tableSize]
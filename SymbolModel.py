@@ -0,0 +1,34 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class holds the statistics for a small stand-alone alphabet (lengths, flags, header fields) which is coded in the
+same arithmetic coded stream as the context modeled data. Every symbol starts with a count of 1 so no escape is required
+"""
+
+class SymbolModel:
+
+    def __init__(self, numSymbols_):
+        """
+        Initialize the object
+
+        :param numSymbols_: The size of the alphabet. Symbols run from 0 to (numSymbols_ - 1)
+        :return: None
+        """
+
+        if(numSymbols_ < 1):
+            raise Exception("Invalid number of symbols specified")
+
+        self.mNumSymbols = numSymbols_
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the statistics so that all symbols are equally likely
+
+        :return: None
+        """
+
+        self.mSymbols = []
+        for i in range(0, self.mNumSymbols):
+            self.mSymbols.append([i, 1])
+        self.mSymbolCount = self.mNumSymbols
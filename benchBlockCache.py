@@ -0,0 +1,72 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Measure small reads at random offsets of a compressed file through RandomAccessReader, with the block cache and with a
+cache too small to hold a block (every read decodes). The reads are drawn from a few hot regions the way tools keep
+reading the same headers and tables. Prints the time per read, the cache statistics and checks every read against the
+original data
+
+Usage: python benchBlockCache.py inputFile [--size N] [--block-size N] [--reads N] [--read-size N] [--regions N]
+                                           [--cache-size N]
+"""
+
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+from Kompressor import Kompressor
+from BlockCache import BlockCache
+from RandomAccessReader import RandomAccessReader
+
+def runReads(path_, data_, offsets_, readSize_, cacheSize_):
+    """
+    Read readSize_ bytes at every offset, checking the result
+
+    :return: [seconds, cache statistics]
+    """
+
+    reader = RandomAccessReader(BlockCache(cacheSize_))
+    startTime = time.perf_counter()
+
+    for offset in offsets_:
+        if(reader.readAt(path_, offset, readSize_) != data_[offset:offset + readSize_]):
+            raise Exception("Read data does not match at offset " + str(offset))
+
+    return [time.perf_counter() - startTime, reader.getStats()]
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cached reads of a compressed file')
+    parser.add_argument('inputFile')
+    parser.add_argument('--size', type=int, default=262144, help='Bytes of the input file used, 0 for all')
+    parser.add_argument('--block-size', type=int, default=16384)
+    parser.add_argument('--reads', type=int, default=50)
+    parser.add_argument('--read-size', type=int, default=64)
+    parser.add_argument('--regions', type=int, default=4, help='Number of hot regions the reads fall in')
+    parser.add_argument('--cache-size', type=int, default=BlockCache.DEFAULT_MAX_BYTES)
+    args = parser.parse_args()
+
+    with open(args.inputFile, 'rb') as inputFile:
+        data = inputFile.read(args.size) if args.size else inputFile.read()
+
+    random.seed(0)
+    regions = [random.randrange(0, max(1, len(data) - args.read_size)) for i in range(0, args.regions)]
+    offsets = [min(random.choice(regions) + random.randrange(0, 256), max(0, len(data) - args.read_size))
+               for i in range(0, args.reads)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.kmp')
+
+        with open(path, 'wb') as compressedFile:
+            Kompressor(blockSize_=args.block_size).compress(io.BytesIO(data), compressedFile)
+
+        for [name, cacheSize] in [['cached', args.cache_size], ['uncached', 0]]:
+            [seconds, stats] = runReads(path, data, offsets, args.read_size, cacheSize)
+
+            print("%-8s %8.3f ms/read  hits: %d misses: %d evictions: %d cached: %d bytes" %
+                  (name, (1000.0 * seconds) / max(1, len(offsets)), stats['hits'], stats['misses'],
+                   stats['evictions'], stats['bytes']))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Compare the context mixing coder with the adaptive order-1 model. Prints the compressed size of both, the ratio gain of
+context mixing and the compression and decompression speed (bytes/s) of each
+
+Usage: python benchContextMixing.py inputFile [--size N] [--block-size N] [--word-size N] [--thumb-filter]
+"""
+
+import argparse
+import io
+import time
+from Kompressor import Kompressor
+from Dekompressor import Dekompressor
+
+def runMode(data_, contextMixing_, blockSize_, wordSize_, thumbFilter_):
+    """
+    Compress and decompress the data, checking the result
+
+    :return: [compressedSize, compressSeconds, decompressSeconds]
+    """
+
+    compressedFile = io.BytesIO()
+    startTime = time.perf_counter()
+    Kompressor(wordSize_, blockSize_, thumbFilter_, contextMixing_=contextMixing_).compress(io.BytesIO(data_),
+                                                                                           compressedFile)
+    compressTime = time.perf_counter() - startTime
+
+    decompressedFile = io.BytesIO()
+    startTime = time.perf_counter()
+    Dekompressor().decompress(io.BytesIO(compressedFile.getvalue()), decompressedFile)
+    decompressTime = time.perf_counter() - startTime
+
+    if(decompressedFile.getvalue() != data_):
+        raise Exception("Decompressed data does not match")
+
+    return [len(compressedFile.getvalue()), compressTime, decompressTime]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the context mixing and adaptive order-1 models')
+    parser.add_argument('inputFile')
+    parser.add_argument('--size', type=int, default=65536, help='Bytes of the input file used, 0 for all')
+    parser.add_argument('--block-size', type=int, default=Kompressor.DEFAULT_BLOCK_SIZE)
+    parser.add_argument('--word-size', type=int, default=Kompressor.DEFAULT_WORD_SIZE)
+    parser.add_argument('--thumb-filter', action='store_true', help='Convert ARM Thumb branch targets')
+    args = parser.parse_args()
+
+    with open(args.inputFile, 'rb') as inputFile:
+        data = inputFile.read(args.size) if args.size else inputFile.read()
+
+    results = {}
+
+    for [name, contextMixing] in [['order-1', False], ['mixing', True]]:
+        [compressedSize, compressTime, decompressTime] = runMode(data, contextMixing, args.block_size, args.word_size,
+                                                                 args.thumb_filter)
+        results[name] = compressedSize
+
+        print("%-8s size: %8d ratio: %6.2f%% compress: %9.0f bytes/s decompress: %9.0f bytes/s" %
+              (name, compressedSize, (100.0 * compressedSize) / max(1, len(data)),
+               len(data) / compressTime, len(data) / decompressTime))
+
+    print("Context mixing size change: %+.2f%%" % ((100.0 * (results['mixing'] - results['order-1'])) /
+                                                   max(1, results['order-1'])))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Compare the semi-static two pass mode with the adaptive model. Prints the compressed size of both, the ratio cost of the
+frozen tables and the compression and decompression speed
+
+Usage: python benchSemiStatic.py inputFile [--size N] [--block-size N] [--word-size N]
+"""
+
+import argparse
+import io
+import time
+from Kompressor import Kompressor
+from Dekompressor import Dekompressor
+
+def runMode(data_, semiStatic_, blockSize_, wordSize_):
+    """
+    Compress and decompress the data, checking the result
+
+    :return: [compressedSize, compressSeconds, decompressSeconds]
+    """
+
+    compressedFile = io.BytesIO()
+    startTime = time.perf_counter()
+    Kompressor(wordSize_, blockSize_, semiStatic_=semiStatic_).compress(io.BytesIO(data_), compressedFile)
+    compressTime = time.perf_counter() - startTime
+
+    decompressedFile = io.BytesIO()
+    startTime = time.perf_counter()
+    Dekompressor().decompress(io.BytesIO(compressedFile.getvalue()), decompressedFile)
+    decompressTime = time.perf_counter() - startTime
+
+    if(decompressedFile.getvalue() != data_):
+        raise Exception("Decompressed data does not match")
+
+    return [len(compressedFile.getvalue()), compressTime, decompressTime]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the semi-static and adaptive modes')
+    parser.add_argument('inputFile')
+    parser.add_argument('--size', type=int, default=65536, help='Bytes of the input file used, 0 for all')
+    parser.add_argument('--block-size', type=int, default=Kompressor.DEFAULT_BLOCK_SIZE)
+    parser.add_argument('--word-size', type=int, default=Kompressor.DEFAULT_WORD_SIZE)
+    args = parser.parse_args()
+
+    with open(args.inputFile, 'rb') as inputFile:
+        data = inputFile.read(args.size) if args.size else inputFile.read()
+
+    results = {}
+
+    for [name, semiStatic] in [['adaptive', False], ['semi-static', True]]:
+        [compressedSize, compressTime, decompressTime] = runMode(data, semiStatic, args.block_size, args.word_size)
+        results[name] = compressedSize
+
+        print("%-12s size: %8d ratio: %6.2f%% compress: %7.1f KB/s decompress: %7.1f KB/s" %
+              (name, compressedSize, (100.0 * compressedSize) / max(1, len(data)),
+               len(data) / 1024.0 / compressTime, len(data) / 1024.0 / decompressTime))
+
+    print("Semi-static ratio cost: %+.2f%%" % ((100.0 * (results['semi-static'] - results['adaptive'])) /
+                                                max(1, results['adaptive'])))
+
+if __name__ == "__main__":
+    main()
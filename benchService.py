@@ -0,0 +1,81 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Load generator for KompressorServer. Runs a number of concurrent clients that each compress (and optionally decompress and
+check) the input file repeatedly, then prints throughput, client side latency percentiles and the server metrics
+
+Usage: python benchService.py socketPath inputFile [--clients N] [--requests N] [--size N] [--verify]
+"""
+
+import argparse
+import asyncio
+import time
+from KompressorClient import KompressorClient
+
+async def runClient(socketPath_, data_, requests_, verify_, latencies_):
+    """
+    Send requests_ compress requests on one connection
+
+    :return: Number of bytes compressed
+    """
+
+    bytesIn = 0
+
+    async with KompressorClient(socketPath_) as client:
+        for i in range(0, requests_):
+            startTime = time.perf_counter()
+            compressedData = await client.compress(data_)
+            latencies_.append(time.perf_counter() - startTime)
+            bytesIn += len(data_)
+
+            if(verify_ and (await client.decompress(compressedData) != data_)):
+                raise Exception("Decompressed data does not match")
+
+    return bytesIn
+
+def percentile(sortedValues_, percentile_):
+    """
+    Get a percentile of a sorted list
+
+    :return: The value, 0 if the list is empty
+    """
+
+    if(len(sortedValues_) == 0):
+        return 0.0
+
+    return sortedValues_[min(len(sortedValues_) - 1, (len(sortedValues_) * percentile_) // 100)]
+
+async def run(args_):
+    with open(args_.inputFile, 'rb') as inputFile:
+        data = inputFile.read(args_.size) if args_.size else inputFile.read()
+
+    latencies = []
+    startTime = time.perf_counter()
+    results = await asyncio.gather(*[runClient(args_.socketPath, data, args_.requests, args_.verify, latencies)
+                                     for i in range(0, args_.clients)])
+    elapsed = time.perf_counter() - startTime
+
+    latencies.sort()
+    totalBytes = sum(results)
+
+    print("Requests: %d Bytes: %d Time: %.2fs" % (len(latencies), totalBytes, elapsed))
+    print("Throughput: %.1f KB/s %.2f requests/s" % (totalBytes / 1024.0 / elapsed, len(latencies) / elapsed))
+    print("Latency ms p50: %.1f p95: %.1f p99: %.1f" % (percentile(latencies, 50) * 1000.0,
+                                                        percentile(latencies, 95) * 1000.0,
+                                                        percentile(latencies, 99) * 1000.0))
+
+    async with KompressorClient(args_.socketPath) as client:
+        print("Server: " + str(await client.stats()))
+
+def main():
+    parser = argparse.ArgumentParser(description='Load generator for KompressorServer')
+    parser.add_argument('socketPath')
+    parser.add_argument('inputFile')
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=4)
+    parser.add_argument('--size', type=int, default=16384, help='Bytes of the input file sent per request, 0 for all')
+    parser.add_argument('--verify', action='store_true')
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
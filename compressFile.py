@@ -1,140 +1,42 @@
 __author__ = 'marko'
 
-import sys
-from Kompressor2 import Kompressor2
-from Dekompressor2 import Dekompressor2
-import cProfile
-import os
-import array
-from binascii import unhexlify
+import argparse
+import profiling
+from Kompressor import Kompressor
 
 def main():
 
-    if(len(sys.argv) < 2):
-        return
-
-    inputFileName = sys.argv[1]
-
-    if(len(sys.argv) == 3):
-        numLinesAtOnce = int(sys.argv[2])
-    else:
-        numLinesAtOnce = 1
+    parser = argparse.ArgumentParser(description='Compress a file and verify every block')
+    parser.add_argument('inputFile')
+    parser.add_argument('blockSize', type=int, nargs='?', default=Kompressor.DEFAULT_BLOCK_SIZE)
+    profiling.addProfileOptions(parser)
+    options = parser.parse_args()
 
+    inputFileName = options.inputFile
     outputCompressedFileName = inputFileName + '.compressed'
 
-    totalCompressionTime = 0
-    fileSize = 0
-    compressedFileSize = 0
-
-    inputData = array.array('i', [0]*2048)
-    inputDataSize = 0
-
-    kompressor = Kompressor2(2048*numLinesAtOnce, 10, 13)
-    dekompressor = Dekompressor2(2048*numLinesAtOnce, 10, 13)
-
-    # Hold all the compressed data in lines
-    compressedFileData = []
+    # .dld files are coded line by line with the record aware front end. Every block is decompressed and compared right
+    # after it is compressed and the CRC32 of the data is stored so later decompressions can verify it as well
+    kompressor = Kompressor(Kompressor.DEFAULT_WORD_SIZE, options.blockSize,
+                            dldRecords_=inputFileName.lower().endswith('.dld'), checksum_=True)
 
     print('Input Filename: ' + inputFileName);
     print('Output Filename: ' + outputCompressedFileName);
 
-    profile = cProfile.Profile()
-    profile.enable()
-    # Go through each line in file
-
-    lineCount = 0
-    dataToCompress = []
-
-    with open(inputFileName, 'r+') as f, open(outputCompressedFileName, 'wb+') as outputCompressedFile:
-
-        for line in f:
-
-            # Strip terminating characters and conver to hex from ascii
-            line = line.strip()
-            lineBytes = bytearray.fromhex(line)
-            inputDataSize = len(lineBytes)
-
-            # Copy the data into the integer array
-            for i in range(0, inputDataSize):
-                inputData[i] = lineBytes[i]
-
-            dataToCompress.extend(inputData[:inputDataSize])
-            dataToCompressSize = len(dataToCompress)
-            lineCount += 1
-
-            if(lineCount >= numLinesAtOnce):
-                kompressor.reset()
-                compressedData = bytearray(2048*numLinesAtOnce)
-                compressedLineLen = kompressor.kompress(dataToCompress, dataToCompressSize, compressedData, 2048*numLinesAtOnce,lastDataBlock=False)
-
-                compressedFileData.append([compressedLineLen, dataToCompressSize, compressedData])
-
-                #Write compressed line to compressed file
-                outputCompressedFile.write(compressedData[0:compressedLineLen])
+    profiler = profiling.startProfiling(options.profile)
 
-                fileSize += dataToCompressSize
-                compressedFileSize += compressedLineLen
+    with open(inputFileName, 'rb') as inputFile, open(outputCompressedFileName, 'wb') as outputCompressedFile:
+        [fileSize, compressedFileSize] = kompressor.compress(inputFile, outputCompressedFile, verify_=True)
 
-                dataToCompress = []
-                lineCount = 0
-                break
-
-    profile.disable()
+    profiling.stopProfiling(profiler, options.profile_output)
 
     print('Input File Size: ' + str(fileSize))
     print('Output File Size: ' + str(compressedFileSize))
-    print('Compression Percentage: ' + str(int(compressedFileSize/fileSize*100)) + '%')
-
-    profile.print_stats()
-
-    decompressedFileData = []
-    decompressedSize = 0
-
-    # Dekompress the data stored in memory
-    for i in range(0,len(compressedFileData)):
-        dekompressor.reset()
-        decompressedData = bytearray(2048*numLinesAtOnce)
-        [compressedLineLen, inputDataSize, compressedLineData]  = compressedFileData[i]
-
-        decompressedDataLen = dekompressor.dekompress(compressedLineData, compressedLineLen, decompressedData, 2048*numLinesAtOnce)
-
-        if(decompressedDataLen != inputDataSize):
-            print('ERROR decompressing 1 at line [' + str(i) + ']')
-            #exit(0)
-
-        decompressedSize += decompressedDataLen
-        decompressedFileData.append([decompressedDataLen, decompressedData])
-
-    #Go through and veriy all decompressed lines match original
-    count = 0
-    lineCount = 0
-    dataToCompare = bytearray()
-
-    with open(inputFileName, 'r+') as f:
-
-        for line in f:
-            # Strip terminating characters and conver to hex from ascii
-            line = line.strip()
-            lineBytes = bytearray.fromhex(line)
-
-            for dataByte in lineBytes:
-                dataToCompare.append(dataByte)
-
-            dataToCompareSize = len(dataToCompare)
-            lineCount += 1
-
-            if(lineCount >= numLinesAtOnce):
-
-                if(decompressedFileData[count][0] != dataToCompareSize or decompressedFileData[count][1][:decompressedFileData[count][0]] != dataToCompare):
-                    print('ERROR decompressing 2 on line [' + str(count) + ']\r\n')
-                    exit(0)
 
-                lineCount = 0
-                dataToCompare = bytearray()
-                count += 1
+    if(fileSize > 0):
+        print('Compression Percentage: ' + str(int(compressedFileSize/fileSize*100)) + '%')
 
-    print('\n\n')
     print('Decompression Validated')
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
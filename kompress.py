@@ -0,0 +1,650 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Command line tool for compressing batches of firmware images. Files are given as paths, globs or directories (searched
+recursively) and are scheduled largest first across a process pool so one big image does not end up last.
+
+    python kompress.py compress [options] paths...     Write <file>.kmp next to each file (or into --output)
+    python kompress.py decompress [options] paths...   Restore the original of each .kmp file. With --parallel-blocks
+                                                       the files are restored one at a time with the blocks of each
+                                                       spread over the workers, for a few large images
+    python kompress.py verify [options] paths...       Decompress each .kmp file in memory and check its checksums
+    python kompress.py stats paths...                  Show the stream header and block layout of each .kmp file
+    python kompress.py bench [options] paths...        Compress and decompress in memory and report the speed
+    python kompress.py archive [options] archive paths...
+                                                       Pack the files into one solid .kma archive coded as a single
+                                                       stream, --block-size sets the interval between model restarts
+    python kompress.py extract [options] paths...      Unpack .kma archives (only the --file ones if given)
+    python kompress.py list paths...                   Show the files held by .kma archives
+
+--profile phases prints the time spent in each coder phase, --profile sample writes collapsed stacks for flamegraph
+tools. Profiled runs process the files one after another in a single process
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import io
+import os
+import sys
+import time
+import profiling
+import StreamFormat
+from Kompressor import Kompressor
+from Dekompressor import Dekompressor
+from ParallelDekompressor import ParallelDekompressor
+from SolidArchiver import SolidArchiver
+from SolidExtractor import SolidExtractor
+from EscapeEstimator import EscapeEstimator
+from AdaptationPolicy import AdaptationPolicy
+
+COMPRESSED_EXTENSION = '.kmp'
+ARCHIVE_EXTENSION = '.kma'
+
+def findFiles(paths_, extension_=None):
+    """
+    Expand paths, globs and directories into a list of files
+
+    :param paths_: List of file paths, glob patterns or directories
+    :param extension_: If provided only files ending with it are taken from directories
+    :return: List of unique file paths
+    """
+
+    files = []
+
+    for path in paths_:
+        matches = glob.glob(path, recursive=True) if glob.has_magic(path) else [path]
+
+        for match in matches:
+            if(os.path.isdir(match)):
+                for [directory, subDirectories, fileNames] in os.walk(match):
+                    for fileName in sorted(fileNames):
+                        if((extension_ is None) or fileName.endswith(extension_)):
+                            files.append(os.path.join(directory, fileName))
+            elif(os.path.isfile(match)):
+                files.append(match)
+            else:
+                raise Exception("No such file or directory: " + match)
+
+    return list(dict.fromkeys(files))
+
+def findArchiveFiles(paths_, excludePath_):
+    """
+    Expand paths as findFiles does and give every file the name it is archived under, its path from the directory
+    holding the argument it was found through. A file given directly is archived under its base name, the files of a
+    directory under the directory name followed by their path within it
+
+    :param paths_: List of file paths, glob patterns or directories
+    :param excludePath_: File left out of the archive (the archive itself)
+    :return: [files, names]
+    """
+
+    names = {}
+
+    for path in paths_:
+        matches = glob.glob(path, recursive=True) if glob.has_magic(path) else [path]
+
+        for match in matches:
+            root = os.path.dirname(os.path.abspath(match))
+
+            for fileName in findFiles([match]):
+                if(os.path.abspath(fileName) != os.path.abspath(excludePath_)):
+                    names.setdefault(fileName, os.path.relpath(os.path.abspath(fileName), root).replace(os.sep, '/'))
+
+    return [list(names.keys()), list(names.values())]
+
+def getOutputPath(inputPath_, outputDirectory_, compress_):
+    """
+    Get the name of the file produced for an input file
+
+    :param inputPath_: The input file
+    :param outputDirectory_: Directory the output is written to, None to write next to the input
+    :param compress_: True when compressing, False when decompressing
+    :return: The output file path
+    """
+
+    if(compress_):
+        outputPath = inputPath_ + COMPRESSED_EXTENSION
+    elif(inputPath_.endswith(COMPRESSED_EXTENSION)):
+        outputPath = inputPath_[:-len(COMPRESSED_EXTENSION)]
+    else:
+        outputPath = inputPath_ + '.out'
+
+    if(outputDirectory_ is not None):
+        outputPath = os.path.join(outputDirectory_, os.path.basename(outputPath))
+
+    return outputPath
+
+def writeOutputFile(outputPath_, writeFunction_):
+    """
+    Write an output file through a partial file next to it, renamed once it is complete. A failed run removes the
+    partial file and never leaves a truncated output behind for the next run to skip as existing
+
+    :param outputPath_: The file to create
+    :param writeFunction_: Called with the partial file open for writing, returns the result
+    :return: The result of writeFunction_
+    """
+
+    partialPath = outputPath_ + Kompressor.PARTIAL_EXTENSION
+
+    try:
+        with open(partialPath, 'wb') as outputFile:
+            result = writeFunction_(outputFile)
+
+        os.replace(partialPath, outputPath_)
+    except Exception:
+        if(os.path.exists(partialPath)):
+            os.remove(partialPath)
+
+        raise
+
+    return result
+
+def readReference(options_):
+    """
+    Read the reference image given with --reference
+
+    :return: The reference data, None without a reference
+    """
+
+    if(getattr(options_, 'reference', None) is None):
+        return None
+
+    with open(options_.reference, 'rb') as referenceFile:
+        return referenceFile.read()
+
+def createKompressor(options_, inputPath_):
+    """
+    Create the Kompressor for a file from the command line options
+
+    :return: Kompressor object
+    """
+
+    referenceData = readReference(options_)
+
+    # The record front end can't be combined with these modes, they code .dld files as plain text
+    dldRecords = ((not options_.no_dld) and (not options_.context_mixing) and (not options_.halfword) and
+                  (not options_.semi_static) and (options_.reference is None) and inputPath_.lower().endswith('.dld'))
+
+    return Kompressor(options_.word_size, options_.block_size, options_.thumb_filter, dldRecords,
+                      0 if dldRecords else options_.match_window, referenceData_=referenceData,
+                      semiStatic_=options_.semi_static, subStreams_=1 if dldRecords else options_.sub_streams,
+                      checksum_=not options_.no_checksum, contextMixing_=options_.context_mixing,
+                      escapeMethod_=EscapeEstimator.METHOD_NAMES.index(options_.escape),
+                      pipelineDepth_=options_.pipeline_depth, minBlockSize_=0 if dldRecords else options_.min_block_size,
+                      halfwordSymbols_=options_.halfword,
+                      adaptation_=AdaptationPolicy([options_.order0_limit, options_.order1_limit, options_.model_limit],
+                                                   options_.aging_shift, options_.aging_epoch))
+
+def createDekompressor(options_):
+    """
+    Create the Dekompressor from the command line options
+
+    :return: Dekompressor object
+    """
+
+    return Dekompressor(readReference(options_), pipelineDepth_=options_.pipeline_depth)
+
+def compressTask(inputPath_, options_):
+    """
+    Compress one file. Runs in a worker process
+
+    :return: [inputPath, inputSize, outputSize, message]
+    """
+
+    outputPath = getOutputPath(inputPath_, options_.output, True)
+
+    if(os.path.exists(outputPath) and (not options_.force)):
+        return [inputPath_, 0, 0, 'skipped, ' + outputPath + ' exists']
+
+    kompressor = createKompressor(options_, inputPath_)
+
+    # An interrupted run leaves a checkpoint next to the partial output and is picked up from there on the next run
+    [inputSize, outputSize, resumeOffset] = kompressor.compressResumable(inputPath_, outputPath, options_.verify)
+
+    if(resumeOffset > 0):
+        return [inputPath_, inputSize, outputSize, outputPath + ', resumed at offset ' + str(resumeOffset)]
+
+    return [inputPath_, inputSize, outputSize, outputPath]
+
+def decompressTask(inputPath_, options_):
+    """
+    Decompress one file. Runs in a worker process
+
+    :return: [inputPath, inputSize, outputSize, message]
+    """
+
+    outputPath = getOutputPath(inputPath_, options_.output, False)
+
+    if(os.path.exists(outputPath) and (not options_.force)):
+        return [inputPath_, 0, 0, 'skipped, ' + outputPath + ' exists']
+
+    with open(inputPath_, 'rb') as inputFile:
+        outputSize = writeOutputFile(outputPath,
+                                     lambda outputFile_: createDekompressor(options_).decompress(inputFile, outputFile_))
+
+    return [inputPath_, os.path.getsize(inputPath_), outputSize, outputPath]
+
+def decompressParallel(paths_, options_):
+    """
+    Decompress the files one after another, each with its blocks decoded on every worker of the process pool straight
+    into a shared output buffer
+
+    :return: The number of files that failed
+    """
+
+    totalInput = 0
+    totalOutput = 0
+    errors = 0
+    startTime = time.perf_counter()
+    referenceData = readReference(options_)
+
+    with concurrent.futures.ProcessPoolExecutor(options_.jobs) as executor:
+        for path in paths_:
+            outputPath = getOutputPath(path, options_.output, False)
+
+            if(os.path.exists(outputPath) and (not options_.force)):
+                print('%s: 0 -> 0 bytes skipped, %s exists' % (path, outputPath))
+                continue
+
+            try:
+                with open(path, 'rb') as inputFile:
+                    outputSize = writeOutputFile(outputPath, lambda outputFile_: ParallelDekompressor(
+                        executor, referenceData).decompress(inputFile, outputFile_))
+
+                inputSize = os.path.getsize(path)
+                totalInput += inputSize
+                totalOutput += outputSize
+                print('%s: %d -> %d bytes %s' % (path, inputSize, outputSize, outputPath))
+            except Exception as e:
+                print('%s: ERROR %s' % (path, str(e)))
+                errors += 1
+
+    elapsed = time.perf_counter() - startTime
+
+    print('%d files, %d errors, %d -> %d bytes in %.2fs (%.1f KB/s)' %
+          (len(paths_), errors, totalInput, totalOutput, elapsed, totalInput / 1024.0 / max(elapsed, 1e-9)))
+
+    return errors
+
+class NullFile:
+    """
+    Output file that discards everything written to it
+    """
+
+    def write(self, data_):
+        return len(data_)
+
+def verifyTask(inputPath_, options_):
+    """
+    Decompress one file without writing the result, checking the stored checksums. Runs in a worker process
+
+    :return: [inputPath, inputSize, outputSize, message]
+    """
+
+    with open(inputPath_, 'rb') as inputFile:
+        outputSize = createDekompressor(options_).decompress(inputFile, NullFile())
+
+        inputFile.seek(0)
+        [wordSize, flags, blockSize, escapeMethod, modelFlags] = StreamFormat.unpackStreamHeader(inputFile.read(StreamFormat.STREAM_HEADER_SIZE))
+
+    message = 'OK' if (flags & StreamFormat.FLAG_CHECKSUM) else 'OK (decodes, stream has no checksums)'
+
+    return [inputPath_, os.path.getsize(inputPath_), outputSize, message]
+
+def benchTask(inputPath_, options_):
+    """
+    Compress and decompress one file in memory and time both. Runs in a worker process
+
+    :return: [inputPath, inputSize, outputSize, message]
+    """
+
+    with open(inputPath_, 'rb') as inputFile:
+        data = inputFile.read()
+
+    compressedFile = io.BytesIO()
+    startTime = time.perf_counter()
+    createKompressor(options_, inputPath_).compress(io.BytesIO(data), compressedFile)
+    compressTime = time.perf_counter() - startTime
+
+    decompressedFile = io.BytesIO()
+    startTime = time.perf_counter()
+    createDekompressor(options_).decompress(io.BytesIO(compressedFile.getvalue()), decompressedFile)
+    decompressTime = time.perf_counter() - startTime
+
+    if(decompressedFile.getvalue() != data):
+        raise Exception("Decompressed data does not match")
+
+    message = 'compress %.1f KB/s decompress %.1f KB/s' % (len(data) / 1024.0 / max(compressTime, 1e-9),
+                                                           len(data) / 1024.0 / max(decompressTime, 1e-9))
+
+    return [inputPath_, len(data), len(compressedFile.getvalue()), message]
+
+def printStats(paths_):
+    """
+    Print the stream header and block layout of each compressed file. Blocks are skipped, not decoded
+
+    :return: The number of files that could not be read
+    """
+
+    errors = 0
+    flagNames = [[StreamFormat.FLAG_THUMB_FILTER, 'thumb'], [StreamFormat.FLAG_DLD_RECORDS, 'dld'],
+                 [StreamFormat.FLAG_LZ_MATCHES, 'lz'], [StreamFormat.FLAG_REFERENCE_DELTA, 'delta'],
+                 [StreamFormat.FLAG_SEMI_STATIC, 'semi-static'], [StreamFormat.FLAG_SUB_STREAMS, 'sub-streams'],
+                 [StreamFormat.FLAG_CHECKSUM, 'crc32'], [StreamFormat.FLAG_CONTEXT_MIXING, 'context-mixing']]
+    modelFlagNames = [[StreamFormat.MODEL_FLAG_HALFWORD_SYMBOLS, 'halfword'],
+                      [StreamFormat.MODEL_FLAG_ADAPTATION, 'adaptation']]
+
+    for path in paths_:
+        try:
+            with open(path, 'rb') as inputFile:
+                [wordSize, flags, blockSize, escapeMethod, modelFlags] = StreamFormat.unpackStreamHeader(inputFile.read(StreamFormat.STREAM_HEADER_SIZE))
+                inputFile.seek(StreamFormat.getStreamHeaderSize(flags, modelFlags))
+
+                blockHeaderSize = StreamFormat.getBlockHeaderSize(flags)
+                originalSize = 0
+                blockCount = 0
+                storedCount = 0
+                headerData = inputFile.read(blockHeaderSize)
+
+                while(len(headerData) == blockHeaderSize):
+                    [originalLen, compressedLen] = StreamFormat.unpackBlockHeader(headerData)
+
+                    if(originalLen > 0):
+                        originalSize += originalLen
+                        blockCount += 1
+
+                        if(StreamFormat.unpackBlockMode(inputFile.read(StreamFormat.BLOCK_MODE_SIZE)) == StreamFormat.BLOCK_MODE_STORED):
+                            storedCount += 1
+
+                        inputFile.seek(compressedLen - StreamFormat.BLOCK_MODE_SIZE, os.SEEK_CUR)
+
+                    headerData = inputFile.read(blockHeaderSize)
+
+            compressedSize = os.path.getsize(path)
+            names = [name for [flag, name] in flagNames if (flags & flag)]
+            names += [name for [flag, name] in modelFlagNames if (modelFlags & flag)]
+
+            print('%s: word size %d, block size %d, escape %s, flags [%s], %d blocks (%d stored), %d -> %d bytes (%.1f%%)' %
+                  (path, wordSize, blockSize, EscapeEstimator.METHOD_NAMES[escapeMethod], ', '.join(names), blockCount,
+                   storedCount, originalSize, compressedSize, (100.0 * compressedSize) / max(1, originalSize)))
+        except Exception as e:
+            print('%s: ERROR %s' % (path, str(e)))
+            errors += 1
+
+    return errors
+
+def archiveFiles(paths_, options_):
+    """
+    Pack the files into one solid archive
+
+    :param paths_: The paths given on the command line, expanded by findArchiveFiles
+    :return: The number of archives that failed (0 or 1)
+    """
+
+    if(os.path.exists(options_.archive) and (not options_.force)):
+        print('%s: skipped, exists' % options_.archive)
+        return 0
+
+    [paths, names] = findArchiveFiles(paths_, options_.archive)
+    startTime = time.perf_counter()
+    profiler = profiling.startProfiling(options_.profile)
+
+    try:
+        archiver = SolidArchiver(createKompressor(options_, options_.archive))
+        [inputSize, outputSize] = writeOutputFile(options_.archive, lambda outputFile_: archiver.archive(
+            paths, outputFile_, not options_.no_order, names))
+    except Exception as e:
+        print('%s: ERROR %s' % (options_.archive, str(e)))
+        return 1
+    finally:
+        profiling.stopProfiling(profiler, options_.profile_output)
+
+    elapsed = time.perf_counter() - startTime
+
+    print('%s: %d files, %d -> %d bytes in %.2fs (%.1f KB/s)' %
+          (options_.archive, len(paths), inputSize, outputSize, elapsed, inputSize / 1024.0 / max(elapsed, 1e-9)))
+
+    return 0
+
+def extractArchives(paths_, options_):
+    """
+    Unpack solid archives into the output directory (or next to each archive)
+
+    :return: The number of archives that failed
+    """
+
+    errors = 0
+    referenceData = readReference(options_)
+
+    profiler = profiling.startProfiling(options_.profile)
+
+    for path in paths_:
+        outputDirectory = options_.output if (options_.output is not None) else os.path.dirname(path)
+
+        try:
+            with open(path, 'rb') as inputFile:
+                extractor = SolidExtractor(referenceData)
+                extractor.open(inputFile)
+                names = options_.files if (options_.files is not None) else [name for [name, length] in extractor.getFiles()]
+                existing = [name for name in names if os.path.exists(os.path.join(outputDirectory, name))]
+
+                if((len(existing) > 0) and (not options_.force)):
+                    print('%s: skipped, %s exists' % (path, os.path.join(outputDirectory, existing[0])))
+                    continue
+
+                outputSize = extractor.extractAll(outputDirectory, names)
+
+            print('%s: %d files, %d -> %d bytes %s' % (path, len(names), os.path.getsize(path), outputSize,
+                                                      outputDirectory))
+        except Exception as e:
+            print('%s: ERROR %s' % (path, str(e)))
+            errors += 1
+
+    profiling.stopProfiling(profiler, options_.profile_output)
+
+    return errors
+
+def listArchives(paths_, options_):
+    """
+    Print the files held by each solid archive
+
+    :return: The number of archives that could not be read
+    """
+
+    errors = 0
+    referenceData = readReference(options_)
+
+    for path in paths_:
+        try:
+            with open(path, 'rb') as inputFile:
+                extractor = SolidExtractor(referenceData)
+                extractor.open(inputFile)
+                files = extractor.getFiles()
+
+            print('%s: %d files, %d blocks, %d -> %d bytes' % (path, len(files), len(extractor.mRestartPoints),
+                                                                sum([length for [name, length] in files]),
+                                                                os.path.getsize(path)))
+
+            for [name, length] in files:
+                print('    %12d %s' % (length, name))
+        except Exception as e:
+            print('%s: ERROR %s' % (path, str(e)))
+            errors += 1
+
+    return errors
+
+def reportResult(path_, getResult_):
+    """
+    Print the outcome of the task of one file
+
+    :param path_: The file the task ran on
+    :param getResult_: Returns [inputPath, inputSize, outputSize, message] or raises the error of the task
+    :return: [inputSize, outputSize, failed]
+    """
+
+    try:
+        [inputPath, inputSize, outputSize, message] = getResult_()
+        print('%s: %d -> %d bytes %s' % (inputPath, inputSize, outputSize, message))
+
+        return [inputSize, outputSize, False]
+    except Exception as e:
+        print('%s: ERROR %s' % (path_, str(e)))
+
+        return [0, 0, True]
+
+def runBatch(task_, paths_, options_):
+    """
+    Run the task for every file on a process pool, largest files first, and print the aggregate throughput. Profiled
+    runs execute the tasks in this process one after another so the profiler sees them
+
+    :return: The number of files that failed
+    """
+
+    paths = sorted(paths_, key=os.path.getsize, reverse=True)
+    totalInput = 0
+    totalOutput = 0
+    errors = 0
+    startTime = time.perf_counter()
+    results = []
+
+    if(options_.profile is None):
+        with concurrent.futures.ProcessPoolExecutor(options_.jobs) as executor:
+            futures = {}
+
+            for path in paths:
+                futures[executor.submit(task_, path, options_)] = path
+
+            for future in concurrent.futures.as_completed(futures):
+                results.append(reportResult(futures[future], future.result))
+    else:
+        profiler = profiling.startProfiling(options_.profile)
+
+        for path in paths:
+            results.append(reportResult(path, lambda: task_(path, options_)))
+
+        profiling.stopProfiling(profiler, options_.profile_output)
+
+    for [inputSize, outputSize, failed] in results:
+        totalInput += inputSize
+        totalOutput += outputSize
+        errors += 1 if failed else 0
+
+    elapsed = time.perf_counter() - startTime
+
+    print('%d files, %d errors, %d -> %d bytes in %.2fs (%.1f KB/s)' %
+          (len(paths), errors, totalInput, totalOutput, elapsed, totalInput / 1024.0 / max(elapsed, 1e-9)))
+
+    return errors
+
+def addCompressOptions(parser_):
+    parser_.add_argument('--word-size', type=int, default=Kompressor.DEFAULT_WORD_SIZE)
+    parser_.add_argument('--block-size', type=int, default=Kompressor.DEFAULT_BLOCK_SIZE)
+    parser_.add_argument('--min-block-size', type=int, default=0, metavar='BYTES',
+                         help='End blocks where the data statistics change, no shorter than this (0 for fixed blocks)')
+    parser_.add_argument('--thumb-filter', action='store_true', help='Convert ARM Thumb branch targets')
+    parser_.add_argument('--match-window', type=int, default=0, help='Use the LZ77 front end with this window')
+    parser_.add_argument('--semi-static', action='store_true', help='Two pass coding with frozen tables')
+    parser_.add_argument('--escape', choices=EscapeEstimator.METHOD_NAMES, default='C',
+                         help='Escape estimation of the context model (PPM method A, C, D or X for adaptive SEE)')
+    parser_.add_argument('--context-mixing', action='store_true', help='Bitwise context mixing, best ratio but slow')
+    parser_.add_argument('--halfword', action='store_true', help='Code 16-bit symbols, for Thumb code')
+    parser_.add_argument('--sub-streams', type=int, default=1, help='Split blocks for parallel decode')
+    parser_.add_argument('--no-dld', action='store_true', help='Do not use the record front end for .dld files')
+    parser_.add_argument('--no-checksum', action='store_true', help='Do not store CRC32 checksums')
+    parser_.add_argument('--order0-limit', type=int, default=0, metavar='BITS',
+                         help='Max total of the order-0 table as a power of 2 (0 for the word size limit)')
+    parser_.add_argument('--order1-limit', type=int, default=0, metavar='BITS',
+                         help='Max total of the order-1 tables as a power of 2 (0 for the word size limit)')
+    parser_.add_argument('--model-limit', type=int, default=0, metavar='BITS',
+                         help='Max total of the run length and field models as a power of 2 (0 for the word size limit)')
+    parser_.add_argument('--aging-shift', type=int, default=1,
+                         help='Aging keeps count - count / 2^N of each count, 1 halves them, larger values forget slower')
+    parser_.add_argument('--aging-epoch', type=int, default=0, metavar='BITS',
+                         help='Also age the context tables every 2^BITS table updates (0 to only age full tables)')
+
+def main():
+    parser = argparse.ArgumentParser(description='Compress and decompress firmware images')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--pipeline-depth', type=int, default=Kompressor.DEFAULT_PIPELINE_DEPTH,
+                        help='Blocks read ahead and queued for writing per file, 0 to disable the I/O threads')
+    profiling.addProfileOptions(parser)
+    subParsers = parser.add_subparsers(dest='command', required=True)
+
+    compressParser = subParsers.add_parser('compress', help='Compress files')
+    addCompressOptions(compressParser)
+    compressParser.add_argument('--reference', help='Delta code against this reference image')
+    compressParser.add_argument('--verify', action='store_true', help='Decompress each block after compressing it')
+    compressParser.add_argument('--output', help='Directory for the compressed files')
+    compressParser.add_argument('--force', action='store_true', help='Overwrite existing files')
+
+    decompressParser = subParsers.add_parser('decompress', help='Decompress .kmp files')
+    decompressParser.add_argument('--reference', help='Reference image the files were delta coded against')
+    decompressParser.add_argument('--output', help='Directory for the decompressed files')
+    decompressParser.add_argument('--force', action='store_true', help='Overwrite existing files')
+    decompressParser.add_argument('--parallel-blocks', action='store_true',
+                                  help='Decode the blocks of each file in parallel into shared memory')
+
+    verifyParser = subParsers.add_parser('verify', help='Check that .kmp files decompress and match their checksums')
+    verifyParser.add_argument('--reference', help='Reference image the files were delta coded against')
+
+    subParsers.add_parser('stats', help='Show the layout of .kmp files')
+
+    benchParser = subParsers.add_parser('bench', help='Time compression and decompression in memory')
+    addCompressOptions(benchParser)
+    benchParser.add_argument('--reference', help='Delta code against this reference image')
+
+    archiveParser = subParsers.add_parser('archive', help='Pack files into one solid archive')
+    addCompressOptions(archiveParser)
+    archiveParser.set_defaults(block_size=SolidArchiver.DEFAULT_RESTART_INTERVAL)
+    archiveParser.add_argument('--reference', help='Delta code against this reference image')
+    archiveParser.add_argument('--no-order', action='store_true',
+                               help='Store the files in the order given rather than grouped by type and similarity')
+    archiveParser.add_argument('--force', action='store_true', help='Overwrite an existing archive')
+    archiveParser.add_argument('archive', help='The archive to write')
+
+    extractParser = subParsers.add_parser('extract', help='Unpack .kma archives')
+    extractParser.add_argument('--reference', help='Reference image the archives were delta coded against')
+    extractParser.add_argument('--output', help='Directory for the extracted files')
+    extractParser.add_argument('--file', dest='files', action='append',
+                               help='Only extract this file, decoding just the blocks it lies in. May be repeated')
+    extractParser.add_argument('--force', action='store_true', help='Overwrite existing files')
+
+    listParser = subParsers.add_parser('list', help='Show the files held by .kma archives')
+    listParser.add_argument('--reference', help='Reference image the archives were delta coded against')
+
+    for subParser in subParsers.choices.values():
+        subParser.add_argument('paths', nargs='+', help='Files, globs or directories')
+
+    options = parser.parse_args()
+
+    if(options.command in ['compress', 'bench']):
+        paths = [path for path in findFiles(options.paths) if not path.endswith(COMPRESSED_EXTENSION)]
+    elif(options.command == 'archive'):
+        paths = options.paths
+    elif(options.command in ['extract', 'list']):
+        paths = findFiles(options.paths, ARCHIVE_EXTENSION)
+    else:
+        paths = findFiles(options.paths, COMPRESSED_EXTENSION)
+
+    if((getattr(options, 'output', None) is not None) and (not os.path.isdir(options.output))):
+        os.makedirs(options.output)
+
+    if(options.command == 'stats'):
+        errors = printStats(paths)
+    elif(options.command == 'archive'):
+        errors = archiveFiles(paths, options)
+    elif(options.command == 'extract'):
+        errors = extractArchives(paths, options)
+    elif(options.command == 'list'):
+        errors = listArchives(paths, options)
+    elif((options.command == 'decompress') and options.parallel_blocks and (options.profile is None)):
+        errors = decompressParallel(paths, options)
+    else:
+        tasks = {'compress': compressTask, 'decompress': decompressTask, 'verify': verifyTask, 'bench': benchTask}
+        errors = runBatch(tasks[options.command], paths, options)
+
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
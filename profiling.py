@@ -0,0 +1,68 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Helpers for the --profile switch of the command line tools.
+
+    phases: print the wall clock time of each coder phase (see PhaseTimer)
+    sample: write collapsed stacks for flamegraph tools (see SamplingProfiler)
+"""
+
+from PhaseTimer import PhaseTimer
+from SamplingProfiler import SamplingProfiler
+
+PROFILE_MODES = ['phases', 'sample']
+DEFAULT_PROFILE_OUTPUT = 'profile.collapsed'
+
+def addProfileOptions(parser_):
+    """
+    Add the --profile and --profile-output options to an argparse parser
+
+    :param parser_: The parser
+    :return: None
+    """
+
+    parser_.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                         help='Time each coder phase or sample call stacks. Profiled runs use a single process')
+    parser_.add_argument('--profile-output', default=DEFAULT_PROFILE_OUTPUT,
+                         help='File the collapsed stacks of --profile sample are written to')
+
+def startProfiling(mode_):
+    """
+    Start profiling the calling thread
+
+    :param mode_: One of PROFILE_MODES, or None to not profile
+    :return: The running profiler, None if mode_ is None
+    """
+
+    if(mode_ == 'phases'):
+        profiler = PhaseTimer()
+        profiler.install()
+    elif(mode_ == 'sample'):
+        profiler = SamplingProfiler()
+        profiler.start()
+    elif(mode_ is None):
+        profiler = None
+    else:
+        raise Exception("Invalid profile mode specified")
+
+    return profiler
+
+def stopProfiling(profiler_, outputPath_=DEFAULT_PROFILE_OUTPUT):
+    """
+    Stop a profiler started by startProfiling and report the results
+
+    :param profiler_: The profiler, None does nothing
+    :param outputPath_: File the collapsed stacks of a sampling profiler are written to
+    :return: None
+    """
+
+    if(isinstance(profiler_, PhaseTimer)):
+        profiler_.remove()
+        print(profiler_.formatReport())
+    elif(isinstance(profiler_, SamplingProfiler)):
+        profiler_.stop()
+
+        with open(outputPath_, 'w') as outputFile:
+            sampleCount = profiler_.writeCollapsed(outputFile)
+
+        print('%d samples written to %s' % (sampleCount, outputPath_))
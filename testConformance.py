@@ -0,0 +1,449 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Conformance and speed harness for the context coder. Random and adversarial inputs are coded at every supported word
+size with every escape method, each one is decoded again and must match bit for bit, and the encode and decode speed of
+every configuration is recorded. The inputs are:
+
+    empty, single   No symbols and a single symbol
+    run             One symbol repeated, coded through the run length model
+    runs            Runs just below, at and above the run trigger length
+    all256          Every byte value in turn, the base table is used up
+    storm           Every pair of bytes at most once (de Bruijn sequence), nearly every symbol escapes
+    random          Uniform random bytes
+    skewed          Random bytes drawn from a few dominant values
+    long            Long enough for the order-0 table to reach the max total of the word size and be normalized. Word
+                    sizes whose max total is out of reach of --long-size are skipped
+    aging           As random, with an AdaptationPolicy that normalizes every table at a total of 512 and ages by epoch,
+                    so normalization is exercised at every word size
+    totals          A SymbolModel given counts close to the max total of the word size, the largest products the range
+                    arithmetic has to handle
+
+Every input is also run through Kompressor and Dekompressor with each of the --block-sizes and each front end mode:
+
+    plain           The context coder
+    lz              The LZ77 match finder front end
+    delta           Delta coding against a reference made from the data with bytes changed, inserted and removed
+    dld             The .dld record front end, the data is written out as S-record lines mixed with lines of every
+                    other kind the front end codes
+    halfword        The 16-bit symbol model
+    semi-static     Frozen two pass tables
+    mixing          The bitwise context mixing coder
+
+The modes that code through the context model are run with every escape method, the others once. Modes that need a
+larger max total than a word size has are skipped at that word size. Block sizes below SMALL_BLOCK_SIZE, where nearly
+every block is stored, only code the first SMALL_BLOCK_DATA_LEN bytes of the input. Every configuration is named after
+its word size, mode and escape method, so each has its own hash. With --json the results, including a hash of every
+encoded output, are written to a file. A run with --compare checks that the encoded output of each configuration is
+identical to the one recorded by an earlier run, so an optimized coder can be validated against the reference
+implementation.
+
+Usage: python testConformance.py [--word-sizes 11-32] [--block-sizes 1,255,4096] [--escapes A,C,D,X]
+                                 [--modes plain,lz,...] [--size N] [--long-size N] [--seed N] [--json FILE]
+                                 [--compare FILE]
+"""
+
+import argparse
+import array
+import hashlib
+import io
+import itertools
+import json
+import random
+import sys
+import time
+import utils
+from ContextEncoder import ContextEncoder
+from ContextDecoder import ContextDecoder
+from AdaptationPolicy import AdaptationPolicy
+from BitPredictor import BitPredictor
+from DldRecordEncoder import DldRecordEncoder
+from EscapeEstimator import EscapeEstimator
+from HalfwordEncoder import HalfwordEncoder
+from SymbolModel import SymbolModel
+from Kompressor import Kompressor
+from Dekompressor import Dekompressor
+
+# Front end modes of the stream round trips: [name, Kompressor keyword arguments, smallest max total of the word size
+# the mode runs at, True if it codes through the context model and is run with every escape method]
+STREAM_MODES = [['plain', {}, 0, True],
+                ['lz', {'matchWindow_': 4096}, 0, True],
+                ['delta', {}, 0, True],
+                ['dld', {'dldRecords_': True}, 0, True],
+                ['halfword', {'halfwordSymbols_': True}, HalfwordEncoder.MIN_MAX_COUNT, False],
+                ['semi-static', {'semiStatic_': True}, 256, False],
+                ['mixing', {'contextMixing_': True}, BitPredictor.PROBABILITY_SCALE, False]]
+SMALL_BLOCK_SIZE = 16                                                      # Block sizes below this code only the start of the input
+SMALL_BLOCK_DATA_LEN = 256                                                 # Bytes of the stream input coded with small blocks
+
+def deBruijn(length_):
+    """
+    Build the first bytes of a de Bruijn sequence of order 2 over the byte values, every pair of bytes appears once
+
+    :return: List of length_ bytes
+    """
+
+    sequence = []
+    symbols = [0] * 3
+
+    # Lyndon word construction (FKM algorithm) of B(256, 2)
+    def generate(t_, p_):
+        if(len(sequence) >= length_):
+            return
+
+        if(t_ > 2):
+            if(2 % p_ == 0):
+                sequence.extend(symbols[1:p_ + 1])
+        else:
+            symbols[t_] = symbols[t_ - p_]
+            generate(t_ + 1, p_)
+
+            for value in range(symbols[t_ - p_] + 1, 256):
+                symbols[t_] = value
+                generate(t_ + 1, t_)
+
+    generate(1, 1)
+
+    return sequence[:length_]
+
+def makeInputs(size_, longSize_, wordSize_, seed_):
+    """
+    Build the inputs for a word size
+
+    :return: List of [name, data, adaptation] where adaptation is the AdaptationPolicy to code with (None for the
+             default)
+    """
+
+    generator = random.Random(seed_)
+    runs = []
+
+    for runLength in [ContextEncoder.RUN_TRIGGER - 1, ContextEncoder.RUN_TRIGGER, ContextEncoder.RUN_TRIGGER + 1, 255,
+                      256]:
+        runs += [generator.randrange(0, 256)] * runLength
+
+    inputs = [['empty', [], None],
+              ['single', [generator.randrange(0, 256)], None],
+              ['run', [generator.randrange(0, 256)] * size_, None],
+              ['runs', (runs * (1 + (size_ // len(runs))))[:size_], None],
+              ['all256', list(range(0, 256)) * max(1, size_ // 256), None],
+              ['storm', deBruijn(size_), None],
+              ['random', [generator.randrange(0, 256) for i in range(0, size_)], None],
+              ['skewed', [min(255, int(generator.expovariate(0.5))) for i in range(0, size_)], None]]
+
+    # The order-0 table is counted for every symbol, twice the max total normalizes it at least once
+    longLen = 2 * utils.calculateMaxBytes(wordSize_)
+
+    if(longLen <= longSize_):
+        inputs.append(['long', [generator.randrange(0, 64) for i in range(0, longLen)], None])
+
+    inputs.append(['aging', [generator.randrange(0, 256) for i in range(0, size_)],
+                   AdaptationPolicy([9, 9, 9], 2, 6)])
+
+    return inputs
+
+def makeReference(data_, seed_):
+    """
+    Build the reference of the delta mode, the data with some bytes changed and short runs inserted and removed so the
+    copies found move against the data
+
+    :return: The reference (bytes)
+    """
+
+    generator = random.Random(seed_)
+    reference = []
+    position = 0
+
+    while(position < len(data_)):
+        runLen = generator.randrange(16, 256)
+        reference += data_[position:position + runLen]
+        position += runLen
+        edit = generator.randrange(0, 3)
+
+        if(edit == 0):
+            reference += [generator.randrange(0, 256) for i in range(0, generator.randrange(1, 8))]
+        elif(edit == 1):
+            position += generator.randrange(1, 8)
+        elif(position < len(data_)):
+            reference.append(data_[position] ^ 0xFF)
+            position += 1
+
+    return bytes(reference)
+
+def makeDldText(data_, seed_):
+    """
+    Write the data out as .dld lines of S3 records. Addresses jump and checksums are wrong now and then, and the record
+    lines are mixed with hex lines that hold no records, lower case lines and LF line endings
+
+    :return: The .dld text (bytes)
+    """
+
+    generator = random.Random(seed_)
+    lines = []
+    address = 0x08000000
+    position = 0
+
+    while(position < len(data_)):
+        lineKind = generator.randrange(0, 16)
+
+        if(lineKind == 0):
+            lines.append('5204%04X00' % generator.randrange(0, 0x10000))
+            continue
+
+        records = b''
+        recordCount = generator.randrange(1, 4)
+
+        for i in range(0, recordCount):
+            payload = bytes(data_[position:position + 32])
+            position += len(payload)
+            record = bytes([len(payload) + 5]) + address.to_bytes(4, 'big') + payload
+            checksum = DldRecordEncoder.calculateChecksum(record)
+
+            if(generator.randrange(0, 16) == 0):
+                checksum ^= 0xFF
+
+            records += bytes([DldRecordEncoder.RECORD_START, 3]) + record + bytes([checksum])
+            address += len(payload)
+
+            if(generator.randrange(0, 16) == 0):
+                address += generator.randrange(1, 4096)
+
+        lineText = (bytes([0x56, generator.randrange(0, 4)]) + recordCount.to_bytes(2, 'little') + records).hex()
+        lines.append(lineText if (lineKind == 1) else lineText.upper())
+
+    text = b''
+
+    for lineText in lines:
+        text += lineText.encode('ascii') + (b'\n' if (generator.randrange(0, 8) == 0) else b'\r\n')
+
+    return text
+
+def codeContext(wordSize_, data_, adaptation_, escapeMethod_=EscapeEstimator.METHOD_C):
+    """
+    Encode and decode the data with the context coder the way Kompressor codes a block
+
+    :return: [encodedData, encodeSeconds, decodeSeconds]
+    """
+
+    encoder = ContextEncoder(wordSize_, escapeMethod_, adaptation_)
+    decoder = ContextDecoder(wordSize_, escapeMethod_, adaptation_)
+    symbols = list(data_) + [ContextEncoder.TERMINATION_SYMBOL]
+    maxEncodedLen = utils.calculateMaxEncodedLen(len(symbols))
+    encodedData = array.array("B", itertools.repeat(0, maxEncodedLen))
+
+    startTime = time.perf_counter()
+    encodedLen = encoder.encode(symbols, len(symbols), encodedData, maxEncodedLen, False)
+    encodeTime = time.perf_counter() - startTime
+
+    decodedData = bytearray(len(data_))
+    startTime = time.perf_counter()
+    decodedLen = decoder.decode(encodedData, encodedLen, decodedData, len(decodedData))
+    decodeTime = time.perf_counter() - startTime
+
+    if((decodedLen != len(data_)) or (decodedData != bytes(data_))):
+        raise Exception("Decoded data does not match")
+
+    return [encodedData[:encodedLen].tobytes(), encodeTime, decodeTime]
+
+def codeTotals(wordSize_, size_, seed_):
+    """
+    Encode and decode random symbols with a SymbolModel whose counts add up to close to the max total of the word size
+
+    :return: [encodedData, encodeSeconds, decodeSeconds]
+    """
+
+    maxCount = utils.calculateMaxBytes(wordSize_)
+    generator = random.Random(seed_)
+    counts = [generator.randrange(1, max(2, maxCount // 256)) for i in range(0, 256)]
+    symbols = [generator.randrange(0, 256) for i in range(0, size_)]
+
+    def createModel():
+        model = SymbolModel(256)
+
+        for i in range(0, 256):
+            model.mSymbols[i][1] = counts[i]
+
+        model.mSymbolCount = sum(counts)
+
+        return model
+
+    encoder = ContextEncoder(wordSize_)
+    maxEncodedLen = utils.calculateMaxEncodedLen(len(symbols))
+    encodedData = array.array("B", itertools.repeat(0, maxEncodedLen))
+    model = createModel()
+
+    startTime = time.perf_counter()
+    encoder.startEncode(encodedData, maxEncodedLen)
+
+    for symbol in symbols:
+        encoder.encodeModelSymbol(symbol, model)
+
+    encodedLen = encoder.finishEncode(True)
+    encodeTime = time.perf_counter() - startTime
+
+    decoder = ContextDecoder(wordSize_)
+    model = createModel()
+
+    startTime = time.perf_counter()
+    decoder.startDecode(encodedData, encodedLen)
+    decodedSymbols = [decoder.decodeModelSymbol(model) for i in range(0, len(symbols))]
+    decodeTime = time.perf_counter() - startTime
+
+    if(decodedSymbols != symbols):
+        raise Exception("Decoded symbols do not match")
+
+    return [encodedData[:encodedLen].tobytes(), encodeTime, decodeTime]
+
+def codeStream(wordSize_, blockSize_, data_, adaptation_, escapeMethod_=EscapeEstimator.METHOD_C, modeArguments_=None,
+               referenceData_=None):
+    """
+    Compress and decompress the data as a stream
+
+    :param modeArguments_: Kompressor keyword arguments that select the front end, None for the plain coder
+    :param referenceData_: The reference of the delta mode, None for the other modes
+    :return: [encodedData, encodeSeconds, decodeSeconds]
+    """
+
+    kompressor = Kompressor(wordSize_, blockSize_, checksum_=True, adaptation_=adaptation_, escapeMethod_=escapeMethod_,
+                            referenceData_=referenceData_, **(modeArguments_ or {}))
+    compressedFile = io.BytesIO()
+    startTime = time.perf_counter()
+    kompressor.compress(io.BytesIO(bytes(data_)), compressedFile)
+    encodeTime = time.perf_counter() - startTime
+
+    decompressedFile = io.BytesIO()
+    startTime = time.perf_counter()
+    Dekompressor(referenceData_, pipelineDepth_=0).decompress(io.BytesIO(compressedFile.getvalue()), decompressedFile)
+    decodeTime = time.perf_counter() - startTime
+
+    if(decompressedFile.getvalue() != bytes(data_)):
+        raise Exception("Decompressed data does not match")
+
+    return [compressedFile.getvalue(), encodeTime, decodeTime]
+
+def runCase(results_, config_, dataLen_, codeFunction_, *args_):
+    """
+    Run one configuration and record its result
+
+    :return: True if the data was coded and decoded correctly
+    """
+
+    result = {'config': config_, 'bytes': dataLen_}
+
+    try:
+        [encodedData, encodeTime, decodeTime] = codeFunction_(*args_)
+        result.update({'ok': True, 'encodedBytes': len(encodedData),
+                       'hash': hashlib.sha1(encodedData).hexdigest(),
+                       'encodeBytesPerSecond': dataLen_ / max(encodeTime, 1e-9),
+                       'decodeBytesPerSecond': dataLen_ / max(decodeTime, 1e-9)})
+        print("%-48s %7d -> %7d bytes  encode %9.0f bytes/s  decode %9.0f bytes/s" %
+              (config_, dataLen_, len(encodedData), result['encodeBytesPerSecond'], result['decodeBytesPerSecond']))
+    except Exception as e:
+        result.update({'ok': False, 'error': str(e)})
+        print("%-48s FAILED: %s" % (config_, str(e)))
+
+    results_.append(result)
+
+    return result['ok']
+
+def parseWordSizes(text_):
+    """
+    Parse a list of word sizes such as "11-16,24,32"
+
+    :return: List of word sizes
+    """
+
+    wordSizes = []
+
+    for part in text_.split(','):
+        if('-' in part):
+            [first, last] = part.split('-')
+            wordSizes += list(range(int(first), int(last) + 1))
+        else:
+            wordSizes.append(int(part))
+
+    return wordSizes
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the context coder round trips at every word size')
+    parser.add_argument('--word-sizes', default='%d-%d' % (utils.MIN_WORD_SIZE, utils.MAX_WORD_SIZE),
+                        help='Word sizes to test, e.g. 11-16,32')
+    parser.add_argument('--block-sizes', default='1,255,4096', help='Block sizes of the stream round trips')
+    parser.add_argument('--escapes', default=','.join(EscapeEstimator.METHOD_NAMES),
+                        help='Escape methods of the context model, e.g. A,C')
+    parser.add_argument('--modes', default=','.join([mode[0] for mode in STREAM_MODES]),
+                        help='Front end modes of the stream round trips, e.g. plain,lz')
+    parser.add_argument('--size', type=int, default=2048, help='Bytes of each input')
+    parser.add_argument('--long-size', type=int, default=65536, help='Max bytes of the long input')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Check the encoded output against the results written by an earlier run')
+    args = parser.parse_args()
+
+    blockSizes = [int(blockSize) for blockSize in args.block_sizes.split(',')]
+    escapeNames = args.escapes.split(',')
+    modes = [mode for mode in STREAM_MODES if (mode[0] in args.modes.split(','))]
+    results = []
+    failures = 0
+
+    for wordSize in parseWordSizes(args.word_sizes):
+        inputs = makeInputs(args.size, args.long_size, wordSize, args.seed + wordSize)
+
+        for escapeName in escapeNames:
+            escapeMethod = EscapeEstimator.METHOD_NAMES.index(escapeName)
+
+            for [name, data, adaptation] in inputs:
+                if(not runCase(results, 'context ws=%d escape=%s %s' % (wordSize, escapeName, name), len(data),
+                               codeContext, wordSize, data, adaptation, escapeMethod)):
+                    failures += 1
+
+        if(not runCase(results, 'context ws=%d totals' % wordSize, args.size, codeTotals, wordSize, args.size,
+                       args.seed + wordSize)):
+            failures += 1
+
+        # The stream inputs are kept short, they are coded in every mode, escape method and block size
+        streamData = list(itertools.chain(*[data[:args.size // 4] for [name, data, adaptation] in inputs
+                                            if (adaptation is None)]))
+        referenceData = makeReference(streamData, args.seed + wordSize)
+        dldText = makeDldText(streamData, args.seed + wordSize)
+
+        for [modeName, modeArguments, minMaxCount, usesEscape] in modes:
+            if(utils.calculateMaxBytes(wordSize) < minMaxCount):
+                continue
+
+            modeData = dldText if (modeName == 'dld') else streamData
+            modeReference = referenceData if (modeName == 'delta') else None
+
+            for escapeName in (escapeNames if usesEscape else [None]):
+                escapeMethod = EscapeEstimator.METHOD_C if (escapeName is None) else \
+                    EscapeEstimator.METHOD_NAMES.index(escapeName)
+                modeConfig = modeName if (escapeName is None) else ('%s escape=%s' % (modeName, escapeName))
+
+                for blockSize in blockSizes:
+                    blockData = modeData[:SMALL_BLOCK_DATA_LEN] if (blockSize < SMALL_BLOCK_SIZE) else modeData
+
+                    if(not runCase(results, 'stream ws=%d block=%d %s' % (wordSize, blockSize, modeConfig),
+                                   len(blockData), codeStream, wordSize, blockSize, blockData, None, escapeMethod,
+                                   modeArguments, modeReference)):
+                        failures += 1
+
+    if(args.compare is not None):
+        with open(args.compare, 'r') as compareFile:
+            expected = dict([[result['config'], result] for result in json.load(compareFile)])
+
+        for result in results:
+            reference = expected.get(result['config'])
+
+            if(result['ok'] and (reference is not None) and reference['ok'] and (reference['hash'] != result['hash'])):
+                print("%-48s DIFFERS from %s" % (result['config'], args.compare))
+                failures += 1
+
+    if(args.json is not None):
+        with open(args.json, 'w') as jsonFile:
+            json.dump(results, jsonFile, indent=1)
+
+    print("%d configurations, %d failures" % (len(results), failures))
+
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
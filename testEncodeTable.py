@@ -43,21 +43,36 @@ def main():
     decodedLen = decodeTable.decode(encodedData1, encodedLen1, decodedData1, 1025)
     decodeTable.reset()
 
+    if(list(decodedData1[:decodedLen]) != testData1[:-1]):
+        raise Exception("Decoded data 1 does not match")
+
     decodedData2 = array.array("B", itertools.repeat(0, 1025))
     decodedLen = decodeTable.decode(encodedData2, encodedLen2, decodedData2, 1025)
     decodeTable.reset()
 
+    if(list(decodedData2[:decodedLen]) != testData2[:-1]):
+        raise Exception("Decoded data 2 does not match")
+
     decodedData3 = array.array("B", itertools.repeat(0, 1025))
     decodedLen = decodeTable.decode(encodedData3, encodedLen3, decodedData3, 1025)
     decodeTable.reset()
 
+    if(list(decodedData3[:decodedLen]) != testData3[:-1]):
+        raise Exception("Decoded data 3 does not match")
+
     decodedData4 = array.array("B", itertools.repeat(0, 1025))
     decodedLen = decodeTable.decode(encodedData4, encodedLen4, decodedData4, 1025)
     decodeTable.reset()
 
+    if(list(decodedData4[:decodedLen]) != testData4[:-1]):
+        raise Exception("Decoded data 4 does not match")
+
     decodedData5 = array.array("B", itertools.repeat(0, 1025))
     decodedLen = decodeTable.decode(encodedData5, encodedLen5, decodedData5, 1025)
     decodeTable.reset()
 
+    if(list(decodedData5[:decodedLen]) != testData5[:-1]):
+        raise Exception("Decoded data 5 does not match")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,137 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+Command line checks for kompress.py. A .dld file and a binary image cut from the test files are compressed with each
+set of options, decompressed again and compared with the original. The record front end is turned on for .dld files
+automatically, every option it can't be combined with must turn it off instead of failing the file. Files delta coded
+against the other test image, which shares nothing with them, must come out no larger than plain coding makes them.
+
+Usage: python testKompress.py [--lines N] [--bytes N]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+TEST_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+KOMPRESS_PATH = os.path.join(TEST_DIRECTORY, 'kompress.py')
+DLD_PATH = os.path.join(TEST_DIRECTORY, 'testfiles', '3.110A2_BDG.dld')
+BIN_PATH = os.path.join(TEST_DIRECTORY, 'testfiles', '3.110A2_BDG.bin')
+OTHER_BIN_PATH = os.path.join(TEST_DIRECTORY, 'testfiles', '3.311R1_LGC.bin')
+MAX_SIZE_GROWTH = 0.01                                                     # Allowed growth over the case a ratio is checked against
+
+def runKompress(arguments_):
+    """
+    Run kompress.py in a single worker process
+
+    :return: [returnCode, output]
+    """
+
+    completed = subprocess.run([sys.executable, KOMPRESS_PATH, '--jobs', '1'] + arguments_, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, universal_newlines=True)
+
+    return [completed.returncode, completed.stdout]
+
+def runCase(name_, inputPaths_, compressOptions_, decompressOptions_, workDirectory_):
+    """
+    Compress the files with the options into their own directory, decompress them and compare with the originals
+
+    :return: The compressed size of each file, None if a file did not come back unchanged
+    """
+
+    caseDirectory = os.path.join(workDirectory_, name_)
+    os.makedirs(caseDirectory)
+
+    [returnCode, output] = runKompress(['compress', '--output', caseDirectory] + compressOptions_ + inputPaths_)
+
+    if(returnCode != 0):
+        print("%-24s FAILED: compress\n%s" % (name_, output))
+        return None
+
+    compressedPaths = [os.path.join(caseDirectory, os.path.basename(path) + '.kmp') for path in inputPaths_]
+    outputDirectory = os.path.join(caseDirectory, 'out')
+    [returnCode, output] = runKompress(['decompress', '--output', outputDirectory] + decompressOptions_ +
+                                       compressedPaths)
+
+    if(returnCode != 0):
+        print("%-24s FAILED: decompress\n%s" % (name_, output))
+        return None
+
+    for path in inputPaths_:
+        with open(path, 'rb') as originalFile, open(os.path.join(outputDirectory, os.path.basename(path)),
+                                                    'rb') as decompressedFile:
+            if(originalFile.read() != decompressedFile.read()):
+                print("%-24s FAILED: %s does not match" % (name_, os.path.basename(path)))
+                return None
+
+    compressedSizes = [os.path.getsize(compressedPath) for compressedPath in compressedPaths]
+    print("%-24s %s" % (name_, ', '.join(['%s %d -> %d bytes' % (os.path.basename(path), os.path.getsize(path), size)
+                                          for [path, size] in zip(inputPaths_, compressedSizes)])))
+
+    return compressedSizes
+
+def main():
+    parser = argparse.ArgumentParser(description='Check kompress.py round trips files with each set of options')
+    parser.add_argument('--lines', type=int, default=20, help='Lines of the .dld test file used')
+    parser.add_argument('--bytes', type=int, default=8192, help='Bytes of the binary test file used')
+    args = parser.parse_args()
+
+    workDirectory = tempfile.mkdtemp()
+    failures = 0
+
+    try:
+        inputDirectory = os.path.join(workDirectory, 'input')
+        os.makedirs(inputDirectory)
+        dldPath = os.path.join(inputDirectory, os.path.basename(DLD_PATH))
+        binPath = os.path.join(inputDirectory, os.path.basename(BIN_PATH))
+        referencePath = os.path.join(workDirectory, 'reference.bin')
+
+        with open(DLD_PATH, 'rb') as inputFile, open(dldPath, 'wb') as outputFile:
+            outputFile.write(b''.join(inputFile.readlines()[:args.lines]))
+
+        with open(BIN_PATH, 'rb') as inputFile:
+            binData = inputFile.read(2 * args.bytes)
+
+        with open(binPath, 'wb') as outputFile:
+            outputFile.write(binData[args.bytes:])
+
+        with open(referencePath, 'wb') as outputFile:
+            outputFile.write(binData[:args.bytes])
+
+        inputPaths = [dldPath, binPath]
+        results = {}
+
+        # [name, compress options, decompress options, case the compressed sizes may not grow over (None for any size)]
+        cases = [['default', [], [], None],
+                 ['no-dld', ['--no-dld'], [], None],
+                 ['semi-static', ['--semi-static'], [], None],
+                 ['reference', ['--reference', referencePath], ['--reference', referencePath], None],
+                 ['reference-other', ['--reference', OTHER_BIN_PATH], ['--reference', OTHER_BIN_PATH], 'no-dld'],
+                 ['halfword', ['--halfword'], [], None],
+                 ['context-mixing', ['--context-mixing'], [], None]]
+
+        for [name, compressOptions, decompressOptions, sizeCase] in cases:
+            compressedSizes = runCase(name, inputPaths, compressOptions, decompressOptions, workDirectory)
+            results[name] = compressedSizes
+
+            if(compressedSizes is None):
+                failures += 1
+            elif((sizeCase is not None) and (results[sizeCase] is not None)):
+                for [path, size, maxSize] in zip(inputPaths, compressedSizes, results[sizeCase]):
+                    if(size > (maxSize * (1.0 + MAX_SIZE_GROWTH))):
+                        print("%-24s FAILED: %s %d bytes, %s made it %d bytes" % (name, os.path.basename(path), size,
+                                                                               sizeCase, maxSize))
+                        failures += 1
+                        break
+    finally:
+        shutil.rmtree(workDirectory)
+
+    print("%d cases, %d failures" % (len(cases), failures))
+
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
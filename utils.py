@@ -2,6 +2,9 @@ __author__ = 'Marko Milutinovic'
 
 import math
 
+MIN_WORD_SIZE = 11                                                         # 2^(11 - 2) = 512 is the smallest max total that holds all 257 base symbols
+MAX_WORD_SIZE = 32
+
 def getMinBytesToRepresent(maxValue_):
     """
     Calculate the number of bytes required to represent the max value provided
@@ -24,14 +27,25 @@ def calculateMaxBytes(wordSize_):
     Calculate the max number of bytes we can compress before we are required
     to normalize the statistics during AR encoding
 
-    :param wordSize_: The number of bits used when generating tags. Must be greater than 2 and less than or equal to 16 to produce a valid result
+    :param wordSize_: The number of bits used when generating tags. Must be between MIN_WORD_SIZE and MAX_WORD_SIZE to
+           produce a valid result. Smaller word sizes can't give every symbol of a table a range once all the byte
+           values were seen, the tables can then no longer be normalized below the max
     :return: Return the max bytes before we need to normalize the statistics
     """
 
     # If an invalid value is passed in return 0
-    if((wordSize_ <= 2) or (wordSize_ > 32)):
+    if((wordSize_ < MIN_WORD_SIZE) or (wordSize_ > MAX_WORD_SIZE)):
         return 0
 
-    maxBytes = math.pow(2, (wordSize_ - 2))
+    return 1 << (wordSize_ - 2)
+
+def calculateMaxEncodedLen(dataLen_):
+    """
+    Calculate the size of the buffer required to hold the encoded data. Data that does not compress (every symbol
+    escaping to the base table) can expand, so leave room for twice the input plus the terminating tag
+
+    :param dataLen_: The number of symbols that will be encoded
+    :return: Return the number of bytes that should be allocated for the encoded data
+    """
 
-    return int(maxBytes)
+    return (dataLen_ * 2) + 16